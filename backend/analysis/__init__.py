@@ -1,17 +1,40 @@
 """Утилиты анализа результатов проверки."""
 
+from backend.analysis.bootstrap import BootstrapInterval, bootstrap_ci, paired_bootstrap
+from backend.analysis.columnar import ColumnarResults, open_results_columnar
+from backend.analysis.columns import ResultColumns, as_columns
+from backend.analysis.loader import load_results
 from backend.analysis.metrics import (
+    RiskCoverageCurve,
     accuracy,
     accuracy_at_confidence,
+    confusion_matrix,
+    expected_calibration_error,
     mae,
     quadratic_weighted_kappa,
     reliability_curve,
+    risk_coverage_curve,
 )
+from backend.analysis.online import MetricsAccumulator, MetricsSnapshot
 
 __all__ = [
+    "BootstrapInterval",
+    "ColumnarResults",
+    "MetricsAccumulator",
+    "MetricsSnapshot",
+    "ResultColumns",
+    "RiskCoverageCurve",
     "accuracy",
     "accuracy_at_confidence",
+    "as_columns",
+    "bootstrap_ci",
+    "confusion_matrix",
+    "expected_calibration_error",
+    "load_results",
     "mae",
+    "open_results_columnar",
+    "paired_bootstrap",
     "quadratic_weighted_kappa",
     "reliability_curve",
+    "risk_coverage_curve",
 ]
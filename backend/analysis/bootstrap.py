@@ -0,0 +1,196 @@
+"""Бутстрап-доверительные интервалы для метрик проверки."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.analysis.columns import Results, as_columns
+from backend.analysis.metrics import _require_non_empty, confusion_matrix
+from backend.grading.types import GradingResult
+
+BLOCK_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class BootstrapInterval:
+    metric: str
+    estimate: float
+    lower: float
+    upper: float
+    confidence_level: float
+    n_resamples: int
+    # Только для парного бутстрапа: двусторонняя доля реплик, где знак разности меняется.
+    p_value: Optional[float] = None
+
+
+def _batch_accuracy(counts: np.ndarray) -> np.ndarray:
+    return np.trace(counts, axis1=1, axis2=2) / counts.sum(axis=(1, 2))
+
+
+def _batch_mae(counts: np.ndarray) -> np.ndarray:
+    grid = np.arange(counts.shape[1])
+    distance = np.abs(grid[:, None] - grid[None, :])
+    return (counts * distance).sum(axis=(1, 2)) / counts.sum(axis=(1, 2))
+
+
+def _batch_qwk(counts: np.ndarray) -> np.ndarray:
+    ratings = counts.shape[1]
+    grid = np.arange(ratings)
+    weights = (grid[:, None] - grid[None, :]) ** 2 / ((ratings - 1) ** 2 or 1)
+    total = counts.sum(axis=(1, 2))
+    observed = (counts * weights).sum(axis=(1, 2))
+    expected = np.einsum("ri,ij,rj->r", counts.sum(axis=2), weights, counts.sum(axis=1)) / total
+    kappa = np.ones_like(expected)
+    nonzero = expected != 0
+    kappa[nonzero] = 1.0 - observed[nonzero] / expected[nonzero]
+    return kappa
+
+
+BATCH_METRICS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "accuracy": _batch_accuracy,
+    "mae": _batch_mae,
+    "qwk": _batch_qwk,
+}
+
+
+def _metric_fn(metric: str) -> Callable[[np.ndarray], np.ndarray]:
+    try:
+        return BATCH_METRICS[metric]
+    except KeyError as exc:
+        raise ValueError(f"Неизвестная метрика {metric!r}. Допустимо: {', '.join(BATCH_METRICS)}.") from exc
+
+
+def _resample_block(
+    metric: str,
+    probabilities: np.ndarray,
+    n: int,
+    shape: Tuple[int, ...],
+    size: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """
+    Реплики одного блока.
+
+    Бутстрап-выборка n учеников с возвращением эквивалентна мультиномиальному
+    распределению по ячейкам матрицы ошибок, поэтому блок считается за O(size * K^2)
+    вне зависимости от n. Для парного случая ячейки — тройки (true, pred_a, pred_b).
+    """
+
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(n, probabilities, size=size).reshape((size,) + shape)
+    fn = _metric_fn(metric)
+    if len(shape) == 2:
+        return fn(counts)
+    return fn(counts.sum(axis=3)) - fn(counts.sum(axis=2))
+
+
+def _replicates(
+    metric: str,
+    cell_counts: np.ndarray,
+    n_resamples: int,
+    seed: int | None,
+    n_jobs: int,
+) -> np.ndarray:
+    n = int(cell_counts.sum())
+    probabilities = (cell_counts / n).ravel()
+    # Блоки и их сиды фиксированы, поэтому результат не зависит от n_jobs.
+    sizes = [min(BLOCK_SIZE, n_resamples - start) for start in range(0, n_resamples, BLOCK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(metric, probabilities, n, cell_counts.shape, size, child) for size, child in zip(sizes, seeds)]
+    if n_jobs > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(args))) as pool:
+            blocks = list(pool.map(_resample_block, *zip(*args)))
+    else:
+        blocks = [_resample_block(*arg) for arg in args]
+    return np.concatenate(blocks)
+
+
+def _validate(n_resamples: int, confidence_level: float) -> None:
+    if n_resamples <= 0:
+        raise ValueError("n_resamples должен быть положительным.")
+    if not 0 < confidence_level < 1:
+        raise ValueError("confidence_level должен лежать в (0, 1).")
+
+
+def _percentiles(replicates: np.ndarray, confidence_level: float) -> Tuple[float, float]:
+    alpha = 1 - confidence_level
+    lower, upper = np.quantile(replicates, [alpha / 2, 1 - alpha / 2])
+    return float(lower), float(upper)
+
+
+def bootstrap_ci(
+    results: Results,
+    metric: str = "accuracy",
+    n_resamples: int = 10_000,
+    confidence_level: float = 0.95,
+    seed: int | None = 0,
+    n_jobs: int = 1,
+) -> BootstrapInterval:
+    """Перцентильный бутстрап-интервал для accuracy, mae или qwk."""
+    _validate(n_resamples, confidence_level)
+    conf_mat = confusion_matrix(results)
+    estimate = float(_metric_fn(metric)(conf_mat[None].astype(np.float64))[0])
+    replicates = _replicates(metric, conf_mat, n_resamples, seed, n_jobs)
+    lower, upper = _percentiles(replicates, confidence_level)
+    return BootstrapInterval(metric, estimate, lower, upper, confidence_level, n_resamples)
+
+
+def _align(results_a: Results, results_b: Results) -> Tuple[Results, Results]:
+    """Сопоставить списки GradingResult по (task_id, student_id); колонки считаются уже выровненными."""
+    if not isinstance(results_a, Sequence) or not isinstance(results_b, Sequence):
+        return results_a, results_b
+    if not all("student_id" in r for r in results_a) or not all("student_id" in r for r in results_b):
+        return results_a, results_b
+
+    def key(r: GradingResult) -> Tuple[str, str]:
+        return str(r.get("task_id")), str(r["student_id"])
+
+    by_key_b = {key(r): r for r in results_b}
+    if len(by_key_b) != len(results_b) or len(results_a) != len(results_b):
+        raise ValueError("Для парного бутстрапа нужны одинаковые наборы учеников без повторов.")
+    try:
+        aligned_b: List[GradingResult] = [by_key_b[key(r)] for r in results_a]
+    except KeyError as exc:
+        raise ValueError(f"Ученик {exc.args[0]} есть только в одном из прогонов.") from exc
+    return results_a, aligned_b
+
+
+def paired_bootstrap(
+    results_a: Results,
+    results_b: Results,
+    metric: str = "accuracy",
+    n_resamples: int = 10_000,
+    confidence_level: float = 0.95,
+    seed: int | None = 0,
+    n_jobs: int = 1,
+) -> BootstrapInterval:
+    """
+    Интервал для разности metric(A) - metric(B) на одних и тех же учениках.
+
+    Ученики ресэмплируются совместно, поэтому корреляция между бэкендами учитывается.
+    p_value — двусторонняя бутстрап-оценка для гипотезы «разности нет».
+    """
+
+    _validate(n_resamples, confidence_level)
+    _require_non_empty(results_a)
+    results_a, results_b = _align(results_a, results_b)
+    cols_a, cols_b = as_columns(results_a), as_columns(results_b)
+    if len(cols_a) != len(cols_b) or not np.array_equal(cols_a.true_score, cols_b.true_score):
+        raise ValueError("Прогоны должны совпадать по ученикам и истинным баллам.")
+
+    ratings = int(max(cols_a.max_score.max(), cols_b.max_score.max())) + 1
+    conf_a = confusion_matrix(cols_a, ratings)
+    conf_b = confusion_matrix(cols_b, ratings)
+    codes = (cols_a.true_score * ratings + cols_a.pred_score) * ratings + cols_b.pred_score
+    joint = np.bincount(codes, minlength=ratings**3).reshape(ratings, ratings, ratings)
+
+    fn = _metric_fn(metric)
+    estimate = float(fn(conf_a[None].astype(np.float64))[0] - fn(conf_b[None].astype(np.float64))[0])
+    replicates = _replicates(metric, joint, n_resamples, seed, n_jobs)
+    lower, upper = _percentiles(replicates, confidence_level)
+    p_value = min(1.0, 2 * min(float(np.mean(replicates <= 0)), float(np.mean(replicates >= 0))))
+    return BootstrapInterval(f"{metric}_diff", estimate, lower, upper, confidence_level, n_resamples, p_value)
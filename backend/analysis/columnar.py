@@ -0,0 +1,141 @@
+"""Чтение колоночного хранилища результатов (см. backend/grading/columnar.py) без копирования."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+from backend.analysis.columns import ResultColumns
+from backend.analysis.loader import Filter, _normalize_filter
+from backend.grading.columnar import CATEGORICAL_COLUMNS, COLUMNAR_FORMAT, COLUMNAR_VERSION, NUMERIC_COLUMNS
+
+
+class ColumnarResults:
+    """
+    Открытый каталог <experiment>.columns.
+
+    Числовые колонки и коды категорий отображаются в память (np.load с mmap_mode="r"):
+    columns и select() отдают ResultColumns поверх memmap, так что метрики из
+    backend/analysis/metrics.py читают страницы файла напрямую, без разбора JSON.
+    Строковые значения task_id, student_id, backend_name и experiment_name хранятся
+    словарём, а фильтры по ним сводятся к сравнению целочисленных кодов.
+    """
+
+    def __init__(self, path: Union[Path, str], mmap: bool = True):
+        self.path = Path(path)
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Не найдено колоночное хранилище: {self.path}")
+        self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if self.meta.get("format") != COLUMNAR_FORMAT or self.meta.get("version") != COLUMNAR_VERSION:
+            raise ValueError(
+                f"Неподдерживаемый формат колонок в {self.path}: "
+                f"{self.meta.get('format')} v{self.meta.get('version')}"
+            )
+        mode = "r" if mmap else None
+        # Пустой .npy нельзя отобразить в память, его проще прочитать целиком.
+        if self.meta["rows"] == 0:
+            mode = None
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.load(self.path / f"{name}.npy", mmap_mode=mode) for name in NUMERIC_COLUMNS
+        }
+        self._codes: Dict[str, np.ndarray] = {
+            name: np.load(self.path / f"{name}.codes.npy", mmap_mode=mode) for name in CATEGORICAL_COLUMNS
+        }
+        self._values: Dict[str, List[str]] = {
+            name: json.loads((self.path / f"{name}.values.json").read_text(encoding="utf-8"))
+            for name in CATEGORICAL_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return int(self.meta["rows"])
+
+    @property
+    def columns(self) -> ResultColumns:
+        """Все строки как ResultColumns; массивы — memmap, а не копии."""
+        return ResultColumns(
+            pred_score=self._arrays["pred_score"],
+            true_score=self._arrays["true_score"],
+            max_score=self._arrays["max_score"],
+            confidence=self._arrays["confidence"],
+        )
+
+    @property
+    def error(self) -> np.ndarray:
+        return self._arrays["error"]
+
+    def codes(self, name: str) -> np.ndarray:
+        self._check_categorical(name)
+        return self._codes[name]
+
+    def values(self, name: str) -> List[str]:
+        """Словарь категории: значение по индексу кода."""
+        self._check_categorical(name)
+        return list(self._values[name])
+
+    def decode(self, name: str) -> np.ndarray:
+        """Материализовать строковую колонку (массив object той же длины)."""
+        self._check_categorical(name)
+        return np.asarray(self._values[name], dtype=object)[self._codes[name]]
+
+    def mask(
+        self,
+        experiment: Filter = None,
+        task_id: Filter = None,
+        student_id: Filter = None,
+        backend_name: Filter = None,
+        skip_errors: bool = False,
+    ) -> np.ndarray:
+        """Булева маска строк; фильтры — строка или набор значений, как в load_results."""
+        mask = np.ones(len(self), dtype=bool)
+        for name, allowed in (
+            ("experiment_name", _normalize_filter(experiment)),
+            ("task_id", _normalize_filter(task_id)),
+            ("student_id", _normalize_filter(student_id)),
+            ("backend_name", _normalize_filter(backend_name)),
+        ):
+            if allowed is None:
+                continue
+            wanted = [code for code, value in enumerate(self._values[name]) if value in allowed]
+            mask &= np.isin(self._codes[name], wanted)
+        if skip_errors:
+            mask &= ~self.error
+        return mask
+
+    def select(self, **filters) -> ResultColumns:
+        """
+        Подвыборка как ResultColumns (аргументы — как у mask()).
+
+        Без фильтров возвращаются сами memmap-колонки; с фильтрами — копии только
+        отобранных строк.
+        """
+        if not any(value not in (None, False) for value in filters.values()):
+            return self.columns
+        return self.columns.take(self.mask(**filters))
+
+    def groups(self, name: str, skip_errors: bool = False) -> Dict[str, ResultColumns]:
+        """Разбить строки по значению категории (например, по task_id для метрик по задачам)."""
+        self._check_categorical(name)
+        codes = self._codes[name]
+        rows = np.flatnonzero(~self.error) if skip_errors else np.arange(len(codes))
+        # Одна устойчивая сортировка вместо маски на каждое значение: O(n log n), а не O(n · значений).
+        order = rows[np.argsort(codes[rows], kind="stable")]
+        present, starts = np.unique(codes[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        values = self._values[name]
+        return {
+            values[code]: self.columns.take(order[start:end])
+            for code, start, end in zip(present.tolist(), starts.tolist(), ends.tolist())
+        }
+
+    def _check_categorical(self, name: str) -> None:
+        if name not in self._codes:
+            raise ValueError(f"Неизвестная категориальная колонка: {name}. Доступны: {', '.join(CATEGORICAL_COLUMNS)}")
+
+
+def open_results_columnar(path: Union[Path, str], mmap: bool = True) -> ColumnarResults:
+    """Открыть каталог колонок, записанный save_results_columnar или jsonl_to_columnar."""
+    return ColumnarResults(path, mmap=mmap)
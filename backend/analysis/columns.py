@@ -0,0 +1,70 @@
+"""Колоночное представление результатов для векторизованных метрик на NumPy."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence, Union
+
+import numpy as np
+
+from backend.grading.types import GradingResult
+
+
+@dataclass(frozen=True)
+class ResultColumns:
+    """
+    Результаты проверки в виде параллельных массивов одинаковой длины.
+
+    Массивы не копируются: сюда можно передать срезы memmap или колонки из любого
+    другого источника. Баллы — целые, confidence — float.
+    """
+
+    pred_score: np.ndarray
+    true_score: np.ndarray
+    max_score: np.ndarray
+    confidence: np.ndarray
+
+    def __post_init__(self) -> None:
+        lengths = {len(self.pred_score), len(self.true_score), len(self.max_score), len(self.confidence)}
+        if len(lengths) != 1:
+            raise ValueError(f"Колонки результатов разной длины: {sorted(lengths)}")
+
+    def __len__(self) -> int:
+        return len(self.pred_score)
+
+    @property
+    def correct(self) -> np.ndarray:
+        return self.pred_score == self.true_score
+
+    @classmethod
+    def from_results(cls, results: Sequence[GradingResult]) -> "ResultColumns":
+        n = len(results)
+        return cls(
+            pred_score=np.fromiter((int(r["pred_score"]) for r in results), dtype=np.int64, count=n),
+            true_score=np.fromiter((int(r["true_score"]) for r in results), dtype=np.int64, count=n),
+            max_score=np.fromiter((int(r["max_score"]) for r in results), dtype=np.int64, count=n),
+            confidence=np.fromiter((float(r["confidence"]) for r in results), dtype=np.float64, count=n),
+        )
+
+    def take(self, index: np.ndarray) -> "ResultColumns":
+        """Подвыборка по булевой маске или массиву индексов."""
+        return ResultColumns(
+            pred_score=self.pred_score[index],
+            true_score=self.true_score[index],
+            max_score=self.max_score[index],
+            confidence=self.confidence[index],
+        )
+
+
+Results = Union[Sequence[GradingResult], ResultColumns]
+
+
+def as_columns(results: Results) -> ResultColumns:
+    """Привести список GradingResult к ResultColumns; готовые колонки возвращаются как есть."""
+    if isinstance(results, ResultColumns):
+        return results
+    columns = getattr(results, "columns", None)
+    if isinstance(columns, ResultColumns):
+        # Хранилища с готовыми колонками (ColumnarResults) отдают их без копирования.
+        return columns
+    return ResultColumns.from_results(results)
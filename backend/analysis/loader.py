@@ -0,0 +1,149 @@
+"""Чтение JSONL с результатами: байтовые чанки в пуле процессов, проекция полей и фильтры."""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Collection, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from backend.analysis.columns import ResultColumns
+from backend.grading.types import GradingResult
+
+DEFAULT_CHUNK_BYTES = 64 << 20
+COLUMN_FIELDS = ("pred_score", "true_score", "max_score", "confidence")
+
+Filter = Union[str, Collection[str], None]
+# (путь, начало, конец): чанк отвечает за строки, начинающиеся в [начало, конец).
+_Chunk = Tuple[str, int, int]
+
+
+def _normalize_filter(value: Filter) -> Optional[FrozenSet[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return frozenset((value,))
+    return frozenset(value)
+
+
+def split_byte_ranges(path: Path, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[_Chunk]:
+    """Разбить файл на диапазоны около chunk_bytes; границы строк выравнивает сам читатель."""
+    if chunk_bytes <= 0:
+        raise ValueError("chunk_bytes должен быть положительным.")
+    size = path.stat().st_size
+    return [(str(path), start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+
+def _iter_chunk_lines(chunk: _Chunk):
+    path, start, end = chunk
+    with open(path, "rb") as f:
+        if start > 0:
+            # Строка, начавшаяся до start, принадлежит предыдущему чанку: дочитываем её и пропускаем.
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                return
+            yield line
+
+
+def _read_chunk(
+    chunk: _Chunk,
+    fields: Optional[Tuple[str, ...]],
+    filters: Dict[str, FrozenSet[str]],
+    where: Optional[Callable[[dict], bool]],
+    skip_errors: bool,
+    columns: bool,
+):
+    # Функция верхнего уровня для ProcessPoolExecutor. Дешёвый байтовый префильтр: строка с
+    # нужным значением обязана содержать его JSON-представление; json.loads — только для кандидатов.
+    needles = [
+        [json.dumps(value, ensure_ascii=False).encode("utf-8") for value in allowed] for allowed in filters.values()
+    ]
+    rows: List[dict] = []
+    for line in _iter_chunk_lines(chunk):
+        if not line.strip():
+            continue
+        if any(not any(needle in line for needle in options) for options in needles):
+            continue
+        row = json.loads(line)
+        if any(row.get(key) not in allowed for key, allowed in filters.items()):
+            continue
+        if skip_errors and row.get("error"):
+            continue
+        if where is not None and not where(row):
+            continue
+        rows.append(row if fields is None else {key: row[key] for key in fields if key in row})
+
+    if not columns:
+        return rows
+    return tuple(
+        np.fromiter((row[key] for row in rows), dtype=np.float64 if key == "confidence" else np.int64, count=len(rows))
+        for key in COLUMN_FIELDS
+    )
+
+
+def load_results(
+    paths: Union[Path, str, Sequence[Union[Path, str]]],
+    fields: Optional[Sequence[str]] = None,
+    experiment: Filter = None,
+    task_id: Filter = None,
+    backend_name: Filter = None,
+    where: Optional[Callable[[dict], bool]] = None,
+    skip_errors: bool = False,
+    as_columns: bool = False,
+    n_jobs: Optional[int] = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> Union[List[GradingResult], ResultColumns]:
+    """
+    Прочитать один или несколько JSONL с результатами.
+
+    Файлы режутся на байтовые диапазоны по chunk_bytes, которые разбираются в пуле из
+    n_jobs процессов (по умолчанию os.cpu_count(); один чанк читается в текущем
+    процессе). Порядок строк сохраняется. experiment, task_id и backend_name — строка
+    или набор допустимых значений полей experiment_name, task_id и backend_name;
+    where — произвольный предикат по строке (для пула процессов он должен сериализоваться
+    pickle). skip_errors отбрасывает строки с ошибкой бэкенда.
+
+    По умолчанию возвращает словари только с полями fields (или целиком, если fields не
+    задан). С as_columns=True возвращает ResultColumns для backend/analysis/metrics.py:
+    в пул и обратно ходят массивы NumPy, а не словари.
+    """
+
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    paths = [Path(path) for path in paths]
+    for path in paths:
+        if not path.exists():
+            raise FileNotFoundError(f"Не найден файл с результатами: {path}")
+
+    filters = {
+        key: allowed
+        for key, allowed in (
+            ("experiment_name", _normalize_filter(experiment)),
+            ("task_id", _normalize_filter(task_id)),
+            ("backend_name", _normalize_filter(backend_name)),
+        )
+        if allowed is not None
+    }
+    projection = tuple(COLUMN_FIELDS if as_columns else fields) if (as_columns or fields is not None) else None
+    chunks = [chunk for path in paths for chunk in split_byte_ranges(path, chunk_bytes)]
+    args = (projection, filters, where, skip_errors, as_columns)
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs <= 1 or len(chunks) <= 1:
+        parts = [_read_chunk(chunk, *args) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks))) as pool:
+            parts = list(pool.map(_read_chunk, chunks, *([arg] * len(chunks) for arg in args)))
+
+    if not as_columns:
+        return [row for part in parts for row in part]  # type: ignore[misc]
+    if not parts:
+        empty = [np.empty(0, dtype=np.float64 if key == "confidence" else np.int64) for key in COLUMN_FIELDS]
+        return ResultColumns(*empty)
+    return ResultColumns(*(np.concatenate([part[idx] for part in parts]) for idx in range(len(COLUMN_FIELDS))))
@@ -2,117 +2,196 @@
 
 from __future__ import annotations
 
-from typing import List, Sequence, Tuple
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 
-from backend.grading.types import GradingResult, ReliabilityBin
+import numpy as np
 
+from backend.analysis.columns import ResultColumns, Results, as_columns
+from backend.grading.types import ReliabilityBin
 
-def _require_non_empty(results: Sequence[GradingResult]) -> None:
-    if not results:
+
+def _require_non_empty(results: Results) -> None:
+    if not len(results):
         raise ValueError("Передан пустой список результатов: нечего считать.")
 
 
-def accuracy(results: Sequence[GradingResult]) -> float:
+def _columns(results: Results) -> ResultColumns:
     _require_non_empty(results)
-    correct = sum(1 for r in results if int(r["pred_score"]) == int(r["true_score"]))
-    return correct / len(results)
+    return as_columns(results)
 
 
-def mae(results: Sequence[GradingResult]) -> float:
-    _require_non_empty(results)
-    return sum(abs(int(r["pred_score"]) - int(r["true_score"])) for r in results) / len(results)
+def accuracy(results: Results) -> float:
+    cols = _columns(results)
+    return float(np.count_nonzero(cols.correct)) / len(cols)
 
 
-def quadratic_weighted_kappa(results: Sequence[GradingResult]) -> float:
-    """
-    Вычисляет квадратическую каппу Коэна без внешних зависимостей.
-    Диапазон баллов берётся [0, max_score]; если ожидаемое совпадение 0, возвращаем 1.0.
-    """
+def mae(results: Results) -> float:
+    cols = _columns(results)
+    return float(np.abs(cols.pred_score - cols.true_score).sum()) / len(cols)
 
-    _require_non_empty(results)
-    min_rating = 0
-    max_rating = max(int(r["max_score"]) for r in results)
-    ratings = max_rating - min_rating + 1
-    denom = (ratings - 1) ** 2 or 1
 
-    # Матрица ошибок (true x pred).
-    conf_mat = [[0 for _ in range(ratings)] for _ in range(ratings)]
-    for r in results:
-        true_idx = int(r["true_score"]) - min_rating
-        pred_idx = int(r["pred_score"]) - min_rating
-        conf_mat[true_idx][pred_idx] += 1
+def confusion_matrix(results: Results, num_ratings: int | None = None) -> np.ndarray:
+    """Матрица ошибок (true x pred) по баллам 0..max_score, одним проходом через bincount."""
+    cols = _columns(results)
+    ratings = num_ratings if num_ratings is not None else int(cols.max_score.max()) + 1
+    true_idx, pred_idx = cols.true_score, cols.pred_score
+    if min(true_idx.min(), pred_idx.min()) < 0 or max(true_idx.max(), pred_idx.max()) >= ratings:
+        raise ValueError(f"Баллы выходят за диапазон [0, {ratings - 1}].")
+    flat = np.bincount(true_idx * ratings + pred_idx, minlength=ratings * ratings)
+    return flat.reshape(ratings, ratings)
 
-    # Гистограммы по истинным и предсказанным баллам.
-    true_hist = [sum(row) for row in conf_mat]
-    pred_hist = [sum(col[i] for col in conf_mat) for i in range(ratings)]
 
-    total = sum(true_hist)
-    weight_matrix = [[((i - j) ** 2) / denom for j in range(ratings)] for i in range(ratings)]
+def kappa_from_confusion(conf_mat: np.ndarray) -> float:
+    """Квадратическая каппа по готовой матрице ошибок; если ожидаемое совпадение 0, возвращаем 1.0."""
+    ratings = conf_mat.shape[0]
+    denom = (ratings - 1) ** 2 or 1
+    grid = np.arange(ratings)
+    weight_matrix = (grid[:, None] - grid[None, :]) ** 2 / denom
 
-    observed = sum(weight_matrix[i][j] * conf_mat[i][j] for i in range(ratings) for j in range(ratings))
-    expected = sum(
-        weight_matrix[i][j] * true_hist[i] * pred_hist[j] / total for i in range(ratings) for j in range(ratings)
-    )
+    # Гистограммы по истинным и предсказанным баллам.
+    true_hist = conf_mat.sum(axis=1)
+    pred_hist = conf_mat.sum(axis=0)
+    total = true_hist.sum()
 
+    observed = float((weight_matrix * conf_mat).sum())
+    expected = float((weight_matrix * np.outer(true_hist, pred_hist)).sum() / total)
     if expected == 0:
         return 1.0
     return 1.0 - observed / expected
 
 
-def reliability_curve(results: Sequence[GradingResult], num_bins: int = 10) -> List[ReliabilityBin]:
-    _require_non_empty(results)
-    if num_bins <= 0:
-        raise ValueError("Число бинов должно быть положительным.")
+def quadratic_weighted_kappa(results: Results) -> float:
+    """
+    Вычисляет квадратическую каппу Коэна.
+    Диапазон баллов берётся [0, max_score]; если ожидаемое совпадение 0, возвращаем 1.0.
+    """
 
-    bins: List[ReliabilityBin] = []
-    bin_edges = [i / num_bins for i in range(num_bins + 1)]
-    is_correct = [int(r["pred_score"]) == int(r["true_score"]) for r in results]
+    return kappa_from_confusion(confusion_matrix(results))
 
-    for i in range(num_bins):
-        lower, upper = bin_edges[i], bin_edges[i + 1]
-        bucket_items = [
-            (float(results[idx]["confidence"]), is_correct[idx]) for idx in range(len(results)) if lower <= float(
-                results[idx]["confidence"]
-            ) < (upper if i < num_bins - 1 else upper + 1e-9)
-        ]
-
-        if not bucket_items:
-            bins.append(
-                ReliabilityBin(
-                    lower=lower,
-                    upper=upper,
-                    count=0,
-                    avg_confidence=0.0,
-                    avg_accuracy=0.0,
-                    correct=0,
-                )
-            )
-            continue
 
-        count = len(bucket_items)
-        avg_conf = sum(item[0] for item in bucket_items) / count
-        correct = sum(1 for _, flag in bucket_items if flag)
+def reliability_bin_index(confidence: np.ndarray, num_bins: int) -> np.ndarray:
+    """
+    Номер бина для каждой уверенности; -1 — вне [0, 1].
+
+    Бин i — полуинтервал [i/num_bins, (i+1)/num_bins), последний бин включает 1.0.
+    """
+
+    edges = np.array([i / num_bins for i in range(num_bins + 1)])
+    idx = np.searchsorted(edges, confidence, side="right") - 1
+    idx[(idx == num_bins) & (confidence < edges[-1] + 1e-9)] = num_bins - 1
+    idx[(idx < 0) | (idx >= num_bins)] = -1
+    return idx
+
+
+def bins_from_counts(
+    counts: np.ndarray, confidence_sums: np.ndarray, correct_counts: np.ndarray
+) -> List[ReliabilityBin]:
+    """Собрать ReliabilityBin из поканальных сумм (общий код для пакетных и онлайн-метрик)."""
+    num_bins = len(counts)
+    bins: List[ReliabilityBin] = []
+    for i in range(num_bins):
+        count = int(counts[i])
+        correct = int(correct_counts[i])
         bins.append(
             ReliabilityBin(
-                lower=lower,
-                upper=upper,
+                lower=i / num_bins,
+                upper=(i + 1) / num_bins,
                 count=count,
-                avg_confidence=avg_conf,
-                avg_accuracy=correct / count,
+                avg_confidence=float(confidence_sums[i]) / count if count else 0.0,
+                avg_accuracy=correct / count if count else 0.0,
                 correct=correct,
             )
         )
     return bins
 
 
-def accuracy_at_confidence(results: Sequence[GradingResult], threshold: float) -> Tuple[float, float]:
+def reliability_curve(results: Results, num_bins: int = 10) -> List[ReliabilityBin]:
+    cols = _columns(results)
+    if num_bins <= 0:
+        raise ValueError("Число бинов должно быть положительным.")
+
+    idx = reliability_bin_index(cols.confidence, num_bins)
+    valid = idx >= 0
+    idx = idx[valid]
+    counts = np.bincount(idx, minlength=num_bins)
+    confidence_sums = np.bincount(idx, weights=cols.confidence[valid], minlength=num_bins)
+    correct_counts = np.bincount(idx, weights=cols.correct[valid], minlength=num_bins)
+    return bins_from_counts(counts, confidence_sums, correct_counts)
+
+
+def expected_calibration_error(results: Results, num_bins: int = 10) -> float:
+    """ECE: средний по бинам разрыв |уверенность − точность|, взвешенный долей примеров в бине."""
+    bins = reliability_curve(results, num_bins)
+    total = sum(b.count for b in bins)
+    if total == 0:
+        raise ValueError("Нет результатов с уверенностью в [0, 1].")
+    return sum(b.count * abs(b.avg_confidence - b.avg_accuracy) for b in bins) / total
+
+
+def accuracy_at_confidence(results: Results, threshold: float) -> Tuple[float, float]:
     """
     Возвращает кортеж (accuracy, coverage) для результатов с confidence >= threshold.
     Coverage — доля оставленных примеров от общего числа.
     """
 
-    _require_non_empty(results)
-    kept = [r for r in results if float(r["confidence"]) >= threshold]
-    if not kept:
+    cols = _columns(results)
+    kept = cols.confidence >= threshold
+    kept_count = int(np.count_nonzero(kept))
+    if not kept_count:
         return 0.0, 0.0
-    return accuracy(kept), len(kept) / len(results)
+    return int(np.count_nonzero(cols.correct & kept)) / kept_count, kept_count / len(cols)
+
+
+@dataclass(frozen=True)
+class RiskCoverageCurve:
+    """
+    Кривая селективного предсказания: точка i соответствует порогу thresholds[i].
+
+    Пороги — различные значения confidence по убыванию; coverage[i] и accuracy[i]
+    совпадают с accuracy_at_confidence(results, thresholds[i]). aurc — площадь под
+    кривой риска (1 - accuracy) по покрытию в стандартном определении: среднее
+    риска по top-k примерам для k = 1..n.
+    """
+
+    thresholds: np.ndarray
+    coverage: np.ndarray
+    accuracy: np.ndarray
+    aurc: float
+
+    @property
+    def risk(self) -> np.ndarray:
+        return 1.0 - self.accuracy
+
+    def threshold_for_accuracy(self, target_accuracy: float) -> Optional[Tuple[float, float, float]]:
+        """
+        Наименьший порог (максимальное покрытие), при котором точность не ниже target_accuracy.
+
+        Возвращает (threshold, accuracy, coverage) или None, если цель недостижима.
+        """
+
+        ok = np.flatnonzero(self.accuracy >= target_accuracy)
+        if not len(ok):
+            return None
+        best = ok[-1]
+        return float(self.thresholds[best]), float(self.accuracy[best]), float(self.coverage[best])
+
+
+def risk_coverage_curve(results: Results) -> RiskCoverageCurve:
+    """Построить всю кривую точность/покрытие одной сортировкой и кумулятивными суммами."""
+    cols = _columns(results)
+    n = len(cols)
+    order = np.argsort(-cols.confidence, kind="stable")
+    confidence = cols.confidence[order]
+    cum_correct = np.cumsum(cols.correct[order])
+    kept = np.arange(1, n + 1)
+
+    # Последний индекс каждой группы одинаковых confidence: порог включает всю группу.
+    group_end = np.flatnonzero(np.append(confidence[1:] != confidence[:-1], True))
+    aurc = float(np.mean(1.0 - cum_correct / kept))
+    return RiskCoverageCurve(
+        thresholds=confidence[group_end],
+        coverage=kept[group_end] / n,
+        accuracy=cum_correct[group_end] / kept[group_end],
+        aurc=aurc,
+    )
@@ -0,0 +1,143 @@
+"""Онлайн-метрики: накопление статистик по мере проверки и слияние шардов."""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from backend.analysis.columns import Results, as_columns
+from backend.analysis.metrics import bins_from_counts, kappa_from_confusion, reliability_bin_index
+from backend.grading.types import GradingResult, ReliabilityBin
+
+
+@dataclass(frozen=True)
+class MetricsSnapshot:
+    count: int
+    errors: int
+    accuracy: Optional[float]
+    mae: Optional[float]
+    qwk: Optional[float]
+    reliability: List[ReliabilityBin] = field(default_factory=list)
+
+
+class MetricsAccumulator:
+    """
+    Сливаемый накопитель метрик: матрица ошибок, сумма абсолютных ошибок и бины калибровки.
+
+    Память и стоимость merge зависят только от диапазона баллов и числа бинов, а не
+    от количества результатов, поэтому шарды с разных воркеров и машин объединяются
+    дёшево. Результаты с полем error в метрики не входят и считаются отдельно.
+    Обновление и снимок защищены блокировкой, так что snapshot() можно вызывать из
+    другого потока во время прогона.
+    """
+
+    def __init__(self, num_bins: int = 10):
+        if num_bins <= 0:
+            raise ValueError("Число бинов должно быть положительным.")
+        self.num_bins = num_bins
+        self.count = 0
+        self.errors = 0
+        self.abs_error_sum = 0
+        self.confusion = np.zeros((1, 1), dtype=np.int64)
+        self.bin_counts = np.zeros(num_bins, dtype=np.int64)
+        self.bin_confidence_sums = np.zeros(num_bins, dtype=np.float64)
+        self.bin_correct = np.zeros(num_bins, dtype=np.int64)
+        self._edges = [i / num_bins for i in range(num_bins + 1)]
+        self._lock = threading.Lock()
+
+    def _ensure_ratings(self, ratings: int) -> None:
+        size = self.confusion.shape[0]
+        if ratings > size:
+            grown = np.zeros((ratings, ratings), dtype=np.int64)
+            grown[:size, :size] = self.confusion
+            self.confusion = grown
+
+    def _bin_of(self, confidence: float) -> int:
+        # Та же разметка, что reliability_bin_index в metrics.py, но без NumPy на одно значение.
+        idx = bisect_right(self._edges, confidence) - 1
+        if idx == self.num_bins and confidence < self._edges[-1] + 1e-9:
+            idx = self.num_bins - 1
+        return idx if 0 <= idx < self.num_bins else -1
+
+    def update(self, result: GradingResult) -> None:
+        with self._lock:
+            if result.get("error"):
+                self.errors += 1
+                return
+            true_score, pred_score = int(result["true_score"]), int(result["pred_score"])
+            self._ensure_ratings(max(int(result["max_score"]), true_score, pred_score) + 1)
+            self.confusion[true_score, pred_score] += 1
+            self.count += 1
+            self.abs_error_sum += abs(pred_score - true_score)
+
+            confidence = float(result["confidence"])
+            idx = self._bin_of(confidence)
+            if idx >= 0:
+                self.bin_counts[idx] += 1
+                self.bin_confidence_sums[idx] += confidence
+                self.bin_correct[idx] += pred_score == true_score
+
+    def update_many(self, results: Results) -> None:
+        """Векторизованное обновление пачкой (список GradingResult без ошибок или ResultColumns)."""
+        cols = as_columns(results)
+        if not len(cols):
+            return
+        ratings = int(max(cols.max_score.max(), cols.true_score.max(), cols.pred_score.max())) + 1
+        idx = reliability_bin_index(cols.confidence, self.num_bins)
+        valid = idx >= 0
+        with self._lock:
+            self._ensure_ratings(ratings)
+            size = self.confusion.shape[0]
+            flat = np.bincount(cols.true_score * size + cols.pred_score, minlength=size * size)
+            self.confusion += flat.reshape(size, size)
+            self.count += len(cols)
+            self.abs_error_sum += int(np.abs(cols.pred_score - cols.true_score).sum())
+            self.bin_counts += np.bincount(idx[valid], minlength=self.num_bins)
+            self.bin_confidence_sums += np.bincount(
+                idx[valid], weights=cols.confidence[valid], minlength=self.num_bins
+            )
+            self.bin_correct += np.bincount(idx[valid], weights=cols.correct[valid], minlength=self.num_bins).astype(
+                np.int64
+            )
+
+    def merge(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        """Добавить статистики другого накопителя (in-place); возвращает self."""
+        if other.num_bins != self.num_bins:
+            raise ValueError(f"Нельзя слить накопители с разным числом бинов: {self.num_bins} и {other.num_bins}.")
+        with self._lock:
+            self._ensure_ratings(other.confusion.shape[0])
+            size = other.confusion.shape[0]
+            self.confusion[:size, :size] += other.confusion
+            self.count += other.count
+            self.errors += other.errors
+            self.abs_error_sum += other.abs_error_sum
+            self.bin_counts += other.bin_counts
+            self.bin_confidence_sums += other.bin_confidence_sums
+            self.bin_correct += other.bin_correct
+        return self
+
+    def snapshot(self) -> MetricsSnapshot:
+        with self._lock:
+            if not self.count:
+                return MetricsSnapshot(count=0, errors=self.errors, accuracy=None, mae=None, qwk=None)
+            return MetricsSnapshot(
+                count=self.count,
+                errors=self.errors,
+                accuracy=float(np.trace(self.confusion)) / self.count,
+                mae=self.abs_error_sum / self.count,
+                qwk=kappa_from_confusion(self.confusion),
+                reliability=bins_from_counts(self.bin_counts, self.bin_confidence_sums, self.bin_correct),
+            )
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
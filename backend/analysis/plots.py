@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from typing import Iterable, Sequence
 
+from backend.analysis.metrics import RiskCoverageCurve
 from backend.grading.types import ReliabilityBin
 
 
@@ -48,3 +49,28 @@ def plot_reliability_diagram(bins: Sequence[ReliabilityBin], ax=None):
     twin.set_ylabel("Количество в бине")
     twin.legend(loc="lower right")
     return ax
+
+
+def plot_risk_coverage(curve: RiskCoverageCurve, target_accuracy: float | None = None, ax=None):
+    _require_matplotlib()
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        _, ax = plt.subplots(figsize=(6, 6))
+
+    ax.step(curve.coverage, curve.accuracy, where="post", color="#4f83cc", label=f"Точность (AURC={curve.aurc:.3f})")
+    ax.plot(curve.coverage, curve.risk, color="#d17b0f", alpha=0.6, label="Риск")
+    if target_accuracy is not None:
+        ax.axhline(target_accuracy, linestyle="--", color="#888888", label="Целевая точность")
+        found = curve.threshold_for_accuracy(target_accuracy)
+        if found is not None:
+            threshold, acc, coverage = found
+            ax.scatter([coverage], [acc], color="black", zorder=3, label=f"Порог {threshold:.2f}")
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.set_xlabel("Покрытие")
+    ax.set_ylabel("Точность / риск")
+    ax.set_title("Кривая риск-покрытие")
+    ax.legend()
+    ax.grid(alpha=0.25)
+    return ax
@@ -0,0 +1,110 @@
+"""Склейка одновременных запросов /grade в микропакеты для бэкенда."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from backend.grading.backends.base import Backend
+from backend.grading.pipeline import grade_dataset
+from backend.grading.telemetry import Telemetry
+from backend.grading.types import BatchGradingBackend, GradingResult, Sample
+
+
+class MicroBatcher:
+    """
+    Очередь запросов на проверку, собирающая их в пакеты.
+
+    Первый запрос открывает окно max_wait_ms; всё, что пришло за это время (но не больше
+    max_batch_size), уходит в бэкенд одним вызовом grade_dataset: через grade_batch, если
+    бэкенд его поддерживает, иначе параллельно в потоках по примеру. Одновременно выполняется
+    не больше max_concurrent_batches пакетов; вызовы бэкенда идут в пуле потоков,
+    чтобы не блокировать event loop.
+    """
+
+    def __init__(
+        self,
+        backend: Backend,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        max_concurrent_batches: int = 4,
+        experiment_name: str = "api",
+        telemetry: Telemetry | None = None,
+    ):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max_concurrent_batches
+        self.experiment_name = experiment_name
+        self.telemetry = telemetry
+        self.batches_sent = 0
+        self._queue: Optional[asyncio.Queue[Tuple[Sample, asyncio.Future]]] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.create_task(self._collect())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, *self._inflight, return_exceptions=True)
+            self._worker = None
+
+    async def submit(self, sample: Sample) -> GradingResult:
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((sample, future))
+        return await future
+
+    async def _collect(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Sample, asyncio.Future]]) -> None:
+        try:
+            samples = [sample for sample, _ in batch]
+            self.batches_sent += 1
+            # Без grade_batch склеенный пакет нельзя проверять по одному: это сериализовало бы
+            # одновременные запросы, поэтому каждый пример получает свой поток.
+            if isinstance(self.backend, BatchGradingBackend):
+                parallelism = {"max_batch_size": len(samples)}
+            else:
+                parallelism = {"max_workers": len(samples)}
+            results = await asyncio.to_thread(
+                grade_dataset,
+                samples,
+                self.backend,
+                experiment_name=self.experiment_name,
+                capture_errors=True,
+                telemetry=self.telemetry,
+                group_by_prefix=True,
+                **parallelism,
+            )
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        finally:
+            self._slots.release()
@@ -0,0 +1,185 @@
+"""Фоновые задания проверки каталога задачи и поток их событий."""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from backend.analysis.online import MetricsAccumulator
+from backend.grading.backends.base import Backend
+from backend.grading.io_utils import iter_labels, read_completed_ids
+from backend.grading.pipeline import stream_task_directory
+from backend.grading.telemetry import Telemetry
+from backend.grading.types import GradingResult
+
+MAX_RETAINED_EVENTS = 10_000
+# Завершённые задания сверх этого числа вытесняются из памяти, начиная с самых старых.
+MAX_RETAINED_JOBS = 1_000
+
+
+@dataclass
+class Job:
+    job_id: str
+    task_id: str
+    experiment_name: str
+    status: str = "queued"
+    total: Optional[int] = None
+    done: int = 0
+    errors: int = 0
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.now(tz=timezone.utc).isoformat())
+    metrics: MetricsAccumulator = field(default_factory=MetricsAccumulator)
+    # (порядковый номер, тип, данные); хранится ограниченное число последних событий.
+    events: Deque[Tuple[int, str, dict]] = field(default_factory=lambda: deque(maxlen=MAX_RETAINED_EVENTS))
+    _seq: itertools.count = field(default_factory=itertools.count)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    _closed: bool = False
+
+    @property
+    def finished(self) -> bool:
+        """Задание завершено и финальное событие done уже в очереди."""
+        return self._closed
+
+    def emit(self, kind: str, data: dict) -> None:
+        with self._lock:
+            self.events.append((next(self._seq), kind, data))
+
+    def events_after(self, last_seq: int) -> List[Tuple[int, str, dict]]:
+        with self._lock:
+            return [event for event in self.events if event[0] > last_seq]
+
+    def update(self, result: GradingResult) -> None:
+        """ResultSink: вызывается пайплайном на каждый готовый результат."""
+        self.metrics.update(result)
+        self.done += 1
+        self.errors += 1 if result.get("error") else 0
+        self.emit("result", {key: value for key, value in result.items() if key != "raw_response"})
+        self.emit("progress", {"done": self.done, "total": self.total, "errors": self.errors})
+
+    def to_dict(self) -> dict:
+        snapshot = self.metrics.snapshot()
+        return {
+            "job_id": self.job_id,
+            "task_id": self.task_id,
+            "experiment_name": self.experiment_name,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "errors": self.errors,
+            "output_path": self.output_path,
+            "error": self.error,
+            "created_at": self.created_at,
+            "metrics": {"accuracy": snapshot.accuracy, "mae": snapshot.mae, "qwk": snapshot.qwk},
+        }
+
+
+class JobManager:
+    """
+    Очередь заданий stream_task_directory на пуле из max_jobs фоновых потоков.
+
+    В jobs хранится не больше max_retained_jobs заданий: при переполнении вытесняются
+    самые старые завершённые, выполняющиеся и ожидающие задания не трогаются.
+    """
+
+    def __init__(
+        self,
+        backend: Backend,
+        data_dir: Path,
+        results_dir: Path,
+        max_jobs: int = 2,
+        telemetry: Telemetry | None = None,
+        max_retained_jobs: int = MAX_RETAINED_JOBS,
+    ):
+        self.backend = backend
+        self.telemetry = telemetry
+        self.data_dir = data_dir.resolve()
+        self.results_dir = results_dir
+        self.max_retained_jobs = max_retained_jobs
+        self.jobs: Dict[str, Job] = {}
+        self._jobs_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="grading-job")
+
+    def resolve_task_dir(self, task_id: str) -> Path:
+        task_dir = (self.data_dir / task_id).resolve()
+        if task_dir.parent != self.data_dir or not (task_dir / "labels.csv").is_file():
+            raise FileNotFoundError(f"Задача {task_id!r} не найдена в {self.data_dir}")
+        return task_dir
+
+    def output_path(self, experiment_name: str) -> Path:
+        """Путь results_dir/<experiment>.jsonl; имя с разделителями пути или «..» отклоняется."""
+        if not experiment_name or any(part in experiment_name for part in ("/", "\\", "..")):
+            raise ValueError(f"Недопустимое имя эксперимента: {experiment_name!r}")
+        results_dir = self.results_dir.resolve()
+        path = (results_dir / f"{experiment_name}.jsonl").resolve()
+        if path.parent != results_dir:
+            raise ValueError(f"Имя эксперимента {experiment_name!r} выводит за пределы {results_dir}")
+        return path
+
+    def _evict_finished(self) -> None:
+        overflow = len(self.jobs) - self.max_retained_jobs + 1
+        if overflow <= 0:
+            return
+        # dict хранит порядок вставки: первыми идут самые старые задания.
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished][:overflow]:
+            del self.jobs[job_id]
+
+    def submit(
+        self,
+        task_id: str,
+        experiment_name: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        resume: bool = False,
+    ) -> Job:
+        task_dir = self.resolve_task_dir(task_id)
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers должен быть положительным.")
+        job_id = uuid.uuid4().hex
+        job = Job(job_id=job_id, task_id=task_id, experiment_name=experiment_name or f"{task_id}_{job_id[:8]}")
+        output_path = self.output_path(job.experiment_name)
+        with self._jobs_lock:
+            self._evict_finished()
+            self.jobs[job_id] = job
+        job.emit("status", {"status": job.status})
+        self._pool.submit(self._run, job, task_dir, output_path, max_workers, resume)
+        return job
+
+    def _run(self, job: Job, task_dir: Path, output_path: Path, max_workers: Optional[int], resume: bool) -> None:
+        job.status = "running"
+        try:
+            # Уже проверенные при resume ученики пропускаются пайплайном и в total не входят.
+            completed = read_completed_ids(output_path, repair=False) if resume and output_path.exists() else set()
+            job.total = sum(
+                1
+                for row in iter_labels(task_dir / "labels.csv")
+                if (task_dir.name, str(row["student_id"]).zfill(4)) not in completed
+            )
+            job.emit("status", {"status": job.status, "total": job.total})
+            _, output_path = stream_task_directory(
+                task_dir,
+                self.backend,
+                experiment_name=job.experiment_name,
+                output_path=output_path,
+                resume=resume,
+                max_workers=max_workers,
+                capture_errors=True,
+                accumulator=job,
+                telemetry=self.telemetry,
+            )
+            job.output_path = str(output_path)
+            job.status = "succeeded"
+        except Exception as exc:
+            job.error = f"{type(exc).__name__}: {exc}"
+            job.status = "failed"
+        job.emit("done", job.to_dict())
+        job._closed = True
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,8 +1,168 @@
-from fastapi import FastAPI
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
 
-app = FastAPI(title="makkAIng API")
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
+from backend.app.batcher import MicroBatcher
+from backend.app.jobs import JobManager
+from backend.grading.backends.base import Backend
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.telemetry import GLOBAL_TELEMETRY, Telemetry
+from backend.grading.types import Sample
 
-@app.get("/ping")
-def ping():
-    return {"status": "ok"}
+SSE_POLL_SECONDS = 0.05
+
+
+class JobRequest(BaseModel):
+    task_id: str
+    experiment_name: Optional[str] = None
+    max_workers: Optional[int] = Field(default=None, ge=1)
+    resume: bool = False
+
+
+def create_app(
+    backend: Backend | None = None,
+    data_dir: Path | None = None,
+    results_dir: Path | None = None,
+    upload_dir: Path | None = None,
+    max_batch_size: int = 16,
+    max_wait_ms: float = 10.0,
+    max_jobs: int = 2,
+    telemetry: Telemetry | None = None,
+) -> FastAPI:
+    """
+    Собрать приложение. По умолчанию — DummyBackend и пути из переменных окружения
+    MAKKAING_DATA_DIR, MAKKAING_RESULTS_DIR, MAKKAING_UPLOAD_DIR. Телеметрия /grade и
+    /jobs пишется в telemetry (по умолчанию GLOBAL_TELEMETRY) и отдаётся на /metrics.
+    """
+
+    backend = backend or DummyBackend(seed=os.environ.get("MAKKAING_SEED"))
+    data_dir = data_dir or Path(os.environ.get("MAKKAING_DATA_DIR", "data/processed"))
+    results_dir = results_dir or Path(os.environ.get("MAKKAING_RESULTS_DIR", "results"))
+    upload_dir = upload_dir or Path(
+        os.environ.get("MAKKAING_UPLOAD_DIR", Path(tempfile.gettempdir()) / "makkaing_uploads")
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await app.state.batcher.start()
+        yield
+        await app.state.batcher.stop()
+        app.state.jobs.shutdown()
+
+    telemetry = telemetry or GLOBAL_TELEMETRY
+    app = FastAPI(title="makkAIng API", lifespan=lifespan)
+    app.state.telemetry = telemetry
+    app.state.batcher = MicroBatcher(
+        backend, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, telemetry=telemetry
+    )
+    app.state.jobs = JobManager(backend, data_dir, results_dir, max_jobs=max_jobs, telemetry=telemetry)
+    app.state.upload_dir = upload_dir
+
+    @app.get("/ping")
+    def ping():
+        return {"status": "ok"}
+
+    @app.get("/metrics")
+    def metrics(request: Request):
+        return PlainTextResponse(
+            request.app.state.telemetry.render_prometheus(), media_type="text/plain; version=0.0.4"
+        )
+
+    @app.post("/grade")
+    async def grade(
+        request: Request,
+        image: UploadFile = File(...),
+        task_id: str = Form(...),
+        student_id: str = Form(...),
+        statement_text: str = Form(...),
+        rubric_text: str = Form(...),
+        max_score: int = Form(...),
+        true_score: int = Form(0),
+        solution_text: Optional[str] = Form(None),
+    ):
+        content = await image.read()
+        digest = hashlib.sha256(content).hexdigest()
+        suffix = Path(image.filename or "").suffix.lower() or ".png"
+        # Имя по хэшу содержимого: повторная загрузка того же скана не плодит файлы.
+        image_path = request.app.state.upload_dir / f"{digest}{suffix}"
+        if not image_path.exists():
+            image_path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(image_path.write_bytes, content)
+
+        sample: Sample = {
+            "task_id": task_id,
+            "student_id": student_id,
+            "image_path": str(image_path),
+            "statement_text": statement_text,
+            "rubric_text": rubric_text,
+            "true_score": true_score,
+            "max_score": max_score,
+            "image_sha256": digest,
+        }
+        if solution_text:
+            sample["solution_text"] = solution_text
+
+        result = await request.app.state.batcher.submit(sample)
+        if result.get("error"):
+            raise HTTPException(status_code=502, detail=result["error"])
+        return result
+
+    @app.post("/jobs", status_code=202)
+    def create_job(job_request: JobRequest, request: Request):
+        try:
+            job = request.app.state.jobs.submit(
+                job_request.task_id,
+                experiment_name=job_request.experiment_name,
+                max_workers=job_request.max_workers,
+                resume=job_request.resume,
+            )
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
+        return {"job_id": job.job_id, "status": job.status, "events": f"/jobs/{job.job_id}/events"}
+
+    def _get_job(request: Request, job_id: str):
+        job = request.app.state.jobs.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Задание {job_id} не найдено")
+        return job
+
+    @app.get("/jobs/{job_id}")
+    def get_job(job_id: str, request: Request):
+        return _get_job(request, job_id).to_dict()
+
+    @app.get("/jobs/{job_id}/events")
+    async def job_events(job_id: str, request: Request):
+        job = _get_job(request, job_id)
+        try:
+            last_seq = int(request.headers.get("last-event-id", -1))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="Last-Event-ID должен быть целым числом") from exc
+
+        async def stream():
+            nonlocal last_seq
+            while True:
+                finished = job.finished
+                for seq, kind, data in job.events_after(last_seq):
+                    last_seq = seq
+                    yield f"id: {seq}\nevent: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                if finished or await request.is_disconnected():
+                    return
+                await asyncio.sleep(SSE_POLL_SECONDS)
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    return app
+
+
+app = create_app()
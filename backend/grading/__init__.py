@@ -1,16 +1,47 @@
 """Точка входа для инструментов проверки."""
 
+from backend.grading.async_pipeline import agrade_dataset
 from backend.grading.backends.dummy_backend import DummyBackend
-from backend.grading.pipeline import grade_dataset, grade_single_sample, run_task_directory
-from backend.grading.types import GradingBackend, GradingResult, ReliabilityBin, Sample
+from backend.grading.cache import GradingCache
+from backend.grading.pipeline import (
+    grade_dataset,
+    grade_single_sample,
+    iter_grade,
+    run_task_directory,
+    stream_task_directory,
+)
+from backend.grading.rate_limit import RateLimiter, TokenBucket
+from backend.grading.table import SampleTable, SampleView, Task
+from backend.grading.telemetry import GLOBAL_TELEMETRY, Telemetry
+from backend.grading.types import (
+    AsyncGradingBackend,
+    BatchGradingBackend,
+    GradingBackend,
+    GradingResult,
+    ReliabilityBin,
+    Sample,
+)
 
 __all__ = [
+    "AsyncGradingBackend",
+    "BatchGradingBackend",
     "DummyBackend",
+    "GLOBAL_TELEMETRY",
     "GradingBackend",
+    "GradingCache",
     "GradingResult",
+    "RateLimiter",
     "ReliabilityBin",
     "Sample",
+    "SampleTable",
+    "SampleView",
+    "Task",
+    "Telemetry",
+    "TokenBucket",
+    "agrade_dataset",
     "grade_dataset",
     "grade_single_sample",
+    "iter_grade",
     "run_task_directory",
+    "stream_task_directory",
 ]
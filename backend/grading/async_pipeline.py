@@ -0,0 +1,68 @@
+"""Асинхронный пайплайн проверки: много запросов в полёте с учётом квот провайдера."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Callable, List, Sequence
+
+from backend.grading.backends.adapters import SyncBackendAdapter
+from backend.grading.pipeline import _default_experiment_name, _error_result, _normalize_result
+from backend.grading.rate_limit import RateLimiter, estimate_sample_tokens
+from backend.grading.types import AsyncGradingBackend, GradingBackend, GradingResult, Sample
+
+
+def as_async_backend(backend: GradingBackend | AsyncGradingBackend) -> AsyncGradingBackend:
+    """Вернуть бэкенд с методом agrade; синхронный оборачивается в SyncBackendAdapter."""
+    if isinstance(backend, AsyncGradingBackend):
+        return backend
+    return SyncBackendAdapter(backend)
+
+
+async def agrade_dataset(
+    samples: Sequence[Sample],
+    backend: GradingBackend | AsyncGradingBackend,
+    experiment_name: str | None = None,
+    max_concurrency: int = 256,
+    rate_limiter: RateLimiter | None = None,
+    token_estimator: Callable[[Sample], int] = estimate_sample_tokens,
+    capture_errors: bool = False,
+) -> List[GradingResult]:
+    """
+    Асинхронный аналог grade_dataset с тем же форматом результатов и порядком.
+
+    Одновременно в полёте не больше max_concurrency запросов; перед каждым вызовом
+    rate_limiter списывает один запрос и token_estimator(sample) токенов.
+    """
+
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency должен быть положительным.")
+
+    async_backend = as_async_backend(backend)
+    experiment_name = experiment_name or _default_experiment_name(backend)
+    timestamp = datetime.now(tz=timezone.utc).isoformat()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def grade_one(sample: Sample) -> GradingResult:
+        async with semaphore:
+            if rate_limiter is not None:
+                await rate_limiter.acquire(token_estimator(sample))
+            try:
+                return await async_backend.agrade(sample)
+            except Exception as exc:
+                if not capture_errors:
+                    raise
+                return _error_result(exc)
+
+    tasks = [asyncio.ensure_future(grade_one(sample)) for sample in samples]
+    try:
+        raw_results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    return [
+        _normalize_result(raw_result, backend, sample, experiment_name, timestamp)
+        for raw_result, sample in zip(raw_results, samples)
+    ]
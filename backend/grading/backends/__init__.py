@@ -1,5 +1,22 @@
 """Реализации бэкендов для проверки."""
 
+from backend.grading.backends.adapters import SyncBackendAdapter
+from backend.grading.backends.cascade import CascadeBackend, select_cascade_thresholds
 from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.backends.http_backend import HTTPGradingBackend
+from backend.grading.backends.resilient import CircuitBreaker, ResilientBackend
+from backend.grading.backends.self_consistency import SelfConsistencyBackend
+from backend.grading.backends.simulated import SimulatedLLMBackend, SimulationProfile
 
-__all__ = ["DummyBackend"]
+__all__ = [
+    "CascadeBackend",
+    "CircuitBreaker",
+    "DummyBackend",
+    "HTTPGradingBackend",
+    "ResilientBackend",
+    "SelfConsistencyBackend",
+    "SimulatedLLMBackend",
+    "SimulationProfile",
+    "SyncBackendAdapter",
+    "select_cascade_thresholds",
+]
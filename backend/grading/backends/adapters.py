@@ -0,0 +1,27 @@
+"""Адаптеры между синхронным и асинхронным интерфейсами бэкенда."""
+
+from __future__ import annotations
+
+import asyncio
+
+from backend.grading.types import GradingBackend, GradingResult, Sample
+
+
+class SyncBackendAdapter:
+    """
+    Обёртка, позволяющая подать синхронный GradingBackend в agrade_dataset.
+
+    Каждый вызов grade уходит в пул потоков event loop через asyncio.to_thread,
+    поэтому блокирующий бэкенд не останавливает остальные корутины.
+    """
+
+    def __init__(self, backend: GradingBackend):
+        self.backend = backend
+        self.name = backend.name
+        self.model_name = getattr(backend, "model_name", backend.name)
+
+    def grade(self, sample: Sample) -> GradingResult:
+        return self.backend.grade(sample)
+
+    async def agrade(self, sample: Sample) -> GradingResult:
+        return await asyncio.to_thread(self.backend.grade, sample)
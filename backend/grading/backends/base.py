@@ -1,6 +1,6 @@
 """Протокол бэкенда и вспомогательные типы."""
 
-from backend.grading.types import GradingBackend
+from backend.grading.types import AsyncGradingBackend, BatchGradingBackend, GradingBackend
 
 Backend = GradingBackend
-__all__ = ["Backend", "GradingBackend"]
+__all__ = ["AsyncGradingBackend", "Backend", "BatchGradingBackend", "GradingBackend"]
@@ -0,0 +1,141 @@
+"""Каскад бэкендов: дешёвая модель первой, эскалация к дорогой при низкой уверенности."""
+
+from __future__ import annotations
+
+import math
+import threading
+from typing import Dict, List, Sequence
+
+from backend.grading.cache import backend_config
+from backend.grading.types import GradingBackend, GradingResult, Sample
+
+
+def _grade_stage(stage: GradingBackend, samples: Sequence[Sample]) -> List[GradingResult]:
+    grade_batch = getattr(stage, "grade_batch", None)
+    if grade_batch is None:
+        return [stage.grade(sample) for sample in samples]
+    results = list(grade_batch(samples))
+    if len(results) != len(samples):
+        raise ValueError(
+            f"Ступень {stage.name} вернула {len(results)} результатов на {len(samples)} примеров."
+        )
+    return results
+
+
+class CascadeBackend:
+    """
+    Цепочка бэкендов от дешёвого к дорогому.
+
+    Ответ ступени i принимается, если его confidence >= thresholds[i]; иначе пример уходит
+    на следующую ступень. Последняя ступень принимает всё, поэтому порогов на один меньше,
+    чем ступеней. В результат добавляются cascade_stage (номер принявшей ступени) и
+    cascade_trace (балл и уверенность каждой пройденной ступени); счётчики по ступеням
+    накапливаются в stage_hits.
+    """
+
+    def __init__(self, stages: Sequence[GradingBackend], thresholds: Sequence[float]):
+        if not stages:
+            raise ValueError("Каскад должен содержать хотя бы одну ступень.")
+        if len(thresholds) != len(stages) - 1:
+            raise ValueError(
+                f"Нужно {len(stages) - 1} порогов для {len(stages)} ступеней, передано {len(thresholds)}."
+            )
+        self.stages = list(stages)
+        self.thresholds = [float(t) for t in thresholds]
+        self.name = "cascade(" + ",".join(stage.name for stage in self.stages) + ")"
+        self.model_name = "+".join(getattr(stage, "model_name", stage.name) for stage in self.stages)
+        self.stage_hits = [0] * len(self.stages)
+        self._lock = threading.Lock()
+
+    def cache_config(self) -> Dict[str, object]:
+        return {
+            "stages": [
+                {"name": stage.name, "config": backend_config(stage)} for stage in self.stages
+            ],
+            "thresholds": self.thresholds,
+        }
+
+    def _accepts(self, stage_index: int, result: GradingResult) -> bool:
+        if stage_index == len(self.stages) - 1:
+            return True
+        return float(result.get("confidence", 0.0)) >= self.thresholds[stage_index]
+
+    def grade_batch(self, samples: Sequence[Sample]) -> List[GradingResult]:
+        """Прогнать примеры по ступеням; каждая ступень получает один пакет из эскалированных."""
+
+        final: List[GradingResult | None] = [None] * len(samples)
+        traces: List[List[dict]] = [[] for _ in samples]
+        pending = list(range(len(samples)))
+        hits = [0] * len(self.stages)
+        for stage_index, stage in enumerate(self.stages):
+            if not pending:
+                break
+            results = _grade_stage(stage, [samples[i] for i in pending])
+            escalated = []
+            for i, result in zip(pending, results):
+                # Имя бэкенда в строке результата — ступени, которая дала ответ, а не каскада.
+                result = {
+                    "backend_name": stage.name,
+                    "model_name": getattr(stage, "model_name", stage.name),
+                    **result,
+                }
+                traces[i].append(
+                    {
+                        "backend_name": result["backend_name"],
+                        "pred_score": result.get("pred_score"),
+                        "confidence": result.get("confidence"),
+                    }
+                )
+                if self._accepts(stage_index, result):
+                    final[i] = {**result, "cascade_stage": stage_index, "cascade_trace": traces[i]}
+                    hits[stage_index] += 1
+                else:
+                    escalated.append(i)
+            pending = escalated
+
+        with self._lock:
+            for stage_index, count in enumerate(hits):
+                self.stage_hits[stage_index] += count
+        return final  # type: ignore[return-value]
+
+    def grade(self, sample: Sample) -> GradingResult:
+        return self.grade_batch([sample])[0]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def select_cascade_thresholds(
+    stage_results: Sequence[Sequence[GradingResult]],
+    target_accuracy: float,
+) -> List[float]:
+    """
+    Подобрать пороги каскада по размеченному прогону каждой дешёвой ступени.
+
+    stage_results[i] — результаты ступени i на размеченной выборке (для всех ступеней,
+    кроме последней). Для каждой берётся наименьший порог, при котором
+    accuracy_at_confidence не ниже target_accuracy, то есть максимальное покрытие.
+    Если цель недостижима, порог равен inf: ступень эскалирует всё. Пороги подбираются
+    по всей выборке, а не только по примерам, дошедшим до ступени, — это приближение.
+    """
+
+    # Ленивый импорт: backend.analysis сам импортирует backend.grading.types.
+    from backend.analysis.metrics import accuracy_at_confidence, risk_coverage_curve
+
+    thresholds = []
+    for results in stage_results:
+        best = risk_coverage_curve(results).threshold_for_accuracy(target_accuracy)
+        if best is None:
+            thresholds.append(math.inf)
+            continue
+        threshold = best[0]
+        # Кривая построена по тем же правилам, что и accuracy_at_confidence; сверяемся явно.
+        accuracy, _ = accuracy_at_confidence(results, threshold)
+        thresholds.append(threshold if accuracy >= target_accuracy else math.inf)
+    return thresholds
@@ -4,7 +4,9 @@ from __future__ import annotations
 
 import hashlib
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional, Sequence
+
+import numpy as np
 
 from backend.grading.types import GradingBackend, GradingResult, Sample
 
@@ -31,15 +33,20 @@ class DummyBackend(GradingBackend):
         digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
         return (int(digest[:8], 16) % 1000) / 999
 
-    def grade(self, sample: Sample) -> GradingResult:
-        fraction = self._score_fraction(sample)
-        predicted_score = round(fraction * sample["max_score"])
-        predicted_score = max(0, min(sample["max_score"], predicted_score))
-
-        # Чем дальше прогноз от истинного балла, тем ниже уверенность.
-        distance = abs(predicted_score - sample["true_score"]) / max(sample["max_score"], 1)
-        confidence = max(0.05, min(1.0, self.base_confidence + self.noise * (0.5 - distance)))
+    def _score_fractions(self, samples: Sequence[Sample]) -> List[float]:
+        """То же, что _score_fraction, но для пакета: общий суффикс ключа кодируется один раз."""
+        suffix = f"|{self.seed}".encode("utf-8")
+        sha256 = hashlib.sha256
+        fractions = []
+        for sample in samples:
+            digest = sha256(f"{sample['task_id']}|{sample['student_id']}".encode("utf-8") + suffix).digest()
+            fractions.append((int.from_bytes(digest[:4], "big") % 1000) / 999)
+        return fractions
 
+    def _make_row(
+        self, sample: Sample, fraction: float, predicted_score: int, distance: float, confidence: float, timestamp: str
+    ) -> GradingResult:
+        """Собрать строку результата из уже посчитанных балла, отклонения и уверенности."""
         comment = (
             "Детерминированная заглушка; меняйте seed или подсказку, чтобы варьировать ответ. "
             f"Часть хэша={fraction:.2f}, отклонение от истинного балла={distance:.2f}."
@@ -55,10 +62,47 @@ class DummyBackend(GradingBackend):
             "comment": comment,
             "backend_name": self.name,
             "model_name": self.model_name,
-            "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+            "timestamp": timestamp,
             "raw_response": {
                 "strategy": "hash_det",
                 "seed": self.seed,
                 "fraction": fraction,
             },
         }
+
+    def _build_result(self, sample: Sample, fraction: float, timestamp: str) -> GradingResult:
+        predicted_score = round(fraction * sample["max_score"])
+        predicted_score = max(0, min(sample["max_score"], predicted_score))
+
+        # Чем дальше прогноз от истинного балла, тем ниже уверенность.
+        distance = abs(predicted_score - sample["true_score"]) / max(sample["max_score"], 1)
+        confidence = max(0.05, min(1.0, self.base_confidence + self.noise * (0.5 - distance)))
+        return self._make_row(sample, fraction, predicted_score, distance, confidence, timestamp)
+
+    def grade(self, sample: Sample) -> GradingResult:
+        fraction = self._score_fraction(sample)
+        return self._build_result(sample, fraction, datetime.now(tz=timezone.utc).isoformat())
+
+    def _build_results(self, samples: Sequence[Sample], timestamp: str) -> List[GradingResult]:
+        """То же, что _build_result для каждого примера, но арифметика баллов и уверенности — массивами numpy."""
+        count = len(samples)
+        if not count:
+            return []
+        fractions = np.array(self._score_fractions(samples))
+        max_score = np.fromiter((sample["max_score"] for sample in samples), dtype=np.int64, count=count)
+        true_score = np.fromiter((sample["true_score"] for sample in samples), dtype=np.int64, count=count)
+        # np.rint, как и round(), округляет половины к чётному: баллы совпадают с grade().
+        predicted = np.clip(np.rint(fractions * max_score), 0, max_score).astype(np.int64)
+        distance = np.abs(predicted - true_score) / np.maximum(max_score, 1)
+        confidence = np.clip(self.base_confidence + self.noise * (0.5 - distance), 0.05, 1.0)
+
+        return [
+            self._make_row(sample, fraction, pred, dist, conf, timestamp)
+            for sample, fraction, pred, dist, conf in zip(
+                samples, fractions.tolist(), predicted.tolist(), distance.tolist(), confidence.tolist()
+            )
+        ]
+
+    def grade_batch(self, samples: Sequence[Sample]) -> List[GradingResult]:
+        """Пакетная версия grade: те же баллы, один проход хэширования и общая метка времени."""
+        return self._build_results(samples, datetime.now(tz=timezone.utc).isoformat())
@@ -0,0 +1,120 @@
+"""Бэкенд, обращающийся к удалённому сервису проверки по HTTP."""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+import httpx
+
+from backend.grading.preprocess import payload_data_url
+from backend.grading.prompts import PromptBuilder
+from backend.grading.types import GradingResult, Sample
+
+# С готовым промптом эти поля уже в prompt.messages (или локальны) и в sample не дублируются.
+_PROMPT_FIELDS = frozenset(
+    {"statement_text", "rubric_text", "solution_text", "image_path", "image_sha256", "payload_path", "payload_mime"}
+)
+
+
+class HTTPGradingBackend:
+    """
+    Отправляет Sample в JSON на `POST {base_url}/grade` и ожидает в ответ GradingResult.
+
+    Подходит как для прокси к LLM-провайдеру, так и для локального мок-сервера в тестах.
+    Поддерживает оба интерфейса: grade (httpx.Client) и agrade (httpx.AsyncClient).
+    Оба клиента создаются лениво и держат пул соединений на весь прогон, поэтому
+    TCP/TLS-рукопожатие не повторяется на каждый пример. Синхронный клиент общий для
+    потоков пайплайна; асинхронный привязан к event loop, в котором вызван первый agrade.
+    По окончании прогона вызовите close() и/или aclose().
+    С prompt_builder в запрос добавляется готовый промпт (prompt.messages) в раскладке
+    «общий префикс задачи + ученик в конце», чтобы провайдер переиспользовал кэш префикса;
+    sample тогда несёт только идентификаторы и баллы, а тексты и скан есть лишь в промпте.
+    """
+
+    name = "http_v1"
+
+    def __init__(
+        self,
+        base_url: str,
+        model_name: str = "remote",
+        timeout: float = 60.0,
+        max_connections: int = 1000,
+        headers: Optional[dict] = None,
+        prompt_builder: Optional[PromptBuilder] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.headers = dict(headers or {})
+        self.prompt_builder = prompt_builder
+        # Публичное простое поле попадает в ключ GradingCache: смена шаблона промпта сбрасывает кэш.
+        self.prompt_fingerprint = prompt_builder.fingerprint if prompt_builder is not None else None
+        self._init_runtime()
+
+    def _init_runtime(self) -> None:
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(timeout=self.timeout, headers=self.headers, limits=self._limits())
+        return self._client
+
+    def _payload(self, sample: Sample) -> dict:
+        payload = {"model": self.model_name, "sample": dict(sample)}
+        if self.prompt_builder is not None:
+            prompt = self.prompt_builder.build(sample)
+            # Рядом с промптом остаются только идентификаторы и баллы для сборки GradingResult.
+            payload["sample"] = {key: value for key, value in sample.items() if key not in _PROMPT_FIELDS}
+            payload["prompt"] = {
+                "messages": prompt.to_messages(),
+                "prefix_key": prompt.prefix_key,
+                "prefix_tokens": prompt.prefix_tokens,
+                "total_tokens": prompt.total_tokens,
+            }
+        elif sample.get("payload_path"):
+            # Предобработанный скан отправляем сразу в base64, удалённая сторона не видит наших путей.
+            payload["image"] = payload_data_url(sample)
+        return payload
+
+    def grade(self, sample: Sample) -> GradingResult:
+        response = self._get_client().post(f"{self.base_url}/grade", json=self._payload(sample))
+        response.raise_for_status()
+        return response.json()
+
+    async def agrade(self, sample: Sample) -> GradingResult:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, headers=self.headers, limits=self._limits())
+        response = await self._async_client.post(f"{self.base_url}/grade", json=self._payload(sample))
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def close(self) -> None:
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def __getstate__(self) -> dict:
+        # Клиенты и их пулы соединений не сериализуются: в процессе-воркере они создаются заново.
+        state = self.__dict__.copy()
+        for key in ("_client", "_client_lock", "_async_client"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._init_runtime()
@@ -0,0 +1,294 @@
+"""Обёртка над бэкендом: таймауты, повторы с backoff, хеджирование и автомат-предохранитель."""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import httpx
+
+from backend.grading.cache import backend_config
+from backend.grading.types import GradingBackend, GradingResult, Sample
+
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class RetryableBackendError(Exception):
+    """Временная ошибка провайдера: запрос имеет смысл повторить (не раньше retry_after секунд, если задано)."""
+
+    def __init__(self, *args, retry_after: Optional[float] = None):
+        super().__init__(*args)
+        self.retry_after = retry_after
+
+
+class BackendTimeoutError(RetryableBackendError, TimeoutError):
+    """Вызов бэкенда не уложился в таймаут."""
+
+
+class CircuitOpenError(Exception):
+    """Предохранитель разомкнут: провайдер считается недоступным, вызов не выполнялся."""
+
+
+def retry_after_hint(exc: BaseException) -> Optional[float]:
+    """Сколько секунд провайдер просит подождать: RetryableBackendError.retry_after или заголовок Retry-After."""
+    if isinstance(exc, RetryableBackendError):
+        return exc.retry_after
+    if isinstance(exc, httpx.HTTPStatusError):
+        try:
+            return max(0.0, float(exc.response.headers.get("Retry-After", "")))
+        except ValueError:
+            # HTTP-дата вместо секунд встречается редко; тогда обходимся обычным backoff.
+            return None
+    return None
+
+
+def default_is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (RetryableBackendError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class CircuitBreaker:
+    """
+    Классический предохранитель closed -> open -> half_open.
+
+    После failure_threshold подряд неудачных вызовов размыкается на reset_timeout секунд;
+    затем пропускает один пробный вызов: успех замыкает цепь, неудача снова размыкает.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+@dataclass
+class ResilienceStats:
+    calls: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    circuit_rejections: int = 0
+
+
+class ResilientBackend:
+    """
+    Обёртка над любым GradingBackend.
+
+    - timeout: предельное время одного вызова (включая хедж), затем BackendTimeoutError;
+    - max_retries: повторы retryable-ошибок с экспоненциальной задержкой и джиттером; если
+      провайдер назвал срок (Retry-After, RetryableBackendError.retry_after), пауза не
+      короче него, но не длиннее backoff_max;
+    - хеджирование: если вызов дольше наблюдаемого квантиля hedge_quantile латентности
+      (после hedge_min_samples успешных вызовов), запускается дубликат; берётся первый успех;
+    - circuit_breaker: при недоступности провайдера вызовы сразу падают с CircuitOpenError.
+
+    Синхронный вызов нельзя прервать, поэтому зависший grade остаётся в пуле из
+    max_threads потоков до завершения, а пайплайн получает ошибку по таймауту.
+    """
+
+    def __init__(
+        self,
+        backend: GradingBackend,
+        timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        circuit_breaker: CircuitBreaker | None = None,
+        is_retryable: Callable[[BaseException], bool] = default_is_retryable,
+        max_threads: int = 64,
+        latency_window: int = 500,
+        sleep: Callable[[float], None] = time.sleep,
+        seed: Optional[int] = None,
+    ):
+        self.backend = backend
+        self.name = backend.name
+        self.model_name = getattr(backend, "model_name", backend.name)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self.is_retryable = is_retryable
+        self.max_threads = max_threads
+        self.stats = ResilienceStats()
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="resilient")
+
+    def cache_config(self) -> Dict[str, object]:
+        # Ответ определяется обёрнутым бэкендом, а не параметрами устойчивости.
+        return backend_config(self.backend)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Порог для хеджирования: квантиль наблюдаемых латентностей или None, пока данных мало."""
+        with self._lock:
+            if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))]
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * (0.5 + self._random.random() / 2)
+
+    def _submit(self, sample: Sample, started: Dict[Future, float]) -> Future:
+        future = self._pool.submit(self.backend.grade, sample)
+        started[future] = time.monotonic()
+        return future
+
+    def _call_once(self, sample: Sample) -> GradingResult:
+        deadline = time.monotonic() + self.timeout
+        started: Dict[Future, float] = {}
+        primary = self._submit(sample, started)
+        pending = {primary}
+
+        delay = self.hedge_delay()
+        if delay is not None and delay < self.timeout:
+            done, pending = wait(pending, timeout=delay)
+            if not done:
+                pending.add(self._submit(sample, started))
+                with self._lock:
+                    self.stats.hedges += 1
+            pending |= done
+
+        last_error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    last_error = error
+                    continue
+                latency = time.monotonic() - started[future]
+                with self._lock:
+                    self._latencies.append(latency)
+                    if future is not primary:
+                        self.stats.hedge_wins += 1
+                for other in pending:
+                    other.cancel()
+                return future.result()
+
+        if pending:
+            with self._lock:
+                self.stats.timeouts += 1
+            raise BackendTimeoutError(f"Бэкенд {self.name} не ответил за {self.timeout:.1f} с.")
+        raise last_error  # type: ignore[misc]
+
+    def grade(self, sample: Sample) -> GradingResult:
+        with self._lock:
+            self.stats.calls += 1
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow():
+                with self._lock:
+                    self.stats.circuit_rejections += 1
+                raise CircuitOpenError(f"Предохранитель бэкенда {self.name} разомкнут.")
+            try:
+                result = self._call_once(sample)
+            except Exception as exc:
+                retryable = self.is_retryable(exc)
+                if retryable:
+                    self.circuit_breaker.record_failure()
+                else:
+                    # Ошибка не про доступность провайдера — цепь не трогаем, пробный вызов освобождаем.
+                    self.circuit_breaker.record_success()
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                with self._lock:
+                    self.stats.retries += 1
+                delay = self._backoff(attempt)
+                hint = retry_after_hint(exc)
+                if hint is not None:
+                    delay = max(delay, min(hint, self.backoff_max))
+                self._sleep(delay)
+                continue
+            self.circuit_breaker.record_success()
+            return result
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        for key in ("_lock", "_pool"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="resilient")
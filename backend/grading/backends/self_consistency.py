@@ -0,0 +1,122 @@
+"""Мета-бэкенд самосогласованности: несколько вызовов, голосование и ранняя остановка."""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Dict, List
+
+from backend.grading.cache import backend_config
+from backend.grading.types import GradingBackend, GradingResult, Sample
+
+
+class SelfConsistencyBackend:
+    """
+    Опрашивает базовый бэкенд до max_calls раз и выбирает pred_score большинством голосов.
+
+    Остановка: как только лидер опережает второй по частоте балл на agreement_margin
+    голосов (при margin=2 два совпавших первых ответа завершают опрос) или когда оставшихся
+    вызовов уже не хватит, чтобы сменить лидера. Уверенность — доля голосов за победителя,
+    сглаженная к средней уверенности m победивших ответов: (c + 2m) / (n + 2). Два
+    согласных ответа не дают 1.0, а при ранней остановке уверенность всё равно различается
+    по работам. С blend_model_confidence=False вместо m берётся 1/2 (сглаживание Лапласа).
+    В raw_response сохраняются все сделанные вызовы.
+    """
+
+    def __init__(
+        self,
+        backend: GradingBackend,
+        max_calls: int = 5,
+        agreement_margin: int = 2,
+        blend_model_confidence: bool = True,
+    ):
+        if max_calls <= 0 or agreement_margin <= 0:
+            raise ValueError("max_calls и agreement_margin должны быть положительными.")
+        self.backend = backend
+        self.max_calls = max_calls
+        self.agreement_margin = agreement_margin
+        self.blend_model_confidence = blend_model_confidence
+        self.name = f"{backend.name}+sc{max_calls}"
+        self.model_name = getattr(backend, "model_name", backend.name)
+        self.total_samples = 0
+        self.total_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def average_calls(self) -> float:
+        return self.total_calls / self.total_samples if self.total_samples else 0.0
+
+    def cache_config(self) -> Dict[str, object]:
+        return {
+            "inner": backend_config(self.backend),
+            "max_calls": self.max_calls,
+            "agreement_margin": self.agreement_margin,
+            "blend_model_confidence": self.blend_model_confidence,
+        }
+
+    def _should_stop(self, votes: Counter, num_calls: int) -> bool:
+        ranked = votes.most_common(2)
+        leader = ranked[0][1]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        remaining = self.max_calls - num_calls
+        return leader - runner_up >= self.agreement_margin or leader - runner_up > remaining
+
+    def grade(self, sample: Sample) -> GradingResult:
+        calls: List[GradingResult] = []
+        votes: Counter = Counter()
+        while len(calls) < self.max_calls:
+            result = self.backend.grade(sample)
+            calls.append(result)
+            votes[int(result["pred_score"])] += 1
+            if self._should_stop(votes, len(calls)):
+                break
+
+        top = max(votes.values())
+        tied = [score for score, count in votes.items() if count == top]
+
+        def mean_confidence(score: int) -> float:
+            values = [float(c.get("confidence", 0.0)) for c in calls if int(c["pred_score"]) == score]
+            return sum(values) / len(values)
+
+        # При ничьей побеждает балл с большей средней уверенностью, затем — встретившийся раньше.
+        winner = max(tied, key=lambda score: (mean_confidence(score), -tied.index(score)))
+        # Два псевдоголоса с долей «за» m: без них две согласные попытки всегда давали бы 0.75.
+        prior = mean_confidence(winner) if self.blend_model_confidence else 0.5
+        confidence = (top + 2 * prior) / (len(calls) + 2)
+
+        with self._lock:
+            self.total_samples += 1
+            self.total_calls += len(calls)
+
+        base = next(c for c in calls if int(c["pred_score"]) == winner)
+        return {
+            **base,
+            "pred_score": winner,
+            "confidence": round(confidence, 4),
+            "backend_name": self.name,
+            "model_name": self.model_name,
+            "raw_response": {
+                "strategy": "self_consistency",
+                "num_calls": len(calls),
+                "stopped_early": len(calls) < self.max_calls,
+                "votes": {str(score): count for score, count in sorted(votes.items())},
+                "calls": [
+                    {
+                        "pred_score": c.get("pred_score"),
+                        "confidence": c.get("confidence"),
+                        "comment": c.get("comment"),
+                        "raw_response": c.get("raw_response"),
+                    }
+                    for c in calls
+                ],
+            },
+        }
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,286 @@
+"""Бэкенд-имитатор провайдера LLM: задержки, 429, временные ошибки и таймауты для нагрузочных прогонов."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from statistics import NormalDist
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.backends.resilient import BackendTimeoutError, RetryableBackendError
+from backend.grading.rate_limit import TokenBucket
+from backend.grading.types import GradingResult, Sample
+
+_NORMAL = NormalDist()
+
+
+class RateLimitedError(RetryableBackendError):
+    """Провайдер ответил 429: превышен лимит запросов; retry_after — через сколько секунд появится квота."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message, retry_after=retry_after)
+
+
+class TransientBackendError(RetryableBackendError):
+    """Временный сбой провайдера (аналог 5xx)."""
+
+
+@dataclass(frozen=True)
+class SimulationProfile:
+    """
+    Поведение имитируемого провайдера.
+
+    Латентность — логнормальная: медиана latency_median секунд, разброс latency_sigma
+    (sigma логарифма). С вероятностью tail_probability вызов попадает в тяжёлый хвост
+    и умножается на tail_multiplier; max_latency обрезает итог. В grade_batch к
+    латентности добавляется per_item_latency на каждый пример пакета.
+
+    Сбои: error_rate — доля вызовов, завершающихся TransientBackendError; timeout_rate —
+    доля «зависших» вызовов, которые через hang_seconds падают с BackendTimeoutError.
+    Пропускная способность: rate_limit_rps (с запасом rate_limit_burst) отклоняет лишние
+    запросы с RateLimitedError; max_concurrency ставит лишние запросы в очередь, как
+    перегруженный провайдер. time_scale умножает все задержки (0.01 — прогон в 100 раз быстрее);
+    лимит запросов тоже считается в имитируемом времени, а retry_after возвращается в
+    реальных секундах. При time_scale=0 задержек нет, и лимит считается по реальному времени.
+    """
+
+    latency_median: float = 0.5
+    latency_sigma: float = 0.5
+    tail_probability: float = 0.0
+    tail_multiplier: float = 10.0
+    max_latency: float | None = None
+    per_item_latency: float = 0.0
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    hang_seconds: float = 30.0
+    rate_limit_rps: float | None = None
+    rate_limit_burst: int = 1
+    max_concurrency: int | None = None
+    time_scale: float = 1.0
+
+    def __post_init__(self) -> None:
+        for name in ("tail_probability", "error_rate", "timeout_rate"):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} должен быть в диапазоне [0, 1].")
+        if self.error_rate + self.timeout_rate > 1.0:
+            raise ValueError("Сумма error_rate и timeout_rate не может превышать 1.")
+        if self.latency_median < 0 or self.latency_sigma < 0 or self.time_scale < 0:
+            raise ValueError("latency_median, latency_sigma и time_scale должны быть неотрицательными.")
+        if self.rate_limit_rps is not None and self.rate_limit_rps <= 0:
+            raise ValueError("rate_limit_rps должен быть положительным.")
+        if self.max_concurrency is not None and self.max_concurrency <= 0:
+            raise ValueError("max_concurrency должен быть положительным.")
+
+
+@dataclass
+class SimulationStats:
+    calls: int = 0
+    successes: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    peak_concurrency: int = 0
+    simulated_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Draw(NamedTuple):
+    outcome: str
+    latency: float
+    attempt: int
+
+
+class SimulatedLLMBackend(DummyBackend):
+    """
+    DummyBackend с поведением реального провайдера (см. SimulationProfile).
+
+    Балл тот же, что у DummyBackend с тем же seed. Латентность и исход вызова тоже
+    выводятся из хэша (task_id, student_id, seed, номер попытки): n-я попытка данного
+    примера даёт один и тот же исход при любом порядке и параллелизме, а повтор того же
+    примера получает новый бросок, поэтому ResilientBackend и повторы пайплайна ведут себя
+    как с живым API. Итоговые счётчики сбоев совпадают между прогонами, только если число
+    попыток каждого примера не зависит от темпа: 429, очередь, таймауты и предохранитель
+    обёртки от него зависят.
+
+    Поддерживает grade, grade_batch и agrade (asyncio.sleep вместо time.sleep). Для
+    HTTP-режима передайте профиль в MockLLMServer(simulation=...). Счётчики вызовов и
+    сбоев доступны через stats().
+    """
+
+    name = "simulated_v1"
+    model_name = "simulated_v1"
+
+    def __init__(
+        self,
+        profile: SimulationProfile | None = None,
+        seed: Optional[str] = None,
+        base_confidence: float = 0.65,
+        noise: float = 0.2,
+    ):
+        super().__init__(seed=seed, base_confidence=base_confidence, noise=noise)
+        self.profile = profile or SimulationProfile()
+        self._attempts: Dict[Tuple[str, str], int] = {}
+        self._stats = SimulationStats()
+        self._in_flight = 0
+        self._init_runtime()
+
+    def _time_scale(self) -> float:
+        # Реальных секунд на одну имитируемую; при time_scale=0 время не сжимается.
+        return self.profile.time_scale if self.profile.time_scale > 0 else 1.0
+
+    def _simulated_clock(self) -> float:
+        return time.monotonic() / self._time_scale()
+
+    def _init_runtime(self) -> None:
+        profile = self.profile
+        self._lock = threading.Lock()
+        self._bucket = (
+            TokenBucket(profile.rate_limit_rps * 60, capacity=profile.rate_limit_burst, clock=self._simulated_clock)
+            if profile.rate_limit_rps is not None
+            else None
+        )
+        self._slots = threading.BoundedSemaphore(profile.max_concurrency) if profile.max_concurrency else None
+        # asyncio.Semaphore привязывается к event loop первого agrade, как клиент в HTTPGradingBackend.
+        self._async_slots: Optional[asyncio.Semaphore] = None
+
+    def stats(self) -> SimulationStats:
+        with self._lock:
+            return SimulationStats(**asdict(self._stats))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._attempts.clear()
+            self._stats = SimulationStats()
+
+    def _uniforms(self, sample: Sample, attempt: int) -> List[float]:
+        key = f"{sample['task_id']}|{sample['student_id']}|{self.seed}|{attempt}|sim"
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        # Середины интервалов: значения строго внутри (0, 1), inv_cdf их принимает.
+        return [(int.from_bytes(digest[idx : idx + 4], "big") + 0.5) / 2**32 for idx in range(0, 12, 4)]
+
+    def _draw(self, samples: Sequence[Sample]) -> _Draw:
+        """Исход и латентность вызова по первому примеру; пакет дополнительно платит per_item_latency."""
+        profile = self.profile
+        sample = samples[0]
+        key = (sample["task_id"], sample["student_id"])
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        u_latency, u_tail, u_outcome = self._uniforms(sample, attempt)
+
+        latency = profile.latency_median * math.exp(profile.latency_sigma * _NORMAL.inv_cdf(u_latency))
+        if u_tail < profile.tail_probability:
+            latency *= profile.tail_multiplier
+        latency += profile.per_item_latency * (len(samples) - 1)
+        if profile.max_latency is not None:
+            latency = min(latency, profile.max_latency)
+
+        if u_outcome < profile.timeout_rate:
+            return _Draw("timeout", profile.hang_seconds, attempt)
+        if u_outcome < profile.timeout_rate + profile.error_rate:
+            return _Draw("error", latency, attempt)
+        return _Draw("ok", latency, attempt)
+
+    def _admit(self) -> None:
+        with self._lock:
+            self._stats.calls += 1
+            if self._bucket is not None:
+                wait = self._bucket.try_acquire()
+                if wait > 0:
+                    self._stats.rate_limited += 1
+                    raise RateLimitedError(
+                        f"429: превышен лимит {self.profile.rate_limit_rps} запросов/с.", wait * self._time_scale()
+                    )
+
+    def _enter(self, seconds: float) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self._stats.peak_concurrency = max(self._stats.peak_concurrency, self._in_flight)
+            self._stats.simulated_seconds += seconds
+
+    def _leave(self, draw: _Draw) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if draw.outcome == "ok":
+                self._stats.successes += 1
+            elif draw.outcome == "error":
+                self._stats.errors += 1
+            else:
+                self._stats.timeouts += 1
+
+    def _finish(self, samples: Sequence[Sample], draw: _Draw) -> List[GradingResult]:
+        if draw.outcome == "timeout":
+            raise BackendTimeoutError(f"Провайдер не ответил за {draw.latency:.1f} с.")
+        if draw.outcome == "error":
+            raise TransientBackendError("503: провайдер временно недоступен.")
+        timestamp = datetime.now(tz=timezone.utc).isoformat()
+        results = self._build_results(samples, timestamp)
+        for result in results:
+            result["raw_response"]["simulation"] = {"latency": round(draw.latency, 4), "attempt": draw.attempt}
+        return results
+
+    def _call(self, samples: Sequence[Sample]) -> List[GradingResult]:
+        self._admit()
+        draw = self._draw(samples)
+        seconds = draw.latency * self.profile.time_scale
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            self._enter(draw.latency)
+            try:
+                if seconds > 0:
+                    time.sleep(seconds)
+            finally:
+                self._leave(draw)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+        return self._finish(samples, draw)
+
+    async def _acall(self, samples: Sequence[Sample]) -> List[GradingResult]:
+        self._admit()
+        draw = self._draw(samples)
+        seconds = draw.latency * self.profile.time_scale
+        if self.profile.max_concurrency and self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.profile.max_concurrency)
+        if self._async_slots is not None:
+            await self._async_slots.acquire()
+        try:
+            self._enter(draw.latency)
+            try:
+                if seconds > 0:
+                    await asyncio.sleep(seconds)
+            finally:
+                self._leave(draw)
+        finally:
+            if self._async_slots is not None:
+                self._async_slots.release()
+        return self._finish(samples, draw)
+
+    def grade(self, sample: Sample) -> GradingResult:
+        return self._call([sample])[0]
+
+    def grade_batch(self, samples: Sequence[Sample]) -> List[GradingResult]:
+        """Один «запрос» на пакет: общие латентность и исход, сбой роняет весь пакет."""
+        return self._call(samples) if samples else []
+
+    async def agrade(self, sample: Sample) -> GradingResult:
+        return (await self._acall([sample]))[0]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        for key in ("_lock", "_bucket", "_slots", "_async_slots"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._init_runtime()
@@ -0,0 +1,84 @@
+"""Разбиение примеров на микропакеты для пакетных вызовов бэкенда."""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from backend.grading.types import Sample
+
+
+def estimate_payload_bytes(sample: Sample) -> int:
+    """Приблизительный размер запроса: байты изображения плюс тексты в UTF-8."""
+    try:
+        image_bytes = os.path.getsize(sample["image_path"])
+    except OSError:
+        image_bytes = 0
+    text = sample["statement_text"] + sample["rubric_text"] + sample.get("solution_text", "")
+    return image_bytes + len(text.encode("utf-8"))
+
+
+class MicroBatchBuilder:
+    """
+    Пошаговая сборка микропакетов по правилам iter_micro_batches для потоковых прогонов.
+
+    add(sample, item) кладёт item в текущий пакет; если sample в него уже не помещается,
+    возвращает собранный пакет, а item открывает следующий. flush() отдаёт остаток.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int | None = None,
+        max_batch_bytes: int | None = None,
+        size_fn: Callable[[Sample], int] = estimate_payload_bytes,
+    ):
+        if max_batch_size is not None and max_batch_size <= 0:
+            raise ValueError("max_batch_size должен быть положительным.")
+        if max_batch_bytes is not None and max_batch_bytes <= 0:
+            raise ValueError("max_batch_bytes должен быть положительным.")
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.size_fn = size_fn
+        self._batch: List[Any] = []
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._batch)
+
+    def add(self, sample: Sample, item: Any) -> Optional[List[Any]]:
+        sample_bytes = self.size_fn(sample) if self.max_batch_bytes is not None else 0
+        full_by_count = self.max_batch_size is not None and len(self._batch) >= self.max_batch_size
+        full_by_bytes = (
+            self.max_batch_bytes is not None and self._batch and self._bytes + sample_bytes > self.max_batch_bytes
+        )
+        ready = self.flush() if full_by_count or full_by_bytes else None
+        self._batch.append(item)
+        self._bytes += sample_bytes
+        return ready
+
+    def flush(self) -> Optional[List[Any]]:
+        batch, self._batch, self._bytes = self._batch, [], 0
+        return batch or None
+
+
+def iter_micro_batches(
+    samples: Iterable[Sample],
+    max_batch_size: int | None = None,
+    max_batch_bytes: int | None = None,
+    size_fn: Callable[[Sample], int] = estimate_payload_bytes,
+) -> Iterator[List[Sample]]:
+    """
+    Жадно собирать пакеты, не превышающие max_batch_size примеров и max_batch_bytes байт.
+
+    Пример крупнее max_batch_bytes уходит отдельным пакетом из одного элемента.
+    Порядок примеров сохраняется.
+    """
+
+    builder = MicroBatchBuilder(max_batch_size, max_batch_bytes, size_fn)
+    for sample in samples:
+        batch = builder.add(sample, sample)
+        if batch is not None:
+            yield batch
+    batch = builder.flush()
+    if batch is not None:
+        yield batch
@@ -0,0 +1,288 @@
+"""Бенчмарк пайплайна на синтетических задачах: пропускная способность и пиковая память по этапам."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from backend.analysis.metrics import (
+    accuracy,
+    accuracy_at_confidence,
+    mae,
+    quadratic_weighted_kappa,
+    reliability_curve,
+    risk_coverage_curve,
+)
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.demo import generate_dummy_task
+from backend.grading.io_utils import iter_labels, load_samples, resolve_image_path, save_results_jsonl
+from backend.grading.pipeline import grade_dataset
+
+DEFAULT_SIZES = (10_000, 100_000)
+DEFAULT_RESULTS_DIR = Path("results")
+
+METRICS: Dict[str, Callable] = {
+    "accuracy": accuracy,
+    "mae": mae,
+    "quadratic_weighted_kappa": quadratic_weighted_kappa,
+    "reliability_curve": reliability_curve,
+    "accuracy_at_confidence": lambda results: accuracy_at_confidence(results, 0.5),
+    "risk_coverage_curve": risk_coverage_curve,
+}
+
+
+@dataclass(frozen=True)
+class StageResult:
+    seconds: float
+    items_per_second: float
+    peak_memory_bytes: int | None
+
+
+@dataclass(frozen=True)
+class Regression:
+    num_students: int
+    stage: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+def measure_stage(
+    fn: Callable[[], object], num_items: int, repeat: int = 1, trace_memory: bool = True
+) -> Tuple[StageResult, object]:
+    """
+    Замерить этап: лучшее время из repeat прогонов и пик памяти отдельным прогоном.
+
+    Память меряется через tracemalloc в отдельном прогоне, потому что трассировка
+    замедляет аллокации и исказила бы время. Возвращает (замер, результат fn).
+    """
+
+    best = float("inf")
+    output = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        output = fn()
+        best = min(best, time.perf_counter() - start)
+
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    items_per_second = num_items / best if best > 0 else float("inf")
+    return StageResult(round(best, 6), round(items_per_second, 1), peak), output
+
+
+def _resolve_all(task_dir: Path) -> int:
+    images_root = task_dir / "images"
+    count = 0
+    for row in iter_labels(task_dir / "labels.csv"):
+        resolve_image_path(images_root, str(row["student_id"]).zfill(4), row)
+        count += 1
+    return count
+
+
+def benchmark_size(
+    num_students: int, work_dir: Path, repeat: int = 1, trace_memory: bool = True
+) -> Dict[str, StageResult]:
+    """Сгенерировать задачу на num_students учеников и замерить все этапы по порядку."""
+
+    task_dir = generate_dummy_task(work_dir / f"bench_{num_students}", num_samples=num_students, seed=0)
+    backend = DummyBackend(seed="benchmark")
+    stages: Dict[str, StageResult] = {}
+
+    stages["load_samples"], samples = measure_stage(
+        lambda: load_samples(task_dir), num_students, repeat, trace_memory
+    )
+    stages["resolve_image_path"], _ = measure_stage(
+        lambda: _resolve_all(task_dir), num_students, repeat, trace_memory
+    )
+    stages["grade_dataset"], results = measure_stage(
+        lambda: grade_dataset(samples, backend, experiment_name="benchmark"), num_students, repeat, trace_memory
+    )
+    output_path = work_dir / f"bench_{num_students}.jsonl"
+    stages["save_results_jsonl"], _ = measure_stage(
+        lambda: save_results_jsonl(results, output_path), num_students, repeat, trace_memory
+    )
+    for name, metric in METRICS.items():
+        stages[f"metrics.{name}"], _ = measure_stage(lambda: metric(results), num_students, repeat, trace_memory)
+    return stages
+
+
+def run_benchmark(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    work_dir: Path | None = None,
+    repeat: int = 1,
+    trace_memory: bool = True,
+) -> dict:
+    """
+    Прогнать бенчмарк для каждого размера задачи и вернуть отчёт (см. save_report).
+
+    Синтетические задачи создаются в work_dir (по умолчанию во временном каталоге,
+    который удаляется после прогона).
+    """
+
+    if not sizes or any(size <= 0 for size in sizes):
+        raise ValueError("Размеры задач должны быть положительными.")
+
+    def run_all(root: Path) -> List[dict]:
+        return [
+            {
+                "num_students": size,
+                "stages": {
+                    name: asdict(stage)
+                    for name, stage in benchmark_size(size, root, repeat, trace_memory).items()
+                },
+            }
+            for size in sizes
+        ]
+
+    if work_dir is not None:
+        work_dir.mkdir(parents=True, exist_ok=True)
+        runs = run_all(work_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="grading-bench-") as tmp:
+            runs = run_all(Path(tmp))
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "runs": runs,
+    }
+
+
+def save_report(report: dict, output_path: Path | None = None, results_dir: Path = DEFAULT_RESULTS_DIR) -> Path:
+    if output_path is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output_path = results_dir / f"benchmark_{stamp}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return output_path
+
+
+def load_report(path: Path) -> dict:
+    if not path.exists():
+        raise FileNotFoundError(f"Не найден отчёт бенчмарка: {path}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def compare_reports(
+    current: dict,
+    baseline: dict,
+    max_slowdown: float = 0.2,
+    max_memory_growth: float = 0.2,
+    min_seconds: float = 0.01,
+) -> List[Regression]:
+    """
+    Найти регрессии относительно базового отчёта.
+
+    Этап регрессировал, если его время выросло больше чем на max_slowdown (доля) или пик
+    памяти — больше чем на max_memory_growth. Этапы быстрее min_seconds в обоих отчётах
+    по времени не сравниваются: там доминирует шум. Сравниваются только размеры и этапы,
+    присутствующие в обоих отчётах.
+    """
+
+    baseline_runs = {run["num_students"]: run["stages"] for run in baseline["runs"]}
+    regressions = []
+    for run in current["runs"]:
+        base_stages = baseline_runs.get(run["num_students"])
+        if base_stages is None:
+            continue
+        for name, stage in run["stages"].items():
+            base = base_stages.get(name)
+            if base is None:
+                continue
+            if max(stage["seconds"], base["seconds"]) >= min_seconds and stage["seconds"] > base["seconds"] * (
+                1 + max_slowdown
+            ):
+                regressions.append(
+                    Regression(run["num_students"], name, "seconds", base["seconds"], stage["seconds"])
+                )
+            cur_mem, base_mem = stage.get("peak_memory_bytes"), base.get("peak_memory_bytes")
+            if cur_mem is not None and base_mem is not None and cur_mem > base_mem * (1 + max_memory_growth):
+                regressions.append(
+                    Regression(run["num_students"], name, "peak_memory_bytes", base_mem, cur_mem)
+                )
+    return regressions
+
+
+def format_report(report: dict) -> str:
+    lines = []
+    for run in report["runs"]:
+        lines.append(f"Учеников: {run['num_students']}")
+        for name, stage in run["stages"].items():
+            memory = stage["peak_memory_bytes"]
+            memory_text = f"{memory / 2**20:9.1f} МиБ" if memory is not None else "        —"
+            lines.append(
+                f"  {name:<36} {stage['seconds']:10.4f} с {stage['items_per_second']:14.0f} шт/с {memory_text}"
+            )
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Бенчмарк пайплайна на синтетических задачах.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="прогнать бенчмарк и сохранить JSON-отчёт")
+    run.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--no-memory", action="store_true", help="не замерять пик памяти")
+    run.add_argument("--work-dir", type=Path, default=None)
+    run.add_argument("--output", type=Path, default=None)
+    run.add_argument("--baseline", type=Path, default=None, help="сразу сравнить с базовым отчётом")
+
+    compare = sub.add_parser("compare", help="сравнить отчёт с базовым")
+    compare.add_argument("current", type=Path)
+    compare.add_argument("baseline", type=Path)
+
+    for sub_parser in (run, compare):
+        sub_parser.add_argument("--max-slowdown", type=float, default=0.2)
+        sub_parser.add_argument("--max-memory-growth", type=float, default=0.2)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        report = run_benchmark(args.sizes, args.work_dir, args.repeat, trace_memory=not args.no_memory)
+        path = save_report(report, args.output)
+        print(format_report(report))
+        print(f"Отчёт сохранён в: {path}")
+        if args.baseline is None:
+            return 0
+        baseline = load_report(args.baseline)
+    else:
+        report, baseline = load_report(args.current), load_report(args.baseline)
+
+    regressions = compare_reports(report, baseline, args.max_slowdown, args.max_memory_growth)
+    for reg in regressions:
+        print(
+            f"РЕГРЕССИЯ {reg.num_students} {reg.stage} {reg.metric}: "
+            f"{reg.baseline:g} -> {reg.current:g} (x{reg.ratio:.2f})"
+        )
+    if not regressions:
+        print("Регрессий нет.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+"""Сжатое хранилище крупных полей результата (raw_response, comment) рядом с JSONL."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import lzma
+import os
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, NamedTuple, Sequence
+
+BLOB_FIELDS = ("raw_response", "comment")
+BLOB_REF_KEY = "$blob"
+# Значения короче ссылки выносить нет смысла: они остаются в строке JSONL.
+BLOB_MIN_BYTES = 64
+_CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+
+class _Entry(NamedTuple):
+    offset: int
+    length: int
+    codec: str
+
+
+def blob_path(jsonl_path: Path) -> Path:
+    """Файл блобов для JSONL: results/<experiment>.blobs (индекс — <experiment>.blobs.idx)."""
+    return jsonl_path.with_suffix(".blobs")
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and BLOB_REF_KEY in value
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+class BlobStore:
+    """
+    Хранилище значений с дедупликацией по содержимому.
+
+    Значение кодируется в канонический JSON, ключ — первые 32 hex-символа его sha256.
+    Повторное значение не пишется второй раз. Сжатые кадры (zlib или lzma) дописываются
+    в <name>.blobs, а строка индекса {key, offset, length, codec} — в <name>.blobs.idx.
+    Индекс читается при открытии. Недописанная последняя строка индекса после падения
+    отрезается (как в read_completed_ids), и её кадр будет записан заново.
+    read_only=True открывает хранилище только на чтение: индекс и данные не меняются.
+
+    Файл данных открывается лениво, при первом чтении или записи: если ни одна ссылка
+    не раскрывается, хранилище не трогает диск, кроме индекса.
+    """
+
+    def __init__(self, path: Path, codec: str = "zlib", append: bool = True, read_only: bool = False):
+        if codec not in _CODECS:
+            raise ValueError(f"Неизвестный кодек блобов: {codec}. Доступны: {', '.join(_CODECS)}")
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.codec = codec
+        self.read_only = read_only
+        self._index: Dict[str, _Entry] = {}
+        self._data = None
+        self._index_file = None
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.deduplicated = 0
+        if read_only and not append:
+            raise ValueError("Хранилище только для чтения нельзя открыть с append=False.")
+        if not append:
+            for path in (self.path, self.index_path):
+                if path.exists():
+                    path.unlink()
+        elif self.index_path.exists():
+            self._read_index()
+
+    def _read_index(self) -> None:
+        if not self.read_only:
+            # io_utils импортирует blobs, поэтому импорт локальный.
+            from backend.grading.io_utils import _truncate_partial_tail
+
+            # Иначе следующая строка индекса приклеится к недописанной и тоже потеряется.
+            _truncate_partial_tail(self.index_path)
+        with self.index_path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._index[row["key"]] = _Entry(row["offset"], row["length"], row["codec"])
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def keys(self) -> Iterable[str]:
+        return self._index.keys()
+
+    def _open_data(self):
+        if self._data is None:
+            if self.read_only:
+                self._data = self.path.open("rb")
+            else:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._data = self.path.open("a+b")
+        return self._data
+
+    def _append_frame(self, key: str, frame: bytes, codec: str) -> None:
+        if self.read_only:
+            raise ValueError(f"Хранилище блобов {self.path} открыто только для чтения.")
+        data = self._open_data()
+        data.seek(0, os.SEEK_END)
+        offset = data.tell()
+        data.write(frame)
+        if self._index_file is None:
+            self._index_file = self.index_path.open("a", encoding="utf-8")
+        entry = {"key": key, "offset": offset, "length": len(frame), "codec": codec}
+        self._index_file.write(json.dumps(entry) + "\n")
+        self._index[key] = _Entry(offset, len(frame), codec)
+        self.stored_bytes += len(frame)
+
+    def put(self, value: Any) -> str:
+        """Сохранить значение и вернуть его ключ."""
+        encoded = _encode(value)
+        key = hashlib.sha256(encoded).hexdigest()[:32]
+        self.raw_bytes += len(encoded)
+        if key in self._index:
+            self.deduplicated += 1
+            return key
+        self._append_frame(key, _CODECS[self.codec][0](encoded), self.codec)
+        return key
+
+    def get(self, key: str) -> Any:
+        entry = self._index.get(key)
+        if entry is None:
+            raise KeyError(f"Блоб {key} не найден в {self.path}")
+        data = self._open_data()
+        data.seek(entry.offset)
+        return json.loads(_CODECS[entry.codec][1](data.read(entry.length)))
+
+    def extract(self, row: dict, fields: Sequence[str] = BLOB_FIELDS) -> dict:
+        """Копия строки, где крупные значения полей fields заменены ссылками {"$blob": key}."""
+        out = dict(row)
+        for field in fields:
+            value = out.get(field)
+            if value is None or is_blob_ref(value):
+                continue
+            if len(_encode(value)) < BLOB_MIN_BYTES:
+                continue
+            out[field] = {BLOB_REF_KEY: self.put(value)}
+        return out
+
+    def payload(self, row: dict, field: str) -> Any:
+        """Полное значение поля: по ссылке из хранилища или как есть, если оно осталось в строке."""
+        value = row.get(field)
+        return self.get(value[BLOB_REF_KEY]) if is_blob_ref(value) else value
+
+    def resolve(self, row: dict, fields: Sequence[str] = BLOB_FIELDS) -> dict:
+        """Копия строки со всеми ссылками fields, раскрытыми в полные значения."""
+        return {**row, **{field: self.payload(row, field) for field in fields if field in row}}
+
+    def merge(self, other: "BlobStore") -> int:
+        """Добавить кадры другого хранилища без пересжатия; возвращает число новых ключей."""
+        added = 0
+        source = other._open_data()
+        for key, entry in other._index.items():
+            if key in self._index:
+                continue
+            source.seek(entry.offset)
+            self._append_frame(key, source.read(entry.length), entry.codec)
+            added += 1
+        return added
+
+    def flush(self, fsync: bool = False) -> None:
+        # Сначала данные, потом индекс: строка индекса не должна ссылаться на недописанный кадр.
+        for f in (self._data, self._index_file):
+            if f is not None:
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        for f in (self._data, self._index_file):
+            if f is not None:
+                f.close()
+        self._data = self._index_file = None
+
+    def __enter__(self) -> "BlobStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def open_blob_store(jsonl_path: Path) -> BlobStore:
+    """Открыть хранилище блобов, записанное рядом с JSONL (для раскрытия ссылок в строках)."""
+    path = blob_path(Path(jsonl_path))
+    if not path.with_name(path.name + ".idx").exists():
+        raise FileNotFoundError(f"Не найдено хранилище блобов: {path}")
+    return BlobStore(path, read_only=True)
+
+
+def merge_blob_stores(jsonl_paths: Sequence[Path], output_path: Path) -> Path | None:
+    """
+    Объединить хранилища блобов при склейке JSONL (см. runner.merge_results).
+
+    Ключи зависят только от содержимого, поэтому ссылки в склеенных строках остаются
+    верными без переписывания. Возвращает путь к файлу блобов или None, если ни у
+    одного JSONL хранилища нет.
+    """
+    sources = [blob_path(path) for path in jsonl_paths]
+    sources = [path for path in sources if path.with_name(path.name + ".idx").exists()]
+    if not sources:
+        return None
+    with BlobStore(blob_path(output_path), append=False) as merged:
+        for source in sources:
+            with BlobStore(source, read_only=True) as store:
+                merged.merge(store)
+    return merged.path
@@ -0,0 +1,203 @@
+"""Персистентный кэш результатов проверки, адресуемый по содержимому запроса."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from backend.grading.types import GradingBackend, GradingResult, Sample
+
+DEFAULT_CACHE_PATH = Path("results") / "grading_cache.sqlite3"
+_EVICT_EVERY = 256
+
+
+def file_digest(path: Path | str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 содержимого файла; читаем кусками, чтобы не держать скан целиком в памяти."""
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def backend_config(backend: GradingBackend) -> Dict[str, object]:
+    """
+    Конфигурация бэкенда, влияющая на ответ.
+
+    Если бэкенд определяет cache_config(), используется она; иначе берутся публичные
+    атрибуты экземпляра простых типов (для DummyBackend это seed, base_confidence, noise).
+    """
+
+    custom = getattr(backend, "cache_config", None)
+    if callable(custom):
+        return dict(custom())
+    return {
+        key: value
+        for key, value in sorted(vars(backend).items())
+        if not key.startswith("_") and isinstance(value, (str, int, float, bool, type(None)))
+    }
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class GradingCache:
+    """
+    SQLite-кэш сырых ответов бэкенда между экспериментами.
+
+    Ключ — хэш идентификаторов ученика и задачи, байтов изображения, условия, критериев,
+    решения, имени бэкенда, модели и его конфигурации. Идентификаторы входят в ключ, потому
+    что ответ бэкенда содержит их (и DummyBackend от них зависит); совпадающие сканы
+    разных учеников так не склеиваются. Вытеснение: записи старше max_age_seconds и, сверх max_entries
+    или max_bytes, давно не использованные (LRU по времени последнего обращения).
+    Результаты с полем error не кэшируются.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_CACHE_PATH,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_age_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.stats = CacheStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.commit()
+
+    def key_for(self, sample: Sample, backend: GradingBackend) -> str:
+        image_hash = sample.get("image_sha256")
+        if not image_hash:
+            image_path = Path(sample["image_path"])
+            image_hash = file_digest(image_path) if image_path.exists() else f"missing:{image_path}"
+        parts = {
+            "task_id": sample["task_id"],
+            "student_id": sample["student_id"],
+            "image": image_hash,
+            "statement": sample["statement_text"],
+            "rubric": sample["rubric_text"],
+            "solution": sample.get("solution_text", ""),
+            # Имя payload содержит отпечаток конфигурации предобработки: другой ресайз — другой ответ.
+            "payload": Path(sample["payload_path"]).name if sample.get("payload_path") else "",
+            "backend": backend.name,
+            "model": getattr(backend, "model_name", backend.name),
+            "config": backend_config(backend),
+        }
+        encoded = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[GradingResult]:
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute("SELECT payload, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.max_age_seconds is not None and now - row[1] > self.max_age_seconds:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.evictions += 1
+                row = None
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: GradingResult) -> None:
+        if "error" in result:
+            return
+        payload = json.dumps(result, ensure_ascii=False, default=str)
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, payload, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+            self.stats.writes += 1
+            self._writes_since_evict += 1
+            should_evict = self._writes_since_evict >= _EVICT_EVERY
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Применить ограничения по возрасту и размеру; вернуть число удалённых записей."""
+        removed = 0
+        with self._lock:
+            self._writes_since_evict = 0
+            if self.max_age_seconds is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM results WHERE created < ?", (self._clock() - self.max_age_seconds,)
+                )
+                removed += cursor.rowcount
+            if self.max_entries is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    " SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                removed += cursor.rowcount
+            if self.max_bytes is not None:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+                if total > self.max_bytes:
+                    victims = []
+                    for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY accessed ASC"):
+                        if total <= self.max_bytes:
+                            break
+                        victims.append((key,))
+                        total -= size
+                    self._conn.executemany("DELETE FROM results WHERE key = ?", victims)
+                    removed += len(victims)
+            self._conn.commit()
+            self.stats.evictions += removed
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self) -> None:
+        self.evict()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "GradingCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
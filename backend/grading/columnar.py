@@ -0,0 +1,138 @@
+"""Колоночное хранилище результатов рядом с JSONL: .npy-файлы, которые читаются через memmap."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from backend.grading.types import GradingResult
+
+COLUMNAR_FORMAT = "makkaing-columns"
+COLUMNAR_VERSION = 1
+COLUMNAR_SUFFIX = ".columns"
+# Числовые колонки и их dtype на диске; error — флаг строки с ошибкой бэкенда.
+NUMERIC_COLUMNS = {
+    "pred_score": "int32",
+    "true_score": "int32",
+    "max_score": "int32",
+    "confidence": "float64",
+    "error": "bool",
+}
+CATEGORICAL_COLUMNS = ("task_id", "student_id", "backend_name", "experiment_name")
+_ARRAY_TYPECODES = {"int32": "i", "float64": "d", "bool": "b"}
+
+
+def columnar_path(jsonl_path: Path) -> Path:
+    """Каталог колонок для JSONL: results/<experiment>.columns рядом с <experiment>.jsonl."""
+    return jsonl_path.with_suffix(COLUMNAR_SUFFIX)
+
+
+class ColumnarResultWriter:
+    """
+    Накопление результатов в колонки и запись каталога output_dir при close().
+
+    Раскладка каталога:
+      meta.json              — формат, версия, число строк, dtype колонок;
+      <числовая>.npy         — pred_score, true_score, max_score, confidence, error;
+      <категория>.codes.npy  — int32-коды task_id, student_id, backend_name, experiment_name;
+      <категория>.values.json — словарь кодов (значение по индексу кода).
+    Каталог пишется во временный и подменяется целиком, поэтому читатель не увидит половину.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self._numeric: Dict[str, array] = {
+            name: array(_ARRAY_TYPECODES[dtype]) for name, dtype in NUMERIC_COLUMNS.items()
+        }
+        self._codes: Dict[str, array] = {name: array("i") for name in CATEGORICAL_COLUMNS}
+        self._dictionaries: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL_COLUMNS}
+        self.written = 0
+        self._closed = False
+
+    def write(self, result: GradingResult) -> None:
+        numeric = self._numeric
+        numeric["pred_score"].append(int(result.get("pred_score", 0)))
+        numeric["true_score"].append(int(result["true_score"]))
+        numeric["max_score"].append(int(result["max_score"]))
+        numeric["confidence"].append(float(result.get("confidence", 0.0)))
+        numeric["error"].append(1 if result.get("error") else 0)
+        for name in CATEGORICAL_COLUMNS:
+            dictionary = self._dictionaries[name]
+            value = str(result.get(name, ""))
+            code = dictionary.get(value)
+            if code is None:
+                code = dictionary[value] = len(dictionary)
+            self._codes[name].append(code)
+        self.written += 1
+
+    def close(self) -> Path:
+        if self._closed:
+            return self.output_dir
+        self._closed = True
+        tmp_dir = self.output_dir.with_name(f"{self.output_dir.name}.{os.getpid()}.tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        for name, dtype in NUMERIC_COLUMNS.items():
+            np.save(tmp_dir / f"{name}.npy", np.frombuffer(self._numeric[name], dtype=_buffer_dtype(dtype)).astype(dtype))
+        for name in CATEGORICAL_COLUMNS:
+            np.save(tmp_dir / f"{name}.codes.npy", np.frombuffer(self._codes[name], dtype=np.int32))
+            values: List[str] = list(self._dictionaries[name])
+            (tmp_dir / f"{name}.values.json").write_text(json.dumps(values, ensure_ascii=False), encoding="utf-8")
+        meta = {
+            "format": COLUMNAR_FORMAT,
+            "version": COLUMNAR_VERSION,
+            "rows": self.written,
+            "numeric": NUMERIC_COLUMNS,
+            "categorical": list(CATEGORICAL_COLUMNS),
+        }
+        (tmp_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        os.replace(tmp_dir, self.output_dir)
+        return self.output_dir
+
+    def __enter__(self) -> "ColumnarResultWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+
+
+def _buffer_dtype(dtype: str) -> str:
+    # array('b') хранит флаги как int8; остальные типы совпадают с dtype на диске.
+    return "int8" if dtype == "bool" else dtype
+
+
+def save_results_columnar(results: Iterable[GradingResult], output_dir: Path) -> Path:
+    """Колоночный аналог save_results_jsonl (см. ColumnarResultWriter)."""
+    with ColumnarResultWriter(output_dir) as writer:
+        for result in results:
+            writer.write(result)
+    return writer.output_dir
+
+
+def jsonl_to_columnar(jsonl_path: Path, output_dir: Path | None = None) -> Path:
+    """Построить колонки по готовому JSONL (например, после дозаписи с resume=True)."""
+    if not jsonl_path.exists():
+        raise FileNotFoundError(f"Не найден файл с результатами: {jsonl_path}")
+    with ColumnarResultWriter(output_dir or columnar_path(jsonl_path)) as writer, jsonl_path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # Недописанная строка после аварийной остановки — её перепроверит resume.
+                continue
+            writer.write(row)
+    return writer.output_dir
@@ -0,0 +1,193 @@
+"""Поиск одинаковых и почти одинаковых сканов внутри задачи: проверяем один, результат размножаем."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from backend.grading.cache import file_digest
+from backend.grading.preprocess import _require_pillow
+from backend.grading.types import Sample
+
+
+@dataclass(frozen=True)
+class DedupConfig:
+    """
+    Параметры поиска дубликатов.
+
+    По умолчанию объединяются только сканы с побайтно одинаковым содержимым.
+    perceptual=True добавляет почти одинаковые сканы (пересжатие, масштаб, яркость):
+    кандидаты ищутся по перцептивному хэшу (hash_size * hash_size бит, расстояние
+    Хэмминга не больше max_distance), но каждая пара подтверждается сравнением миниатюр
+    thumbnail_size x thumbnail_size: после поправки на яркость и контраст ни один блок 4x4
+    не должен отличаться больше чем на confirm_tolerance уровней серого. Хэш пустого
+    бланка одинаков у всех учеников, поэтому без подтверждения разные короткие ответы
+    на одной форме склеились бы в одну группу. max_workers > 1 считает хэши в пуле процессов.
+    """
+
+    max_distance: int = 4
+    hash_size: int = 8
+    perceptual: bool = False
+    thumbnail_size: int = 128
+    confirm_tolerance: float = 12.0
+    max_workers: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.max_distance < 0 or self.hash_size <= 0:
+            raise ValueError("max_distance должен быть неотрицательным, hash_size — положительным.")
+        if self.thumbnail_size <= 0 or self.thumbnail_size % _BLOCK or self.confirm_tolerance < 0:
+            raise ValueError(
+                f"thumbnail_size должен быть положительным и кратным {_BLOCK}, confirm_tolerance — неотрицательным."
+            )
+
+
+_BLOCK = 4
+
+
+def _open_gray(path: str):
+    from PIL import Image, ImageOps
+
+    image = Image.open(path)
+    return ImageOps.exif_transpose(image).convert("L")
+
+
+def perceptual_hash(path: str, hash_size: int = 8) -> int | None:
+    """
+    Разностный хэш (dHash): знаки горизонтальных градиентов уменьшенного серого скана.
+
+    Устойчив к пересжатию, масштабу и небольшим изменениям яркости. Для файла, который
+    не удалось декодировать как изображение, возвращает None.
+    """
+
+    _require_pillow()
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = _open_gray(path).resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+        pixels = np.asarray(image, dtype=np.int16)
+    except (UnidentifiedImageError, OSError):
+        return None
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def block_thumbnail(path: str, size: int = 128) -> np.ndarray | None:
+    """Средние яркости блоков 4x4 миниатюры size x size (float32) или None для нечитаемого файла."""
+
+    _require_pillow()
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        pixels = np.asarray(_open_gray(path).resize((size, size), Image.Resampling.BOX), dtype=np.float32)
+    except (UnidentifiedImageError, OSError):
+        return None
+    cells = size // _BLOCK
+    return pixels.reshape(cells, _BLOCK, cells, _BLOCK).mean(axis=(1, 3))
+
+
+def thumbnails_match(a: np.ndarray, b: np.ndarray, tolerance: float) -> bool:
+    """
+    Совпадение миниатюр с точностью до яркости и контраста.
+
+    b линейно подгоняется к a методом наименьших квадратов. Совпадение — если ни один
+    блок не отклоняется от подгонки больше чем на tolerance.
+    """
+    design = np.stack([b.ravel(), np.ones(b.size, dtype=b.dtype)], axis=1)
+    coef, *_ = np.linalg.lstsq(design, a.ravel(), rcond=None)
+    return float(np.abs(a.ravel() - design @ coef).max()) <= tolerance
+
+
+class _BandIndex:
+    """
+    Корзины (полоса, значение полосы) для поиска хэшей на расстоянии <= max_distance.
+
+    Хэш делится на max_distance + 1 полос: по принципу Дирихле у близких хэшей хотя бы
+    одна полоса совпадает целиком, поэтому сравнивать нужно только хэши из общих корзин.
+    """
+
+    def __init__(self, num_bits: int, max_distance: int):
+        bands = min(max_distance + 1, num_bits)
+        bounds = [round(num_bits * band / bands) for band in range(bands + 1)]
+        self._bands = [(bounds[b], (1 << (bounds[b + 1] - bounds[b])) - 1) for b in range(bands)]
+        self._buckets: Dict[Tuple[int, int], List[int]] = {}
+
+    def _keys(self, value: int) -> Iterator[Tuple[int, int]]:
+        for band, (shift, mask) in enumerate(self._bands):
+            yield band, (value >> shift) & mask
+
+    def add(self, idx: int, value: int) -> None:
+        for key in self._keys(value):
+            self._buckets.setdefault(key, []).append(idx)
+
+    def candidates(self, value: int) -> List[int]:
+        found = {idx for key in self._keys(value) for idx in self._buckets.get(key, ())}
+        return sorted(found)
+
+
+def _perceptual_hashes(paths: List[str], config: DedupConfig) -> List[int | None]:
+    if config.max_workers is not None and config.max_workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=config.max_workers) as pool:
+            chunksize = max(1, len(paths) // (config.max_workers * 4))
+            return list(pool.map(perceptual_hash, paths, [config.hash_size] * len(paths), chunksize=chunksize))
+    return [perceptual_hash(path, config.hash_size) for path in paths]
+
+
+def find_duplicates(samples: Sequence[Sample], config: DedupConfig | None = None) -> List[int]:
+    """
+    Для каждого примера — индекс представителя его группы дубликатов (свой индекс, если он уникален).
+
+    Группы не пересекают границы задач (task_id). Сначала примеры объединяются по точному
+    хэшу содержимого (image_sha256 из манифеста или sha256 файла). С perceptual=True
+    представители точных групп в порядке входа сравниваются только с уже выбранными
+    представителями своей задачи: кандидат с близким хэшем присоединяется к ближайшему
+    представителю, чьи миниатюры подтверждают совпадение, иначе сам становится
+    представителем. Цепочки не склеиваются: каждый дубликат близок к своему представителю
+    напрямую. Представитель — первый пример группы во входном порядке.
+    """
+
+    config = config or DedupConfig()
+    representatives = list(range(len(samples)))
+    first_by_content: Dict[Tuple[str, str], int] = {}
+    for idx, sample in enumerate(samples):
+        key = (sample["task_id"], sample.get("image_sha256") or file_digest(sample["image_path"]))
+        if key in first_by_content:
+            representatives[idx] = first_by_content[key]
+        else:
+            first_by_content[key] = idx
+
+    if config.perceptual and first_by_content:
+        candidates = list(first_by_content.values())
+        hashes = dict(zip(candidates, _perceptual_hashes([samples[idx]["image_path"] for idx in candidates], config)))
+        thumbnails: Dict[int, np.ndarray | None] = {}
+
+        def thumbnail(idx: int) -> np.ndarray | None:
+            if idx not in thumbnails:
+                thumbnails[idx] = block_thumbnail(samples[idx]["image_path"], config.thumbnail_size)
+            return thumbnails[idx]
+
+        num_bits = config.hash_size * config.hash_size
+        indexes: Dict[str, _BandIndex] = {}
+        perceptual_rep: Dict[int, int] = {}
+        for idx in candidates:
+            value = hashes[idx]
+            if value is None:
+                continue
+            index = indexes.setdefault(samples[idx]["task_id"], _BandIndex(num_bits, config.max_distance))
+            near = sorted(
+                (distance, rep)
+                for rep in index.candidates(value)
+                if (distance := (hashes[rep] ^ value).bit_count()) <= config.max_distance  # type: ignore[operator]
+            )
+            for _, rep in near:
+                a, b = thumbnail(idx), thumbnail(rep)
+                if a is not None and b is not None and thumbnails_match(a, b, config.confirm_tolerance):
+                    perceptual_rep[idx] = rep
+                    break
+            else:
+                index.add(idx, value)
+        representatives = [perceptual_rep.get(rep, rep) for rep in representatives]
+
+    return representatives
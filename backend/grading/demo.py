@@ -10,13 +10,18 @@ from backend.grading.backends.dummy_backend import DummyBackend
 from backend.grading.pipeline import run_task_directory
 
 
-def generate_dummy_task(task_dir: Path, num_samples: int = 5, max_score: int = 3) -> Path:
+def generate_dummy_task(
+    task_dir: Path, num_samples: int = 5, max_score: int = 3, seed: int | None = None
+) -> Path:
     """
     Создаёт минимальный набор данных с синтетическими метками и заглушками изображений.
 
     Вместо реальных картинок используются текстовые файлы, чтобы не тянуть зависимости.
+    seed фиксирует истинные баллы (нужно для воспроизводимых бенчмарков).
     """
 
+    rng = random.Random(seed) if seed is not None else random
+
     task_dir = task_dir.resolve()
     images_dir = task_dir / "images"
     images_dir.mkdir(parents=True, exist_ok=True)
@@ -31,7 +36,7 @@ def generate_dummy_task(task_dir: Path, num_samples: int = 5, max_score: int = 3
     rows = ["student_id,true_score,max_score,image_filename"]
     for idx in range(1, num_samples + 1):
         student_id = f"{idx:04d}"
-        true_score = random.randint(0, max_score)
+        true_score = rng.randint(0, max_score)
         filename = f"student_{student_id}.png"
         rows.append(f"{student_id},{true_score},{max_score},{filename}")
         (images_dir / filename).write_text("placeholder image bytes", encoding="utf-8")
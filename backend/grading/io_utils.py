@@ -4,9 +4,15 @@ from __future__ import annotations
 
 import csv
 import json
+import os
+import time
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
 
+from backend.grading.blobs import BLOB_FIELDS, BlobStore, blob_path
+from backend.grading.manifest import TaskManifest, image_candidates, load_or_build_manifest
+from backend.grading.sharding import Shard, shard_index, validate_shard
+from backend.grading.telemetry import Recorder
 from backend.grading.types import GradingResult, Sample
 
 
@@ -16,7 +22,8 @@ def read_text_file(path: Path) -> str:
     return path.read_text(encoding="utf-8").strip()
 
 
-def load_labels(labels_path: Path) -> List[dict]:
+def iter_labels(labels_path: Path) -> Iterator[dict]:
+    """Построчно читать labels.csv, не загружая файл целиком."""
     if not labels_path.exists():
         raise FileNotFoundError(f"Не найден labels.csv по пути {labels_path}")
 
@@ -26,33 +33,15 @@ def load_labels(labels_path: Path) -> List[dict]:
         missing = required - set(reader.fieldnames or [])
         if missing:
             raise ValueError(f"В labels.csv отсутствуют обязательные колонки: {missing}")
+        yield from reader
 
-        labels: List[dict] = []
-        for row in reader:
-            labels.append(row)
-    return labels
 
+def load_labels(labels_path: Path) -> List[dict]:
+    return list(iter_labels(labels_path))
 
-def resolve_image_path(image_root: Path, student_id: str, row: dict) -> Path:
-    candidates = [
-        row.get("image"),
-        row.get("image_filename"),
-        row.get("image_path"),
-    ]
-
-    # Дополнительные варианты имени файла, если в CSV нет явного пути.
-    candidates.extend(
-        [
-            f"student_{student_id}.png",
-            f"{student_id}.png",
-            f"student_{student_id}.jpg",
-            f"{student_id}.jpg",
-        ]
-    )
 
-    for candidate in candidates:
-        if not candidate:
-            continue
+def resolve_image_path(image_root: Path, student_id: str, row: dict) -> Path:
+    for candidate in image_candidates(student_id, row):
         candidate_path = (image_root / candidate).resolve()
         if candidate_path.exists():
             return candidate_path
@@ -63,9 +52,16 @@ def resolve_image_path(image_root: Path, student_id: str, row: dict) -> Path:
     )
 
 
-def load_samples(task_dir: Path, labels_filename: str = "labels.csv") -> List[Sample]:
+def iter_samples(
+    task_dir: Path,
+    labels_filename: str = "labels.csv",
+    skip: Set[Tuple[str, str]] | None = None,
+    use_manifest: bool = False,
+    shard: Shard | None = None,
+    recorder: Recorder | None = None,
+) -> Iterator[Sample]:
     """
-    Загрузить список Sample из каталога задачи.
+    Лениво выдавать Sample из каталога задачи по одной строке labels.csv.
 
     Ожидаемая структура:
       task_dir/
@@ -73,21 +69,47 @@ def load_samples(task_dir: Path, labels_filename: str = "labels.csv") -> List[Sa
         rubric.txt
         labels.csv
         images/
+
+    Пары (task_id, student_id) из skip пропускаются до поиска изображения — так
+    возобновление прогона не тратит время на уже проверенных учеников.
+
+    С use_manifest=True пути берутся из task_dir/manifest.json (см. manifest.py), который
+    строится одним обходом images/, а в Sample добавляется image_sha256.
+    shard=(i, N) оставляет только учеников i-го из N шардов (см. sharding.shard_index).
+    С recorder время поиска изображения пишется в телеметрию как этап resolve, а остальная
+    подготовка примера (чтение labels.csv, пропуски, разбор строки) — как этап load; время
+    resolve в load не входит.
     """
 
+    if shard is not None:
+        validate_shard(shard)
+    clock = time.perf_counter
+    mark = clock() if recorder is not None else 0.0
+
     task_dir = task_dir.resolve()
     statement_text = read_text_file(task_dir / "statement.txt")
     rubric_text = read_text_file(task_dir / "rubric.txt")
-    labels = load_labels(task_dir / labels_filename)
     images_root = task_dir / "images"
+    manifest: TaskManifest | None = load_or_build_manifest(task_dir) if use_manifest else None
 
-    samples: List[Sample] = []
-    for row in labels:
+    for row in iter_labels(task_dir / labels_filename):
         student_id = str(row["student_id"]).zfill(4)
+        if skip and (task_dir.name, student_id) in skip:
+            continue
+        if shard is not None and shard_index(task_dir.name, student_id, shard[1]) != shard[0]:
+            continue
         true_score = int(row["true_score"])
         max_score = int(row["max_score"])
 
-        image_path = resolve_image_path(images_root, student_id, row)
+        start = clock() if recorder is not None else 0.0
+        entry = manifest.lookup(student_id, row) if manifest is not None else None
+        if entry is not None:
+            image_path = manifest.absolute_path(entry)
+        else:
+            image_path = resolve_image_path(images_root, student_id, row)
+        resolved = clock() - start if recorder is not None else 0.0
+        if recorder is not None:
+            recorder.observe("resolve", resolved)
 
         sample: Sample = {
             "task_id": task_dir.name,
@@ -98,6 +120,8 @@ def load_samples(task_dir: Path, labels_filename: str = "labels.csv") -> List[Sa
             "true_score": true_score,
             "max_score": max_score,
         }
+        if entry is not None and entry.sha256:
+            sample["image_sha256"] = entry.sha256
 
         if "solution_text" in row and row["solution_text"]:
             sample["solution_text"] = row["solution_text"]
@@ -107,16 +131,178 @@ def load_samples(task_dir: Path, labels_filename: str = "labels.csv") -> List[Sa
             except json.JSONDecodeError:
                 sample["meta"] = {"raw": row["meta"]}
 
-        samples.append(sample)
+        if recorder is not None:
+            recorder.observe("load", clock() - mark - resolved)
+        yield sample
+        # Время, пока потребитель обрабатывает пример, к загрузке не относится.
+        mark = clock() if recorder is not None else 0.0
+
+
+def load_samples(task_dir: Path, labels_filename: str = "labels.csv", use_manifest: bool = False) -> List[Sample]:
+    """Загрузить список Sample из каталога задачи (см. iter_samples)."""
+    return list(iter_samples(task_dir, labels_filename=labels_filename, use_manifest=use_manifest))
+
+
+class JsonlResultWriter:
+    """
+    Построчная запись результатов в JSONL.
+
+    В режиме append=True дописывает в существующий файл; flush=True сбрасывает буфер
+    после каждой строки (fsync=True — ещё и на диск), чтобы падение процесса теряло
+    не больше одного результата.
+
+    blobs=True выносит raw_response и comment в сжатое хранилище <name>.blobs рядом с
+    файлом (см. backend/grading/blobs.py, кодек blob_codec): в строке остаётся ссылка
+    {"$blob": key}, а одинаковые ответы хранятся один раз.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        metadata: dict | None = None,
+        append: bool = False,
+        flush: bool = False,
+        fsync: bool = False,
+        blobs: bool = False,
+        blob_codec: str = "zlib",
+    ):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.output_path = output_path
+        self.metadata = dict(metadata or {})
+        self.flush = flush or fsync
+        self.fsync = fsync
+        self.written = 0
+        self.blobs = BlobStore(blob_path(output_path), codec=blob_codec, append=append) if blobs else None
+        self._file = output_path.open("a" if append else "w", encoding="utf-8")
+
+    def write(self, result: GradingResult) -> None:
+        merged = dict(self.metadata)
+        merged.update(result)
+        if self.blobs is not None:
+            merged = self.blobs.extract(merged, BLOB_FIELDS)
+            if self.flush:
+                # Блоб должен оказаться на диске раньше строки, которая на него ссылается.
+                self.blobs.flush(fsync=self.fsync)
+        self._file.write(json.dumps(merged, ensure_ascii=False) + "\n")
+        self.written += 1
+        if self.flush:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self.blobs is not None:
+            self.blobs.close()
+        self._file.close()
 
-    return samples
+    def __enter__(self) -> "JsonlResultWriter":
+        return self
 
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
-def save_results_jsonl(results: Iterable[GradingResult], output_path: Path, metadata: dict | None = None) -> Path:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
+
+def save_results_jsonl(
+    results: Iterable[GradingResult],
+    output_path: Path,
+    metadata: dict | None = None,
+    blobs: bool = False,
+    blob_codec: str = "zlib",
+) -> Path:
+    with JsonlResultWriter(output_path, metadata=metadata, blobs=blobs, blob_codec=blob_codec) as writer:
         for result in results:
-            merged = dict(metadata or {})
-            merged.update(result)
-            f.write(json.dumps(merged, ensure_ascii=False) + "\n")
+            writer.write(result)
     return output_path
+
+
+def _truncate_partial_tail(path: Path) -> None:
+    """Отрезать недописанную последнюю строку, оставшуюся после падения процесса."""
+    with path.open("rb+") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        pos = end
+        while pos > 0:
+            step = min(1 << 16, pos)
+            pos -= step
+            f.seek(pos)
+            newline = f.read(step).rfind(b"\n")
+            if newline != -1:
+                f.truncate(pos + newline + 1)
+                return
+        f.truncate(0)
+
+
+def read_completed_ids(output_path: Path, repair: bool = True) -> Set[Tuple[str, str]]:
+    """
+    Пары (task_id, student_id), уже успешно проверенные в JSONL.
+
+    Строки с полем error не считаются: при resume=True такие ученики проверяются
+    заново, а старые строки с ошибкой убирает drop_superseded_errors. При repair=True
+    недописанная последняя строка удаляется из файла, чтобы дозапись начиналась с чистой
+    строки.
+    """
+
+    if not output_path.exists():
+        return set()
+    if repair:
+        _truncate_partial_tail(output_path)
+
+    completed: Set[Tuple[str, str]] = set()
+    with output_path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if row.get("error"):
+                continue
+            completed.add((str(row.get("task_id")), str(row.get("student_id"))))
+    return completed
+
+
+def drop_superseded_errors(output_path: Path) -> int:
+    """
+    Убрать из JSONL строки с ошибкой, которые заменены повторной проверкой.
+
+    Строка с error удаляется, если у того же (task_id, student_id) есть успешная строка
+    или более поздняя строка с ошибкой. Файл без таких строк не переписывается.
+    Возвращает число удалённых строк.
+    """
+
+    if not output_path.exists():
+        return 0
+    succeeded: Set[Tuple[str, str]] = set()
+    errors: Dict[Tuple[str, str], List[int]] = {}
+    with output_path.open(encoding="utf-8") as f:
+        for idx, line in enumerate(f):
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            key = (str(row.get("task_id")), str(row.get("student_id")))
+            if row.get("error"):
+                errors.setdefault(key, []).append(idx)
+            else:
+                succeeded.add(key)
+
+    drop: Set[int] = set()
+    for key, lines in errors.items():
+        drop.update(lines if key in succeeded else lines[:-1])
+    if not drop:
+        return 0
+
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with output_path.open(encoding="utf-8") as src, tmp_path.open("w", encoding="utf-8") as dst:
+        for idx, line in enumerate(src):
+            if idx not in drop:
+                dst.write(line)
+    os.replace(tmp_path, output_path)
+    return len(drop)
@@ -0,0 +1,207 @@
+"""Манифест изображений задачи: один обход каталога вместо проб путей на каждую строку."""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional
+
+from backend.grading.cache import file_digest
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def image_candidates(student_id: str, row: dict) -> List[str]:
+    """Имена файлов, под которыми ищется изображение ученика, в порядке приоритета."""
+    candidates = [
+        row.get("image"),
+        row.get("image_filename"),
+        row.get("image_path"),
+    ]
+
+    # Дополнительные варианты имени файла, если в CSV нет явного пути.
+    candidates.extend(
+        [
+            f"student_{student_id}.png",
+            f"{student_id}.png",
+            f"student_{student_id}.jpg",
+            f"{student_id}.jpg",
+        ]
+    )
+    return [candidate for candidate in candidates if candidate]
+
+
+@dataclass(frozen=True)
+class ImageEntry:
+    path: str
+    size: int
+    mtime: float
+    sha256: Optional[str] = None
+
+
+class TaskManifest:
+    """
+    Индекс файлов в images/ (включая вложенные и шардированные подкаталоги).
+
+    Для каждого файла хранится относительный путь, размер, mtime и (опционально)
+    SHA-256 содержимого. Свежесть проверяется по mtime каталогов: добавление, удаление
+    или переименование файла меняет mtime его каталога. Перезапись файла на месте
+    видна только при проверке is_fresh(deep=True).
+    """
+
+    def __init__(self, images_root: Path, entries: Dict[str, ImageEntry], dir_mtimes: Dict[str, float]):
+        self.images_root = images_root
+        self.entries = entries
+        self.dir_mtimes = dir_mtimes
+        by_name: Dict[str, Optional[str]] = {}
+        for rel_path in entries:
+            name = PurePosixPath(rel_path).name
+            # None помечает неоднозначное имя, встречающееся в нескольких подкаталогах.
+            by_name[name] = None if name in by_name else rel_path
+        self._by_name = by_name
+
+    @classmethod
+    def build(cls, images_root: Path, hash_contents: bool = True) -> "TaskManifest":
+        images_root = images_root.resolve()
+        entries: Dict[str, ImageEntry] = {}
+        dir_mtimes: Dict[str, float] = {}
+        if not images_root.is_dir():
+            return cls(images_root, entries, dir_mtimes)
+
+        stack = [images_root]
+        while stack:
+            directory = stack.pop()
+            rel_dir = directory.relative_to(images_root).as_posix()
+            dir_mtimes[rel_dir] = directory.stat().st_mtime
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        rel_path = Path(entry.path).relative_to(images_root).as_posix()
+                        entries[rel_path] = ImageEntry(
+                            path=rel_path,
+                            size=stat.st_size,
+                            mtime=stat.st_mtime,
+                            sha256=file_digest(entry.path) if hash_contents else None,
+                        )
+        return cls(images_root, entries, dir_mtimes)
+
+    def is_fresh(self, deep: bool = False) -> bool:
+        for rel_dir, mtime in self.dir_mtimes.items():
+            try:
+                if (self.images_root / rel_dir).stat().st_mtime != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        if not self.dir_mtimes and self.images_root.is_dir():
+            return False
+        if deep:
+            for entry in self.entries.values():
+                try:
+                    stat = (self.images_root / entry.path).stat()
+                except FileNotFoundError:
+                    return False
+                if stat.st_mtime != entry.mtime or stat.st_size != entry.size:
+                    return False
+        return True
+
+    def refresh_changed(self, hash_contents: bool = True) -> Optional[int]:
+        """
+        Обновить записи файлов, перезаписанных на месте (другой размер или mtime).
+
+        Хэш пересчитывается только у изменённых файлов. Возвращает число обновлённых
+        записей или None, если файл пропал и манифест нужно перестроить целиком.
+        """
+        changed = 0
+        for rel_path, entry in self.entries.items():
+            path = self.images_root / entry.path
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                return None
+            if stat.st_mtime != entry.mtime or stat.st_size != entry.size:
+                self.entries[rel_path] = ImageEntry(
+                    path=entry.path,
+                    size=stat.st_size,
+                    mtime=stat.st_mtime,
+                    sha256=file_digest(str(path)) if hash_contents else None,
+                )
+                changed += 1
+        return changed
+
+    def lookup(self, student_id: str, row: dict) -> Optional[ImageEntry]:
+        """Найти запись по кандидатам из labels.csv без обращений к файловой системе."""
+        for candidate in image_candidates(student_id, row):
+            rel_path = PurePosixPath(candidate.replace("\\", "/")).as_posix()
+            entry = self.entries.get(rel_path)
+            if entry is None:
+                unique = self._by_name.get(PurePosixPath(rel_path).name)
+                entry = self.entries.get(unique) if unique else None
+            if entry is not None:
+                return entry
+        return None
+
+    def absolute_path(self, entry: ImageEntry) -> Path:
+        return self.images_root / entry.path
+
+    def to_dict(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "images_root": str(self.images_root),
+            "dir_mtimes": self.dir_mtimes,
+            "entries": [asdict(entry) for entry in self.entries.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TaskManifest":
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Неподдерживаемая версия манифеста: {data.get('version')!r}")
+        entries = {item["path"]: ImageEntry(**item) for item in data["entries"]}
+        return cls(Path(data["images_root"]), entries, data["dir_mtimes"])
+
+    def save(self, path: Path) -> Path:
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+        return path
+
+
+def load_or_build_manifest(task_dir: Path, hash_contents: bool = True, rebuild: bool = False) -> TaskManifest:
+    """
+    Прочитать task_dir/manifest.json (рядом с labels.csv) или построить его заново.
+
+    Манифест перестраивается, если он отсутствует, повреждён, устарел по mtime
+    каталогов или в нём нет хэшей, а hash_contents=True. У свежего манифеста
+    дополнительно сверяются размер и mtime каждого файла: перезаписанные на месте сканы
+    перехешируются, иначе устаревший image_sha256 попал бы в ключ GradingCache.
+    """
+
+    task_dir = task_dir.resolve()
+    images_root = task_dir / "images"
+    manifest_path = task_dir / MANIFEST_FILENAME
+
+    if not rebuild and manifest_path.exists():
+        try:
+            manifest = TaskManifest.from_dict(json.loads(manifest_path.read_text(encoding="utf-8")))
+        except (ValueError, KeyError, TypeError):
+            manifest = None
+        if (
+            manifest is not None
+            and manifest.images_root == images_root
+            and manifest.is_fresh()
+            and (not hash_contents or all(e.sha256 for e in manifest.entries.values()))
+        ):
+            changed = manifest.refresh_changed(hash_contents=hash_contents)
+            if changed is not None:
+                if changed:
+                    manifest.save(manifest_path)
+                return manifest
+
+    manifest = TaskManifest.build(images_root, hash_contents=hash_contents)
+    manifest.save(manifest_path)
+    return manifest
@@ -0,0 +1,235 @@
+"""Локальный мок-провайдер LLM с кэшем префиксов промпта — для офлайн-проверки переиспользования."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.backends.resilient import BackendTimeoutError
+from backend.grading.backends.simulated import (
+    RateLimitedError,
+    SimulatedLLMBackend,
+    SimulationProfile,
+    SimulationStats,
+    TransientBackendError,
+)
+from backend.grading.prompts import count_tokens
+from backend.grading.rate_limit import IMAGE_TOKENS, estimate_sample_tokens
+
+
+@dataclass
+class PrefixCacheStats:
+    requests: int = 0
+    prefix_hits: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.prefix_hits / self.requests if self.requests else 0.0
+
+    @property
+    def cached_token_share(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": self.hit_rate, "cached_token_share": self.cached_token_share}
+
+
+def _block_tokens(block: dict) -> int:
+    if block.get("type") == "text":
+        return count_tokens(block.get("text", ""))
+    return IMAGE_TOKENS
+
+
+def split_cached_prefix(messages: List[dict]) -> Tuple[Optional[str], int, int]:
+    """
+    Найти кэшируемый префикс как у провайдеров с явными точками кэширования.
+
+    Префикс — все контентные блоки (с ролями) до последнего блока с cache_control
+    включительно. Возвращает (ключ префикса или None, токены префикса, токены всего промпта).
+    """
+
+    blocks = [(message["role"], block) for message in messages for block in message.get("content", [])]
+    total = sum(_block_tokens(block) for _, block in blocks)
+    marks = [idx for idx, (_, block) in enumerate(blocks) if "cache_control" in block]
+    if not marks:
+        return None, 0, total
+    prefix = blocks[: marks[-1] + 1]
+    encoded = json.dumps([[role, block] for role, block in prefix], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest(), sum(_block_tokens(b) for _, b in prefix), total
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            payload = self.server.mock.stats().to_dict()
+            simulation = self.server.mock.simulation_stats()
+            if simulation is not None:
+                payload["simulation"] = simulation.to_dict()
+            self._send_json(200, payload)
+        else:
+            self._send_json(404, {"detail": "not found"})
+
+    def do_POST(self):
+        if self.path != "/grade":
+            self._send_json(404, {"detail": "not found"})
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        try:
+            result = self.server.mock.handle_grade(body)
+        except RateLimitedError as exc:
+            retry_after = str(max(1, math.ceil(exc.retry_after)))
+            self._send_json(429, {"detail": str(exc)}, headers={"Retry-After": retry_after})
+        except BackendTimeoutError as exc:
+            self._send_json(504, {"detail": str(exc)})
+        except TransientBackendError as exc:
+            self._send_json(503, {"detail": str(exc)})
+        else:
+            self._send_json(200, result)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockLLMServer"
+
+
+class MockLLMServer:
+    """
+    Мок провайдера с тем же контрактом, что ждёт HTTPGradingBackend: POST /grade.
+
+    Балл берётся из DummyBackend (воспроизводимо по seed). Если в запросе есть
+    prompt.messages (см. PromptBuilder), сервер сам выделяет префикс до блока с
+    cache_control и ведёт LRU на max_cached_prefixes префиксов: попадание засчитывается
+    как prefix hit, а его токены — как cached_tokens. Задержка ответа моделирует TTFT:
+    base_latency + seconds_per_1k_uncached_tokens * (некэшированные токены / 1000).
+    Статистика — GET /stats или метод stats().
+
+    С simulation=SimulationProfile(...) ответы отдаёт SimulatedLLMBackend: логнормальная
+    задержка, 429 с заголовком Retry-After, 503 при временных сбоях и 504 после
+    «зависания». Это даёт офлайн-стенд для HTTPGradingBackend, ResilientBackend и
+    настроек параллелизма. Счётчики имитации — simulation_stats() и поле simulation в GET /stats.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: str | None = None,
+        max_cached_prefixes: int = 1024,
+        base_latency: float = 0.0,
+        seconds_per_1k_uncached_tokens: float = 0.0,
+        simulation: SimulationProfile | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.backend = SimulatedLLMBackend(simulation, seed=seed) if simulation is not None else DummyBackend(seed=seed)
+        self.max_cached_prefixes = max_cached_prefixes
+        self.base_latency = base_latency
+        self.seconds_per_1k_uncached_tokens = seconds_per_1k_uncached_tokens
+        self._prefixes: OrderedDict[str, int] = OrderedDict()
+        self._stats = PrefixCacheStats()
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise ValueError("Сервер не запущен: вызовите start().")
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def start(self) -> "MockLLMServer":
+        if self._server is None:
+            self._server = _Server((self.host, self.port), _Handler)
+            self._server.mock = self
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> PrefixCacheStats:
+        with self._lock:
+            return PrefixCacheStats(**asdict(self._stats))
+
+    def simulation_stats(self) -> Optional[SimulationStats]:
+        if isinstance(self.backend, SimulatedLLMBackend):
+            return self.backend.stats()
+        return None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._prefixes.clear()
+            self._stats = PrefixCacheStats()
+        if isinstance(self.backend, SimulatedLLMBackend):
+            self.backend.reset()
+
+    def _account(self, body: dict) -> Tuple[int, int]:
+        prompt = body.get("prompt")
+        if prompt and prompt.get("messages"):
+            key, prefix_tokens, total = split_cached_prefix(prompt["messages"])
+        else:
+            key, prefix_tokens, total = None, 0, estimate_sample_tokens(body["sample"])
+
+        with self._lock:
+            hit = key is not None and key in self._prefixes
+            if key is not None:
+                self._prefixes[key] = prefix_tokens
+                self._prefixes.move_to_end(key)
+                if len(self._prefixes) > self.max_cached_prefixes:
+                    self._prefixes.popitem(last=False)
+            cached = prefix_tokens if hit else 0
+            self._stats.requests += 1
+            self._stats.prefix_hits += int(hit)
+            self._stats.prompt_tokens += total
+            self._stats.cached_tokens += cached
+        return total, cached
+
+    def handle_grade(self, body: dict) -> dict:
+        total, cached = self._account(body)
+        delay = self.base_latency + self.seconds_per_1k_uncached_tokens * (total - cached) / 1000
+        if delay > 0:
+            time.sleep(delay)
+        result = self.backend.grade(body["sample"])
+        # Имя бэкенда проставит клиент; мок отвечает только как «модель».
+        result.pop("backend_name", None)
+        result["model_name"] = body.get("model", result.get("model_name"))
+        result["raw_response"] = {
+            **result.get("raw_response", {}),
+            "usage": {"prompt_tokens": total, "cached_tokens": cached},
+        }
+        return result
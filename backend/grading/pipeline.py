@@ -2,14 +2,37 @@
 
 from __future__ import annotations
 
+import json
 import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from functools import partial
+from itertools import accumulate
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
 from backend.grading.backends.base import Backend
-from backend.grading.io_utils import load_samples, save_results_jsonl
-from backend.grading.types import GradingResult, Sample
+from backend.grading.batching import MicroBatchBuilder, iter_micro_batches
+from backend.grading.cache import GradingCache
+from backend.grading.columnar import columnar_path, jsonl_to_columnar, save_results_columnar
+from backend.grading.dedup import DedupConfig, find_duplicates
+from backend.grading.io_utils import (
+    JsonlResultWriter,
+    drop_superseded_errors,
+    iter_samples,
+    read_completed_ids,
+)
+from backend.grading.preprocess import PayloadCache, iter_preprocessed, preprocess_samples
+from backend.grading.prompts import prefix_order
+from backend.grading.sharding import Shard
+from backend.grading.table import SampleTable
+from backend.grading.telemetry import GLOBAL_TELEMETRY, Recorder, Telemetry
+from backend.grading.types import BatchGradingBackend, GradingResult, ResultSink, Sample
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def _clamp_confidence(value: float) -> float:
@@ -18,6 +41,10 @@ def _clamp_confidence(value: float) -> float:
     return max(0.0, min(1.0, float(value)))
 
 
+def _default_experiment_name(backend: Backend) -> str:
+    return f"{backend.name}_{datetime.now(tz=timezone.utc).strftime('%Y%m%dT%H%M%S')}"
+
+
 def _normalize_result(
     raw_result: GradingResult,
     backend: Backend,
@@ -39,18 +66,618 @@ def _normalize_result(
     return result  # type: ignore[return-value]
 
 
-def grade_dataset(samples: Sequence[Sample], backend: Backend, experiment_name: str | None = None) -> List[GradingResult]:
-    experiment_name = experiment_name or f"{backend.name}_{datetime.now(tz=timezone.utc).strftime('%Y%m%dT%H%M%S')}"
-    timestamp = datetime.now(tz=timezone.utc).isoformat()
+EXECUTOR_KINDS = ("thread", "process")
+
+
+def _error_result(exc: BaseException) -> GradingResult:
+    """Результат-заглушка для упавшего вызова: нулевой балл и нулевая уверенность."""
+    message = f"{type(exc).__name__}: {exc}"
+    return {
+        "pred_score": 0,
+        "confidence": 0.0,
+        "comment": f"Ошибка бэкенда: {message}",
+        "raw_response": {"error": message},
+        "error": message,
+    }
+
+
+def _call_backend(backend: Backend, sample: Sample) -> GradingResult:
+    # Функции вызова — верхнего уровня, чтобы их можно было передать в ProcessPoolExecutor.
+    return backend.grade(sample)
+
+
+def _call_backend_batch(backend: BatchGradingBackend, batch: Sequence[Sample]) -> List[GradingResult]:
+    results = list(backend.grade_batch(batch))
+    if len(results) != len(batch):
+        raise ValueError(f"grade_batch вернул {len(results)} результатов на пакет из {len(batch)} примеров.")
+    return results
+
+
+def _grade_chunk(
+    backend: Backend, chunk: Sequence[Sample], capture_errors: bool
+) -> Tuple[List[GradingResult], List[float]]:
+    # Выполняется в процессе-воркере: чанк SampleTable приходит одним pickle с задачей внутри.
+    # Длительности вызовов возвращаются вместе с результатами: телеметрия воркера родителю не видна.
     results: List[GradingResult] = []
+    latencies: List[float] = []
+    for sample in chunk:
+        start = time.perf_counter()
+        try:
+            results.append(backend.grade(sample))
+        except Exception as exc:
+            if not capture_errors:
+                raise
+            results.append(_error_result(exc))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def _timed_call(
+    call: Callable[[Backend, T], R], recorder: Recorder | None, backend: Backend, unit: T
+) -> Tuple[R, float]:
+    """Выполнить call и вернуть (результат, секунды); с recorder вызов учитывается в gauge in_flight."""
+    start = time.perf_counter()
+    if recorder is None:
+        output = call(backend, unit)
+    else:
+        recorder.telemetry.add_gauge("in_flight", 1, recorder.labels)
+        try:
+            output = call(backend, unit)
+        finally:
+            recorder.telemetry.add_gauge("in_flight", -1, recorder.labels)
+    return output, time.perf_counter() - start
+
+
+def _backend_retries(backend: Backend) -> int:
+    # Повторы видны только у обёрток со статистикой (ResilientBackend.stats.retries).
+    return int(getattr(getattr(backend, "stats", None), "retries", 0) or 0)
+
+
+def _take(samples: Sequence[Sample], indices: Sequence[int]) -> Sequence[Sample]:
+    return samples.take(indices) if isinstance(samples, SampleTable) else [samples[idx] for idx in indices]
+
+
+def _as_duplicate(raw_result: GradingResult, sample: Sample, representative: Sample) -> GradingResult:
+    """Результат представителя, перенесённый на его дубликат, с полем dedup_of."""
+    return {
+        **raw_result,
+        "student_id": sample["student_id"],
+        "task_id": sample["task_id"],
+        "true_score": sample["true_score"],
+        "max_score": sample["max_score"],
+        "dedup_of": representative["student_id"],
+    }
+
+
+def _make_executor(executor: str, max_workers: int) -> Executor:
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="grader")
+    if executor == "process":
+        return ProcessPoolExecutor(max_workers=max_workers)
+    raise ValueError(f"Неизвестный тип исполнителя: {executor!r}. Допустимо: {', '.join(EXECUTOR_KINDS)}.")
+
+
+def _run_units(
+    units: Sequence[T],
+    call: Callable[[Backend, T], R],
+    on_error: Callable[[T, Exception], R],
+    backend: Backend,
+    max_workers: int | None,
+    executor: str,
+    capture_errors: bool,
+    recorder: Recorder | None = None,
+    stage: str | None = "backend_call",
+    on_output: Callable[[int, R], None] | None = None,
+) -> List[R]:
+    """
+    Выполнить call для каждой единицы работы (примера или пакета), сохраняя порядок.
+
+    Длительность каждой единицы попадает в recorder как этап stage (stage=None — не
+    записывать, если единица сама возвращает длительности вызовов). on_output(номер
+    единицы, результат) вызывается в вызывающем потоке, как только результат готов и
+    все предыдущие единицы уже отданы.
+    """
+    outputs: List[R] = []
+    latencies: List[float] = []
+
+    def deliver(output: R) -> None:
+        outputs.append(output)
+        if on_output is not None:
+            on_output(len(outputs) - 1, output)
+
+    def fail(unit: T, exc: Exception) -> None:
+        # Перехваченные ошибки считаются по строкам с полем error в grade_dataset.
+        if not capture_errors:
+            if recorder is not None:
+                recorder.inc("errors", 1)
+            raise exc
+        deliver(on_error(unit, exc))
+
+    if max_workers is None or max_workers <= 1 or len(units) <= 1:
+        # Последовательно в полёте ровно один вызов: gauge меняем раз на цикл, а не на вызов.
+        if recorder is not None:
+            recorder.telemetry.add_gauge("in_flight", 1, recorder.labels)
+        try:
+            for unit in units:
+                try:
+                    output, elapsed = _timed_call(call, None, backend, unit)
+                except Exception as exc:
+                    fail(unit, exc)
+                    continue
+                latencies.append(elapsed)
+                deliver(output)
+        finally:
+            if recorder is not None:
+                recorder.telemetry.add_gauge("in_flight", -1, recorder.labels)
+    else:
+        # В процессы реестр телеметрии не передаём: gauge in_flight ведётся только для потоков.
+        timed = partial(_timed_call, call, recorder if executor == "thread" else None)
+        with _make_executor(executor, max_workers) as pool:
+            futures = [pool.submit(timed, backend, unit) for unit in units]
+            # Обходим futures в порядке подачи, поэтому порядок результатов совпадает с входным.
+            for unit, future in zip(units, futures):
+                try:
+                    output, elapsed = future.result()
+                except Exception as exc:
+                    if not capture_errors:
+                        for pending in futures:
+                            pending.cancel()
+                    fail(unit, exc)
+                    continue
+                latencies.append(elapsed)
+                deliver(output)
+
+    if recorder is not None and stage is not None:
+        recorder.observe_many(stage, latencies)
+    return outputs
+
+
+def _grade_raw(
+    samples: Sequence[Sample],
+    backend: Backend,
+    max_workers: int | None,
+    executor: str,
+    capture_errors: bool,
+    max_batch_size: int | None = None,
+    max_batch_bytes: int | None = None,
+    recorder: Recorder | None = None,
+    group_by_prefix: bool = False,
+    on_result: Callable[[int, GradingResult], None] | None = None,
+) -> List[GradingResult]:
+    """Сырые результаты бэкенда в порядке samples; on_result(индекс в samples, результат) — по мере готовности."""
+    if group_by_prefix:
+        order = prefix_order(samples)
+        if any(pos != idx for pos, idx in enumerate(order)):
+            # Примеры с общим префиксом уходят подряд (и в одни пакеты), результаты — в исходном порядке.
+            grouped = _take(samples, order)
+            graded = _grade_raw(
+                grouped,
+                backend,
+                max_workers,
+                executor,
+                capture_errors,
+                max_batch_size,
+                max_batch_bytes,
+                recorder,
+                on_result=None if on_result is None else lambda pos, result: on_result(order[pos], result),
+            )
+            results: List[GradingResult] = [None] * len(samples)  # type: ignore[list-item]
+            for pos, idx in enumerate(order):
+                results[idx] = graded[pos]
+            return results
+
+    batching = max_batch_size is not None or max_batch_bytes is not None
+    if executor == "process" and isinstance(samples, SampleTable) and not batching and (max_workers or 1) > 1:
+        # Пулу процессов отдаём чанки таблицы: условие и критерии сериализуются раз на чанк, а не на ученика.
+        chunk_size = max(1, math.ceil(len(samples) / (max_workers * 4)))
+
+        def on_chunk(number: int, output: Tuple[List[GradingResult], List[float]]) -> None:
+            for offset, result in enumerate(output[0]):
+                on_result(number * chunk_size + offset, result)
+
+        chunk_results = _run_units(
+            samples.chunks(chunk_size),
+            partial(_grade_chunk, capture_errors=capture_errors),
+            lambda chunk, exc: ([_error_result(exc) for _ in chunk], []),
+            backend,
+            max_workers,
+            executor,
+            capture_errors,
+            recorder,
+            stage=None,
+            on_output=None if on_result is None else on_chunk,
+        )
+        if recorder is not None:
+            for _, latencies in chunk_results:
+                recorder.observe_many("backend_call", latencies)
+        return [result for results, _ in chunk_results for result in results]
+
+    if not batching or not isinstance(backend, BatchGradingBackend):
+        return _run_units(
+            samples,
+            _call_backend,
+            lambda _sample, exc: _error_result(exc),
+            backend,
+            max_workers,
+            executor,
+            capture_errors,
+            recorder,
+            on_output=on_result,
+        )
+
+    batches = list(iter_micro_batches(samples, max_batch_size=max_batch_size, max_batch_bytes=max_batch_bytes))
+    starts = list(accumulate((len(batch) for batch in batches), initial=0))
+
+    def on_batch(number: int, output: List[GradingResult]) -> None:
+        for offset, result in enumerate(output):
+            on_result(starts[number] + offset, result)
+
+    batch_results = _run_units(
+        batches,
+        _call_backend_batch,
+        lambda batch, exc: [_error_result(exc) for _ in batch],
+        backend,
+        max_workers,
+        executor,
+        capture_errors,
+        recorder,
+        on_output=None if on_result is None else on_batch,
+    )
+    return [result for batch in batch_results for result in batch]
+
+
+def grade_dataset(
+    samples: Sequence[Sample],
+    backend: Backend,
+    experiment_name: str | None = None,
+    max_workers: int | None = None,
+    executor: str = "thread",
+    capture_errors: bool = False,
+    cache: GradingCache | None = None,
+    max_batch_size: int | None = None,
+    max_batch_bytes: int | None = None,
+    accumulator: ResultSink | None = None,
+    telemetry: Telemetry | None = None,
+    group_by_prefix: bool = False,
+    dedup: DedupConfig | None = None,
+) -> List[GradingResult]:
+    """
+    Прогнать бэкенд по всем примерам и вернуть нормализованные результаты в исходном порядке.
+
+    При max_workers > 1 вызовы выполняются параллельно в пуле потоков (executor="thread",
+    подходит для сетевых LLM-вызовов) или процессов (executor="process", бэкенд должен
+    сериализоваться pickle). С capture_errors=True исключение бэкенда не прерывает прогон:
+    для такого примера записывается результат с полем error, нулевым баллом и уверенностью.
+    Если передан cache, бэкенд вызывается только для примеров, которых в нём ещё нет.
+    При max_batch_size/max_batch_bytes и бэкенде с grade_batch примеры уходят микропакетами
+    (см. iter_micro_batches); бэкенд без grade_batch проверяет их по одному.
+    Каждый нормализованный результат передаётся в accumulator.update (например,
+    backend.analysis.online.MetricsAccumulator) сразу, как только готов (попадания в кэш —
+    до первого вызова бэкенда), чтобы метрики были видны по ходу прогона.
+    Длительности вызовов бэкенда и нормализации, ошибки, повторы и попадания в кэш пишутся
+    в telemetry (по умолчанию GLOBAL_TELEMETRY, который отдаёт /metrics).
+    С group_by_prefix=True примеры разных задач перед отправкой группируются по общему
+    префиксу промпта (условие, критерии, максимальный балл; см. prompts.prefix_order),
+    чтобы провайдер переиспользовал кэш префикса; порядок результатов не меняется.
+    С dedup одинаковые (и с perceptual=True — подтверждённо почти одинаковые) сканы
+    внутри задачи (см. dedup.find_duplicates)
+    проверяются один раз: дубликаты получают результат представителя и поле dedup_of
+    с его student_id.
+    """
+
+    experiment_name = experiment_name or _default_experiment_name(backend)
+    timestamp = datetime.now(tz=timezone.utc).isoformat()
+    if max_workers is not None and max_workers <= 0:
+        raise ValueError("max_workers должен быть положительным.")
+    if executor not in EXECUTOR_KINDS:
+        raise ValueError(f"Неизвестный тип исполнителя: {executor!r}. Допустимо: {', '.join(EXECUTOR_KINDS)}.")
+
+    recorder = (telemetry or GLOBAL_TELEMETRY).recorder(backend)
+    retries_before = _backend_retries(backend)
+    to_grade = samples
+    unique: Sequence[int] = range(len(samples))
+    duplicates: Dict[int, List[int]] = {}
+    if dedup is not None:
+        representatives = find_duplicates(samples, dedup)
+        unique = [idx for idx, rep in enumerate(representatives) if rep == idx]
+        position = {idx: pos for pos, idx in enumerate(unique)}
+        for idx, rep in enumerate(representatives):
+            if rep != idx:
+                duplicates.setdefault(position[rep], []).append(idx)
+        to_grade = _take(samples, unique)
+
+    results: List[GradingResult] = [None] * len(samples)  # type: ignore[list-item]
+    durations: List[float] = []
+
+    def finish(idx: int, raw_result: GradingResult) -> None:
+        start = time.perf_counter()
+        results[idx] = _normalize_result(raw_result, backend, samples[idx], experiment_name, timestamp)
+        durations.append(time.perf_counter() - start)
+        if accumulator is not None:
+            accumulator.update(results[idx])
+
+    def complete(pos: int, raw_result: GradingResult) -> None:
+        # pos — индекс в to_grade; результат сразу нормализуется для представителя и его дубликатов.
+        rep = unique[pos]
+        finish(rep, raw_result)
+        for idx in duplicates.get(pos, ()):
+            finish(idx, _as_duplicate(raw_result, samples[idx], samples[rep]))
+
+    grade = partial(
+        _grade_raw,
+        backend=backend,
+        max_workers=max_workers,
+        executor=executor,
+        capture_errors=capture_errors,
+        max_batch_size=max_batch_size,
+        max_batch_bytes=max_batch_bytes,
+        recorder=recorder,
+        group_by_prefix=group_by_prefix,
+    )
+    if cache is None:
+        grade(to_grade, on_result=complete)
+    else:
+        keys = [cache.key_for(sample, backend) for sample in to_grade]
+        pending: List[int] = []
+        for pos, key in enumerate(keys):
+            hit = cache.get(key)
+            if hit is None:
+                pending.append(pos)
+            else:
+                complete(pos, hit)
+
+        def store(number: int, raw_result: GradingResult) -> None:
+            cache.put(keys[pending[number]], raw_result)
+            complete(pending[number], raw_result)
 
-    for sample in samples:
-        raw_result = backend.grade(sample)
-        results.append(_normalize_result(raw_result, backend, sample, experiment_name, timestamp))
+        recorder.inc("cache_hits", len(to_grade) - len(pending))
+        recorder.inc("cache_misses", len(pending))
+        grade(_take(to_grade, pending), on_result=store)
 
+    recorder.inc("retries", _backend_retries(backend) - retries_before)
+    if dedup is not None:
+        recorder.inc("deduplicated", len(samples) - len(unique))
+    recorder.observe_many("normalize", durations)
+    recorder.inc("results", len(results))
+    recorder.inc("errors", sum(1 for result in results if result.get("error")))
     return results
 
 
+# (номер во входном потоке, пример, ключ кэша или None) — единица учёта в iter_grade.
+_StreamEntry = Tuple[int, Sample, Optional[str]]
+
+
+def iter_grade(
+    samples: Iterable[Sample],
+    backend: Backend,
+    experiment_name: str | None = None,
+    max_workers: int | None = None,
+    executor: str = "thread",
+    capture_errors: bool = False,
+    cache: GradingCache | None = None,
+    max_batch_size: int | None = None,
+    max_batch_bytes: int | None = None,
+    accumulator: ResultSink | None = None,
+    chunk_size: int | None = None,
+    telemetry: Telemetry | None = None,
+) -> Iterator[GradingResult]:
+    """
+    Потоковый вариант grade_dataset: читает samples лениво и выдаёт результаты во входном порядке.
+
+    Один пул исполнителя живёт весь прогон. В полёте не больше 4 * max_workers вызовов
+    (примеров или микропакетов), и окно пополняется, как только завершается любой из
+    них, поэтому медленный вызов не задерживает остальные. Готовые результаты ждут своей
+    очереди на выдачу; всего в памяти не больше chunk_size примеров (по умолчанию
+    max(1024, 4 * max_workers * max_batch_size)), так что потребление памяти не зависит
+    от размера задачи. В accumulator результат попадает сразу по готовности.
+    """
+
+    experiment_name = experiment_name or _default_experiment_name(backend)
+    timestamp = datetime.now(tz=timezone.utc).isoformat()
+    if max_workers is not None and max_workers <= 0:
+        raise ValueError("max_workers должен быть положительным.")
+    if executor not in EXECUTOR_KINDS:
+        raise ValueError(f"Неизвестный тип исполнителя: {executor!r}. Допустимо: {', '.join(EXECUTOR_KINDS)}.")
+    workers = max_workers or 1
+    batching = (max_batch_size is not None or max_batch_bytes is not None) and isinstance(backend, BatchGradingBackend)
+    builder = MicroBatchBuilder(max_batch_size, max_batch_bytes) if batching else MicroBatchBuilder(1)
+    max_in_flight = 4 * workers
+    chunk_size = chunk_size or max(1024, max_in_flight * (max_batch_size or 1))
+
+    recorder = (telemetry or GLOBAL_TELEMETRY).recorder(backend)
+    retries_before = _backend_retries(backend)
+    counters = {"results": 0, "errors": 0, "cache_hits": 0, "cache_misses": 0}
+    ready: Dict[int, GradingResult] = {}
+    in_flight: Dict[Future, List[_StreamEntry]] = {}
+    pool = _make_executor(executor, workers) if workers > 1 else None
+    # В процессы реестр телеметрии не передаём: gauge in_flight ведётся только для потоков.
+    call = _call_backend_batch if batching else _call_backend
+    timed = partial(_timed_call, call, recorder if executor == "thread" or pool is None else None)
+
+    def finish(entries: List[_StreamEntry], raw_results: Sequence[GradingResult]) -> None:
+        for (index, sample, key), raw_result in zip(entries, raw_results):
+            if key is not None:
+                cache.put(key, raw_result)
+            start = time.perf_counter()
+            result = _normalize_result(raw_result, backend, sample, experiment_name, timestamp)
+            recorder.observe("normalize", time.perf_counter() - start)
+            counters["results"] += 1
+            counters["errors"] += 1 if result.get("error") else 0
+            ready[index] = result
+            if accumulator is not None:
+                accumulator.update(result)
+
+    def complete(entries: List[_StreamEntry], outcome: Callable[[], Tuple[object, float]]) -> None:
+        try:
+            output, elapsed = outcome()
+        except Exception as exc:
+            if not capture_errors:
+                recorder.inc("errors", 1)
+                raise
+            finish(entries, [_error_result(exc) for _ in entries])
+            return
+        recorder.observe("backend_call", elapsed)
+        finish(entries, output if batching else [output])
+
+    def dispatch(entries: List[_StreamEntry]) -> None:
+        unit = [sample for _, sample, _ in entries] if batching else entries[0][1]
+        if pool is None:
+            complete(entries, partial(timed, backend, unit))
+        else:
+            in_flight[pool.submit(timed, backend, unit)] = entries
+
+    def collect(block: bool) -> None:
+        done, _ = wait(in_flight, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            complete(in_flight.pop(future), future.result)
+
+    next_index = 0
+    try:
+        for index, sample in enumerate(samples):
+            key = cache.key_for(sample, backend) if cache is not None else None
+            hit = cache.get(key) if key is not None else None
+            if hit is not None:
+                counters["cache_hits"] += 1
+                finish([(index, sample, None)], [hit])
+            else:
+                counters["cache_misses"] += 1
+                batch = builder.add(sample, (index, sample, key))
+                if batch is not None:
+                    dispatch(batch)
+            while in_flight and (len(in_flight) >= max_in_flight or index + 1 - next_index >= chunk_size):
+                collect(block=True)
+                while next_index in ready:
+                    yield ready.pop(next_index)
+                    next_index += 1
+            if in_flight:
+                collect(block=False)
+            while next_index in ready:
+                yield ready.pop(next_index)
+                next_index += 1
+        batch = builder.flush()
+        if batch is not None:
+            dispatch(batch)
+        while in_flight or next_index in ready:
+            if in_flight:
+                collect(block=True)
+            while next_index in ready:
+                yield ready.pop(next_index)
+                next_index += 1
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        recorder.inc("retries", _backend_retries(backend) - retries_before)
+        recorder.inc("results", counters["results"])
+        recorder.inc("errors", counters["errors"])
+        if cache is not None:
+            recorder.inc("cache_hits", counters["cache_hits"])
+            recorder.inc("cache_misses", counters["cache_misses"])
+
+
+def telemetry_path(output_path: Path) -> Path:
+    """Путь к сводке телеметрии прогона рядом с JSONL: <name>.telemetry.json."""
+    return output_path.with_suffix(".telemetry.json")
+
+
+def _write_results(writer: JsonlResultWriter, results: Iterable[GradingResult], recorder: Recorder) -> None:
+    for result in results:
+        start = time.perf_counter()
+        writer.write(result)
+        recorder.observe("write", time.perf_counter() - start)
+
+
+def _save_telemetry(output_path: Path, experiment_name: str, telemetry: Telemetry) -> Path:
+    path = telemetry_path(output_path)
+    payload = {"experiment_name": experiment_name, "telemetry": telemetry.summary()}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def stream_task_directory(
+    task_dir: Path,
+    backend: Backend,
+    experiment_name: str | None = None,
+    results_dir: Path | None = None,
+    labels_filename: str = "labels.csv",
+    metadata: dict | None = None,
+    resume: bool = False,
+    max_workers: int | None = None,
+    executor: str = "thread",
+    capture_errors: bool = False,
+    cache: GradingCache | None = None,
+    max_batch_size: int | None = None,
+    max_batch_bytes: int | None = None,
+    use_manifest: bool = False,
+    accumulator: ResultSink | None = None,
+    preprocess: PayloadCache | None = None,
+    shard: Shard | None = None,
+    output_path: Path | None = None,
+    fsync: bool = False,
+    telemetry: Telemetry | None = None,
+    columnar: bool = False,
+    blobs: bool = False,
+) -> Tuple[int, Path]:
+    """
+    Потоковый аналог run_task_directory с чекпоинтом в JSONL.
+
+    Каждый результат дописывается и сбрасывается в файл сразу после проверки. При
+    resume=True уже успешно проверенные ученики пропускаются, ученики со строкой error
+    проверяются заново, новые строки дописываются в конец файла, а заменённые строки
+    с ошибкой затем удаляются. output_path переопределяет путь results_dir/<experiment>.jsonl.
+    С preprocess сканы перед проверкой нормализуются в пуле процессов (см. preprocess.py).
+    Длительности этапов load/resolve/backend_call/normalize/write собираются в отдельный
+    реестр прогона (он же пишет в telemetry или GLOBAL_TELEMETRY), и его сводка сохраняется
+    рядом с результатами в <experiment>.telemetry.json. С columnar=True по итоговому JSONL
+    (включая строки прошлых запусков) строится колоночная копия <experiment>.columns.
+    blobs=True выносит raw_response и comment в <experiment>.blobs (см. JsonlResultWriter).
+    Возвращает (число проверенных в этом запуске, путь к файлу).
+    """
+
+    if resume and not experiment_name:
+        raise ValueError("Для resume=True нужно явно указать experiment_name, чтобы найти файл прогона.")
+    experiment_name = experiment_name or _default_experiment_name(backend)
+    if output_path is None:
+        output_path = (results_dir or Path("results")) / f"{experiment_name}.jsonl"
+    output_path = output_path.resolve()
+
+    run_telemetry = Telemetry(parent=telemetry or GLOBAL_TELEMETRY)
+    recorder = run_telemetry.recorder(backend)
+    completed = read_completed_ids(output_path) if resume else set()
+    samples = iter_samples(
+        task_dir,
+        labels_filename=labels_filename,
+        skip=completed,
+        use_manifest=use_manifest,
+        shard=shard,
+        recorder=recorder,
+    )
+    if preprocess is not None:
+        samples = iter_preprocessed(samples, cache=preprocess, max_workers=os.cpu_count())
+    results = iter_grade(
+        samples,
+        backend,
+        experiment_name=experiment_name,
+        max_workers=max_workers,
+        executor=executor,
+        capture_errors=capture_errors,
+        cache=cache,
+        max_batch_size=max_batch_size,
+        max_batch_bytes=max_batch_bytes,
+        accumulator=accumulator,
+        telemetry=run_telemetry,
+    )
+    with JsonlResultWriter(
+        output_path, metadata=metadata, append=resume, flush=True, fsync=fsync, blobs=blobs
+    ) as writer:
+        _write_results(writer, results, recorder)
+    if resume:
+        drop_superseded_errors(output_path)
+    _save_telemetry(output_path, experiment_name, run_telemetry)
+    if columnar:
+        jsonl_to_columnar(output_path)
+    return writer.written, output_path
+
+
 def run_task_directory(
     task_dir: Path,
     backend: Backend,
@@ -58,15 +685,51 @@ def run_task_directory(
     results_dir: Path | None = None,
     labels_filename: str = "labels.csv",
     metadata: dict | None = None,
+    max_workers: int | None = None,
+    executor: str = "thread",
+    capture_errors: bool = False,
+    cache: GradingCache | None = None,
+    max_batch_size: int | None = None,
+    max_batch_bytes: int | None = None,
+    use_manifest: bool = False,
+    accumulator: ResultSink | None = None,
+    preprocess: PayloadCache | None = None,
+    telemetry: Telemetry | None = None,
+    dedup: DedupConfig | None = None,
+    columnar: bool = False,
+    blobs: bool = False,
 ) -> Tuple[List[GradingResult], Path]:
-    samples = load_samples(task_dir, labels_filename=labels_filename)
-    results = grade_dataset(samples, backend, experiment_name=experiment_name)
+    run_telemetry = Telemetry(parent=telemetry or GLOBAL_TELEMETRY)
+    recorder = run_telemetry.recorder(backend)
+    samples = list(
+        iter_samples(task_dir, labels_filename=labels_filename, use_manifest=use_manifest, recorder=recorder)
+    )
+    if preprocess is not None:
+        samples = preprocess_samples(samples, cache=preprocess, max_workers=os.cpu_count())
+    results = grade_dataset(
+        samples,
+        backend,
+        experiment_name=experiment_name,
+        max_workers=max_workers,
+        executor=executor,
+        capture_errors=capture_errors,
+        cache=cache,
+        max_batch_size=max_batch_size,
+        max_batch_bytes=max_batch_bytes,
+        accumulator=accumulator,
+        telemetry=run_telemetry,
+        dedup=dedup,
+    )
 
     experiment_name = results[0]["experiment_name"] if results else experiment_name or "empty_experiment"
     output_dir = results_dir or Path("results")
     output_path = (output_dir / f"{experiment_name}.jsonl").resolve()
 
-    save_results_jsonl(results, output_path, metadata=metadata or {})
+    with JsonlResultWriter(output_path, metadata=metadata, blobs=blobs) as writer:
+        _write_results(writer, results, recorder)
+    _save_telemetry(output_path, experiment_name, run_telemetry)
+    if columnar:
+        save_results_columnar(results, columnar_path(output_path))
     return results, output_path
 
 
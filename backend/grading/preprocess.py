@@ -0,0 +1,196 @@
+"""Предобработка сканов: уменьшение, оттенки серого, перекодирование и дисковый кэш результата."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.grading.cache import file_digest
+from backend.grading.types import Sample
+
+DEFAULT_PAYLOAD_DIR = Path("results") / "payload_cache"
+_MIME_BY_FORMAT = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+_SUFFIX_BY_FORMAT = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+
+def _require_pillow():
+    try:
+        import PIL  # noqa: F401
+    except ImportError as exc:
+        raise ImportError("Для предобработки изображений нужен Pillow. Установите его: `pip install pillow`.") from exc
+
+
+@dataclass(frozen=True)
+class PreprocessConfig:
+    """Параметры нормализации скана; любая смена параметров даёт новый ключ кэша."""
+
+    max_side: int = 1568
+    grayscale: bool = True
+    format: str = "JPEG"
+    quality: int = 85
+
+    def __post_init__(self) -> None:
+        if self.format not in _MIME_BY_FORMAT:
+            raise ValueError(f"Неподдерживаемый формат {self.format!r}. Допустимо: {', '.join(_MIME_BY_FORMAT)}.")
+        if self.max_side <= 0:
+            raise ValueError("max_side должен быть положительным.")
+
+    @property
+    def mime(self) -> str:
+        return _MIME_BY_FORMAT[self.format]
+
+    @property
+    def suffix(self) -> str:
+        return _SUFFIX_BY_FORMAT[self.format]
+
+    def fingerprint(self) -> str:
+        encoded = repr(sorted(asdict(self).items())).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+def preprocess_image(source: Path | str, config: PreprocessConfig) -> bytes:
+    """Декодировать скан, повернуть по EXIF, уменьшить до max_side и перекодировать."""
+    _require_pillow()
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("L" if config.grayscale else "RGB")
+        image.thumbnail((config.max_side, config.max_side), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        save_kwargs = {"optimize": True}
+        if config.format in ("JPEG", "WEBP"):
+            save_kwargs["quality"] = config.quality
+        image.save(buffer, format=config.format, **save_kwargs)
+    return buffer.getvalue()
+
+
+def _write_payload(source: str, target: str, config: PreprocessConfig) -> Optional[str]:
+    # Функция верхнего уровня для ProcessPoolExecutor; запись атомарна, чтобы кэш не видел половину файла.
+    # Возвращает текст ошибки вместо исключения: один битый скан не должен ронять весь пакет в пуле.
+    try:
+        payload = preprocess_image(source, config)
+    except ImportError:
+        raise
+    except Exception as exc:
+        return f"{type(exc).__name__}: {exc}"
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, target)
+    return None
+
+
+class PayloadCache:
+    """
+    Дисковый кэш готовых к отправке изображений.
+
+    Путь: root/<первые 2 символа хэша>/<sha256 исходника>-<отпечаток конфигурации><суффикс>.
+    """
+
+    def __init__(self, root: Path | str = DEFAULT_PAYLOAD_DIR, config: PreprocessConfig | None = None):
+        self.root = Path(root)
+        self.config = config or PreprocessConfig()
+
+    def path_for(self, source_sha256: str) -> Path:
+        name = f"{source_sha256}-{self.config.fingerprint()}{self.config.suffix}"
+        return self.root / source_sha256[:2] / name
+
+
+def _prepare(samples: Sequence[Sample], cache: PayloadCache, pool: Executor | None) -> List[Sample]:
+    prepared: List[Sample] = []
+    pending: List[Tuple[str, str]] = []
+    for sample in samples:
+        source_sha256 = sample.get("image_sha256") or file_digest(sample["image_path"])
+        target = cache.path_for(source_sha256)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            pending.append((sample["image_path"], str(target)))
+        prepared.append(
+            {**sample, "image_sha256": source_sha256, "payload_path": str(target), "payload_mime": cache.config.mime}
+        )
+
+    # Одинаковые сканы обрабатываем один раз.
+    unique = {target: source for source, target in pending}
+    if pool is not None and len(unique) > 1:
+        errors = pool.map(_write_payload, list(unique.values()), list(unique), [cache.config] * len(unique))
+    else:
+        errors = (_write_payload(source, target, cache.config) for target, source in unique.items())
+    failed: Dict[str, str] = {target: error for target, error in zip(unique, errors) if error is not None}
+    if not failed:
+        return prepared
+    # Скан, который не удалось обработать, уходит как есть: load_payload отдаст исходный файл.
+    return [
+        _passthrough(sample, failed[sample["payload_path"]]) if sample["payload_path"] in failed else sample
+        for sample in prepared
+    ]
+
+
+def _passthrough(sample: Sample, error: str) -> Sample:
+    out = {key: value for key, value in sample.items() if key not in ("payload_path", "payload_mime")}
+    out["preprocess_error"] = error
+    return out
+
+
+def preprocess_samples(
+    samples: Sequence[Sample],
+    cache: PayloadCache | None = None,
+    max_workers: int | None = None,
+) -> List[Sample]:
+    """
+    Вернуть копии примеров с полями payload_path и payload_mime.
+
+    Хэш исходника берётся из image_sha256 (манифест) или считается по файлу. Уже
+    закэшированные изображения не декодируются; остальные обрабатываются в пуле из
+    max_workers процессов (декодирование и сжатие упираются в CPU). Скан, который не
+    удалось декодировать, возвращается без payload_path, с текстом ошибки в
+    preprocess_error, и проверяется по исходному файлу.
+    """
+    cache = cache or PayloadCache()
+    if max_workers is None or max_workers <= 1:
+        return _prepare(samples, cache, None)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return _prepare(samples, cache, pool)
+
+
+def iter_preprocessed(
+    samples: Iterable[Sample],
+    cache: PayloadCache | None = None,
+    max_workers: int | None = None,
+    chunk_size: int = 256,
+) -> Iterator[Sample]:
+    """Потоковая версия preprocess_samples для stream_task_directory; пул процессов один на весь поток."""
+    cache = cache or PayloadCache()
+    iterator = iter(samples)
+    pool = ProcessPoolExecutor(max_workers=max_workers) if max_workers is not None and max_workers > 1 else None
+    try:
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            yield from _prepare(chunk, cache, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def load_payload(sample: Sample) -> Tuple[bytes, str]:
+    """Байты и MIME-тип для отправки провайдеру; без предобработки — исходный файл."""
+    if "payload_path" in sample:
+        return Path(sample["payload_path"]).read_bytes(), sample["payload_mime"]
+    suffix = Path(sample["image_path"]).suffix.lower()
+    mime = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp"}.get(suffix, "image/png")
+    return Path(sample["image_path"]).read_bytes(), mime
+
+
+def payload_data_url(sample: Sample) -> str:
+    """data:-URL с base64, в котором изображение принимают мультимодальные API."""
+    payload, mime = load_payload(sample)
+    return f"data:{mime};base64,{base64.b64encode(payload).decode('ascii')}"
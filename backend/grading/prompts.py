@@ -0,0 +1,174 @@
+"""Построение промптов: общий для задачи префикс первым, данные ученика — в конце."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple
+
+from backend.grading.preprocess import payload_data_url
+from backend.grading.rate_limit import CHARS_PER_TOKEN, IMAGE_TOKENS
+from backend.grading.types import Sample
+
+DEFAULT_SYSTEM_PROMPT = (
+    "Ты — эксперт предметной комиссии ЕГЭ. Проверь рукописное решение ученика строго по "
+    "критериям оценивания. Ответь JSON-объектом с полями pred_score (целый балл от 0 до "
+    "максимального), confidence (уверенность от 0 до 1) и comment (краткое обоснование)."
+)
+
+
+def count_tokens(text: str) -> int:
+    """Оценка числа токенов текста той же эвристикой, что и в rate_limit (~4 символа на токен)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def prefix_fields(sample: Sample) -> Tuple[str, str, int]:
+    """Поля Sample, из которых строится общий префикс: всё, что одинаково у учеников задачи."""
+    return sample["statement_text"], sample["rubric_text"], int(sample["max_score"])
+
+
+def prefix_order(samples: Sequence[Sample]) -> List[int]:
+    """
+    Перестановка индексов, при которой примеры с общим префиксом идут подряд.
+
+    Группы упорядочены по первому появлению, внутри группы сохраняется исходный порядок,
+    поэтому для одной задачи перестановка тождественная.
+    """
+
+    groups: Dict[Hashable, List[int]] = {}
+    for idx, sample in enumerate(samples):
+        groups.setdefault(prefix_fields(sample), []).append(idx)
+    return [idx for group in groups.values() for idx in group]
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """
+    Промпт одного ученика в раскладке «стабильный префикс + переменный хвост».
+
+    Префикс (system_text + task_text) побайтно совпадает у всех учеников задачи, его
+    хэш — prefix_key. Изображение и решение ученика идут после него, чтобы провайдер
+    мог переиспользовать KV-кэш префикса.
+    """
+
+    prefix_key: str
+    system_text: str
+    task_text: str
+    student_text: str
+    image_url: str
+    prefix_tokens: int
+    student_tokens: int
+    image_tokens: int
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prefix_tokens + self.student_tokens + self.image_tokens
+
+    def to_messages(self, cache_marker: bool = True) -> List[dict]:
+        """
+        Сообщения в формате chat API с контентными блоками.
+
+        С cache_marker=True последний блок префикса помечается cache_control — у
+        провайдеров с явными точками кэширования это граница кэшируемой части.
+        """
+
+        task_block: dict = {"type": "text", "text": self.task_text}
+        if cache_marker:
+            task_block["cache_control"] = {"type": "ephemeral"}
+        user_content: List[dict] = [task_block, {"type": "text", "text": self.student_text}]
+        if self.image_url:
+            user_content.append({"type": "image_url", "image_url": {"url": self.image_url}})
+        return [
+            {"role": "system", "content": [{"type": "text", "text": self.system_text}]},
+            {"role": "user", "content": user_content},
+        ]
+
+
+class PromptBuilder:
+    """
+    Строит Prompt для Sample; текст префикса и его токены считаются один раз на задачу.
+
+    tokenizer — функция «текст -> число токенов» (по умолчанию count_tokens); для точного
+    подсчёта можно передать токенизатор модели. Готовые префиксы хранятся в LRU на
+    max_cached_prefixes задач.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+        tokenizer: Callable[[str], int] = count_tokens,
+        image_tokens: int = IMAGE_TOKENS,
+        max_cached_prefixes: int = 1024,
+    ):
+        self.system_prompt = system_prompt
+        self.tokenizer = tokenizer
+        self.image_tokens = image_tokens
+        self.max_cached_prefixes = max_cached_prefixes
+        self._prefixes: OrderedDict[Tuple[str, str, int], Tuple[str, str, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprint(self) -> str:
+        """Короткий хэш шаблона промпта — входит в ключ кэша результатов бэкенда."""
+        template = json.dumps([self.system_prompt, self.task_text("", "", 0), self.image_tokens])
+        return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def task_text(statement_text: str, rubric_text: str, max_score: int) -> str:
+        return (
+            f"Условие задачи:\n{statement_text}\n\n"
+            f"Критерии оценивания:\n{rubric_text}\n\n"
+            f"Максимальный балл: {max_score}."
+        )
+
+    @staticmethod
+    def student_text(sample: Sample) -> str:
+        solution = sample.get("solution_text")
+        if solution:
+            return f"Решение ученика (распознанный текст):\n{solution}\n\nСкан работы приложен ниже."
+        return "Скан работы ученика приложен ниже."
+
+    def _prefix(self, sample: Sample) -> Tuple[str, str, int]:
+        fields = prefix_fields(sample)
+        with self._lock:
+            cached = self._prefixes.get(fields)
+            if cached is not None:
+                self._prefixes.move_to_end(fields)
+                return cached
+        task_text = self.task_text(*fields)
+        key = hashlib.sha256(f"{self.system_prompt}\x00{task_text}".encode("utf-8")).hexdigest()
+        prefix = (task_text, key, self.tokenizer(self.system_prompt) + self.tokenizer(task_text))
+        with self._lock:
+            self._prefixes[fields] = prefix
+            if len(self._prefixes) > self.max_cached_prefixes:
+                self._prefixes.popitem(last=False)
+        return prefix
+
+    def build(self, sample: Sample) -> Prompt:
+        task_text, key, prefix_tokens = self._prefix(sample)
+        student_text = self.student_text(sample)
+        # Провайдер не видит наших путей: скан всегда уходит data-URL, с предобработкой или без.
+        image_url = payload_data_url(sample) if sample.get("payload_path") or sample.get("image_path") else ""
+        return Prompt(
+            prefix_key=key,
+            system_text=self.system_prompt,
+            task_text=task_text,
+            student_text=student_text,
+            image_url=image_url,
+            prefix_tokens=prefix_tokens,
+            student_tokens=self.tokenizer(student_text),
+            image_tokens=self.image_tokens if image_url else 0,
+        )
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_prefixes"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,81 @@
+"""Асинхронные лимитеры под квоты провайдера: запросы и токены в минуту."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable
+
+from backend.grading.types import Sample
+
+# Грубая оценка: ~4 символа на токен и фиксированная цена изображения.
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1000
+
+
+def estimate_sample_tokens(sample: Sample) -> int:
+    """Оценить число входных токенов запроса по тексту условия, критериев и решения."""
+    text_len = len(sample["statement_text"]) + len(sample["rubric_text"]) + len(sample.get("solution_text", ""))
+    return text_len // CHARS_PER_TOKEN + IMAGE_TOKENS
+
+
+class TokenBucket:
+    """
+    Классический token bucket: ёмкость capacity, пополнение rate_per_minute единиц в минуту.
+
+    Ожидающие корутины обслуживаются по очереди (FIFO), поэтому крупный запрос не голодает.
+    Запрос больше ёмкости урезается до ёмкости, чтобы не заблокировать пайплайн навсегда.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate_per_minute <= 0:
+            raise ValueError("Скорость пополнения должна быть положительной.")
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        if self.capacity <= 0:
+            raise ValueError("Ёмкость bucket должна быть положительной.")
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """Списать amount, если хватает; иначе вернуть, сколько секунд ждать (ничего не списывая)."""
+        amount = min(float(amount), self.capacity)
+        self._refill()
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return 0.0
+        return (amount - self._tokens) / self.rate_per_second
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        async with self._lock:
+            while True:
+                wait = self.try_acquire(amount)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """Связка лимитов RPM и TPM; любой из них можно отключить, передав None."""
+
+    def __init__(self, requests_per_minute: float | None = None, tokens_per_minute: float | None = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    async def acquire(self, tokens: int = 0) -> None:
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None and tokens > 0:
+            await self.tokens.acquire(tokens)
@@ -0,0 +1,325 @@
+"""Прогон пайплайна по всем задачам в data/processed с параллелизмом, шардированием и сводкой."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from backend.analysis.metrics import accuracy, mae, quadratic_weighted_kappa
+from backend.grading.backends.base import Backend
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.backends.http_backend import HTTPGradingBackend
+from backend.grading.blobs import merge_blob_stores
+from backend.grading.columnar import jsonl_to_columnar
+from backend.grading.io_utils import drop_superseded_errors
+from backend.grading.pipeline import _default_experiment_name, stream_task_directory, telemetry_path
+from backend.grading.sharding import Shard, parse_shard, shard_suffix, validate_shard
+from backend.grading.types import GradingResult
+
+DEFAULT_DATA_DIR = Path("data/processed")
+_SUMMARY_FIELDS = ("task_id", "pred_score", "true_score", "max_score", "confidence", "error")
+
+
+def discover_tasks(data_dir: Path = DEFAULT_DATA_DIR, labels_filename: str = "labels.csv") -> List[Path]:
+    """Каталоги задач (с labels.csv) в data_dir, отсортированные по имени."""
+    if not data_dir.is_dir():
+        raise FileNotFoundError(f"Не найден каталог с задачами: {data_dir}")
+    return sorted(path for path in data_dir.iterdir() if (path / labels_filename).is_file())
+
+
+def _run_task_worker(
+    task_dir: Path,
+    backend: Backend,
+    experiment_name: str,
+    output_path: Path,
+    labels_filename: str,
+    metadata: dict,
+    shard: Shard | None,
+    max_workers: int,
+    resume: bool,
+    use_manifest: bool,
+    capture_errors: bool,
+    blobs: bool = False,
+) -> Tuple[str, int, Path]:
+    written, path = stream_task_directory(
+        task_dir,
+        backend,
+        experiment_name=experiment_name,
+        labels_filename=labels_filename,
+        metadata=metadata,
+        resume=resume,
+        max_workers=max_workers,
+        capture_errors=capture_errors,
+        use_manifest=use_manifest,
+        shard=shard,
+        output_path=output_path,
+        blobs=blobs,
+    )
+    return task_dir.name, written, path
+
+
+def merge_results(paths: Sequence[Path], output_path: Path) -> Path:
+    """
+    Склеить JSONL-файлы в указанном порядке потоково, копируя байты.
+
+    Строки с ошибкой, заменённые повторной проверкой того же ученика, затем удаляются
+    (см. drop_superseded_errors). Хранилища блобов (<name>.blobs) исходных файлов, если они есть, объединяются в
+    хранилище склеенного файла.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("wb") as out:
+        for path in paths:
+            with path.open("rb") as src:
+                shutil.copyfileobj(src, out)
+    drop_superseded_errors(output_path)
+    merge_blob_stores(paths, output_path)
+    return output_path
+
+
+def summarize_results(path: Path) -> dict:
+    """
+    Сводка по JSONL с результатами: метрики из backend/analysis/metrics.py по задачам и в целом.
+
+    Строки с ошибкой бэкенда считаются отдельно и в метрики не входят. Каппа считается
+    только по задачам: у разных задач разный max_score.
+    """
+
+    by_task: Dict[str, List[GradingResult]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    cascade_hits: Dict[int, int] = defaultdict(int)
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("error"):
+                errors[row["task_id"]] += 1
+                continue
+            if "cascade_stage" in row:
+                cascade_hits[row["cascade_stage"]] += 1
+            by_task[row["task_id"]].append({key: row[key] for key in _SUMMARY_FIELDS if key in row})  # type: ignore[misc]
+
+    tasks = {}
+    for task_id in sorted(set(by_task) | set(errors)):
+        results = by_task.get(task_id, [])
+        tasks[task_id] = {"count": len(results), "errors": errors.get(task_id, 0)}
+        if results:
+            tasks[task_id].update(
+                accuracy=accuracy(results), mae=mae(results), qwk=quadratic_weighted_kappa(results)
+            )
+
+    all_results = [result for results in by_task.values() for result in results]
+    overall = {"count": len(all_results), "errors": sum(errors.values()), "tasks": len(tasks)}
+    if all_results:
+        overall.update(accuracy=accuracy(all_results), mae=mae(all_results))
+    if cascade_hits:
+        overall["cascade_stage_hits"] = {str(stage): cascade_hits[stage] for stage in sorted(cascade_hits)}
+    return {"overall": overall, "tasks": tasks}
+
+
+def _read_telemetry(output_path: Path) -> dict:
+    path = telemetry_path(output_path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))["telemetry"]
+
+
+def _write_summary(summary: dict, path: Path) -> Path:
+    path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def run_dataset(
+    backend: Backend,
+    data_dir: Path = DEFAULT_DATA_DIR,
+    experiment_name: str | None = None,
+    results_dir: Path | None = None,
+    task_ids: Sequence[str] | None = None,
+    labels_filename: str = "labels.csv",
+    metadata: dict | None = None,
+    max_parallel_tasks: int = 1,
+    max_workers_per_task: int = 1,
+    max_total_workers: int | None = None,
+    shard: Shard | None = None,
+    resume: bool = False,
+    use_manifest: bool = False,
+    capture_errors: bool = True,
+    columnar: bool = False,
+    blobs: bool = False,
+) -> Tuple[dict, Path]:
+    """
+    Прогнать бэкенд по всем задачам data_dir и собрать единый эксперимент.
+
+    Задачи выполняются в пуле из max_parallel_tasks процессов, внутри задачи — в
+    max_workers_per_task потоках; max_total_workers ограничивает и число процессов, и их
+    произведение.
+    Раскладка результатов:
+      results_dir/<experiment>/<task_id>[.shard-i-of-N].jsonl  — по задачам;
+      results_dir/<experiment>[.shard-i-of-N].jsonl            — объединённый файл;
+      results_dir/<experiment>[.shard-i-of-N].summary.json     — сводка метрик и телеметрии по задачам;
+      results_dir/<experiment>[.shard-i-of-N].columns/         — колоночная копия (columnar=True);
+      results_dir/<experiment>[.shard-i-of-N].blobs[.idx]      — raw_response и comment (blobs=True).
+    Возвращает (сводка, путь к объединённому файлу).
+    """
+
+    if max_parallel_tasks <= 0 or max_workers_per_task <= 0:
+        raise ValueError("Лимиты параллелизма должны быть положительными.")
+    if shard is not None:
+        validate_shard(shard)
+    if max_total_workers is not None:
+        if max_total_workers <= 0:
+            raise ValueError("Лимиты параллелизма должны быть положительными.")
+        max_parallel_tasks = min(max_parallel_tasks, max_total_workers)
+        max_workers_per_task = max(1, min(max_workers_per_task, max_total_workers // max_parallel_tasks))
+
+    task_dirs = discover_tasks(data_dir, labels_filename=labels_filename)
+    if task_ids is not None:
+        wanted = set(task_ids)
+        task_dirs = [task_dir for task_dir in task_dirs if task_dir.name in wanted]
+
+    experiment_name = experiment_name or _default_experiment_name(backend)
+    results_dir = (results_dir or Path("results")).resolve()
+    suffix = shard_suffix(shard)
+    task_output_dir = results_dir / experiment_name
+    metadata = dict(metadata or {})
+
+    jobs = [
+        (
+            task_dir,
+            backend,
+            experiment_name,
+            task_output_dir / f"{task_dir.name}{suffix}.jsonl",
+            labels_filename,
+            metadata,
+            shard,
+            max_workers_per_task,
+            resume,
+            use_manifest,
+            capture_errors,
+            blobs,
+        )
+        for task_dir in task_dirs
+    ]
+    if max_parallel_tasks == 1 or len(jobs) <= 1:
+        outputs = [_run_task_worker(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_parallel_tasks, len(jobs))) as pool:
+            outputs = list(pool.map(_run_task_worker, *zip(*jobs)))
+
+    merged_path = merge_results([path for _, _, path in outputs], results_dir / f"{experiment_name}{suffix}.jsonl")
+    summary = summarize_results(merged_path)
+    summary["experiment_name"] = experiment_name
+    summary["shard"] = list(shard) if shard is not None else None
+    summary["graded_in_this_run"] = {task_id: written for task_id, written, _ in outputs}
+    summary["telemetry"] = {task_id: _read_telemetry(path) for task_id, _, path in outputs}
+    _write_summary(summary, merged_path.with_suffix(".summary.json"))
+    if columnar:
+        jsonl_to_columnar(merged_path)
+    return summary, merged_path
+
+
+def merge_shards(
+    experiment_name: str, results_dir: Path | None = None, columnar: bool = False
+) -> Tuple[dict, Path]:
+    """Объединить файлы шардов <experiment>.shard-i-of-N.jsonl в <experiment>.jsonl и пересчитать сводку."""
+    results_dir = (results_dir or Path("results")).resolve()
+    shard_paths = sorted(results_dir.glob(f"{experiment_name}.shard-*-of-*.jsonl"))
+    if not shard_paths:
+        raise FileNotFoundError(f"Не найдены файлы шардов эксперимента {experiment_name} в {results_dir}")
+
+    totals = {int(path.name.rsplit("-of-", 1)[1].split(".")[0]) for path in shard_paths}
+    if len(totals) != 1:
+        raise ValueError(f"Файлы шардов относятся к разным разбиениям: N={sorted(totals)}")
+    total = totals.pop()
+    expected = [results_dir / f"{experiment_name}{shard_suffix((idx, total))}.jsonl" for idx in range(total)]
+    missing = [path.name for path in expected if not path.exists()]
+    if missing:
+        raise FileNotFoundError(f"Не хватает шардов: {', '.join(missing)}")
+
+    merged_path = merge_results(expected, results_dir / f"{experiment_name}.jsonl")
+    summary = summarize_results(merged_path)
+    summary["experiment_name"] = experiment_name
+    summary["shard"] = None
+    _write_summary(summary, merged_path.with_suffix(".summary.json"))
+    if columnar:
+        jsonl_to_columnar(merged_path)
+    return summary, merged_path
+
+
+def _make_backend(args: argparse.Namespace) -> Backend:
+    if args.backend == "dummy":
+        return DummyBackend(seed=args.seed)
+    if args.backend == "http":
+        if not args.base_url:
+            raise SystemExit("Для --backend http нужен --base-url.")
+        return HTTPGradingBackend(args.base_url, model_name=args.model)
+    raise SystemExit(f"Неизвестный бэкенд: {args.backend}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Проверка всех задач из data/processed.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="прогнать бэкенд по задачам")
+    run.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    run.add_argument("--results-dir", type=Path, default=Path("results"))
+    run.add_argument("--experiment", default=None)
+    run.add_argument("--task", action="append", dest="task_ids", help="ограничиться задачей (можно повторять)")
+    run.add_argument("--backend", choices=("dummy", "http"), default="dummy")
+    run.add_argument("--seed", default="seedless")
+    run.add_argument("--base-url", default=None)
+    run.add_argument("--model", default="remote")
+    run.add_argument("--parallel-tasks", type=int, default=1)
+    run.add_argument("--workers-per-task", type=int, default=1)
+    run.add_argument("--max-total-workers", type=int, default=None)
+    run.add_argument("--shard", type=parse_shard, default=None, help="i/N, i от 0 до N-1")
+    run.add_argument("--resume", action="store_true")
+    run.add_argument("--use-manifest", action="store_true")
+    run.add_argument("--columnar", action="store_true", help="записать колоночную копию <experiment>.columns")
+    run.add_argument("--blobs", action="store_true", help="вынести raw_response и comment в <experiment>.blobs")
+
+    merge = sub.add_parser("merge", help="объединить шарды эксперимента")
+    merge.add_argument("--results-dir", type=Path, default=Path("results"))
+    merge.add_argument("--experiment", required=True)
+    merge.add_argument("--columnar", action="store_true", help="записать колоночную копию <experiment>.columns")
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        backend = _make_backend(args)
+        try:
+            summary, path = run_dataset(
+                backend,
+                data_dir=args.data_dir,
+                experiment_name=args.experiment,
+                results_dir=args.results_dir,
+                task_ids=args.task_ids,
+                max_parallel_tasks=args.parallel_tasks,
+                max_workers_per_task=args.workers_per_task,
+                max_total_workers=args.max_total_workers,
+                shard=args.shard,
+                resume=args.resume,
+                use_manifest=args.use_manifest,
+                columnar=args.columnar,
+                blobs=args.blobs,
+            )
+        finally:
+            close = getattr(backend, "close", None)
+            if close is not None:
+                close()
+    else:
+        summary, path = merge_shards(args.experiment, results_dir=args.results_dir, columnar=args.columnar)
+    print(json.dumps(summary["overall"], ensure_ascii=False))
+    print(f"Результаты сохранены в: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
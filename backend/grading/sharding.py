@@ -0,0 +1,37 @@
+"""Детерминированное разбиение учеников на шарды для распределённых прогонов."""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Tuple
+
+Shard = Tuple[int, int]
+
+
+def shard_index(task_id: str, student_id: str, num_shards: int) -> int:
+    """Номер шарда 0..num_shards-1; не зависит от PYTHONHASHSEED, машины и порядка строк."""
+    digest = hashlib.blake2b(f"{task_id}|{student_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+def parse_shard(spec: str) -> Shard:
+    """Разобрать строку вида "i/N" (i от 0 до N-1)."""
+    try:
+        index_text, total_text = spec.split("/")
+        index, total = int(index_text), int(total_text)
+    except ValueError as exc:
+        raise ValueError(f"Шард задаётся как i/N, получено {spec!r}.") from exc
+    validate_shard((index, total))
+    return index, total
+
+
+def validate_shard(shard: Shard) -> None:
+    index, total = shard
+    if total <= 0 or not 0 <= index < total:
+        raise ValueError(f"Некорректный шард {index}/{total}: нужно 0 <= i < N.")
+
+
+def shard_suffix(shard: Shard | None) -> str:
+    if shard is None:
+        return ""
+    return f".shard-{shard[0]}-of-{shard[1]}"
@@ -0,0 +1,239 @@
+"""Компактное представление наборов примеров: общий контекст задачи хранится один раз."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, overload
+
+from backend.grading.io_utils import iter_samples
+from backend.grading.types import Sample
+
+_SAMPLE_KEYS = ("task_id", "student_id", "image_path", "statement_text", "rubric_text", "true_score", "max_score")
+
+
+@dataclass(frozen=True, slots=True)
+class Task:
+    """Общий для всех учеников контекст задачи."""
+
+    task_id: str
+    statement_text: str
+    rubric_text: str
+
+
+class SampleTable(Sequence["SampleView"]):
+    """
+    Колоночная таблица примеров, ссылающихся на Task по индексу.
+
+    Условие и критерии хранятся один раз на задачу, баллы — в array('i'), редкие поля
+    (solution_text, meta, image_sha256) — в разреженных словарях. Элемент таблицы —
+    SampleView: лёгкое представление без копирования, удовлетворяющее контракту Sample.
+    Таблица (и её срезы) сериализуется pickle компактно: каждая задача попадает в поток
+    один раз, поэтому её дёшево передавать в пул процессов.
+    """
+
+    __slots__ = (
+        "tasks",
+        "_task_index",
+        "task_idx",
+        "student_ids",
+        "image_paths",
+        "true_scores",
+        "max_scores",
+        "solution_texts",
+        "metas",
+        "image_hashes",
+    )
+
+    def __init__(self, tasks: Iterable[Task] = ()):
+        self.tasks: List[Task] = []
+        self._task_index: Dict[str, int] = {}
+        self.task_idx = array("I")
+        self.student_ids: List[str] = []
+        self.image_paths: List[str] = []
+        self.true_scores = array("i")
+        self.max_scores = array("i")
+        self.solution_texts: Dict[int, str] = {}
+        self.metas: Dict[int, Dict[str, object]] = {}
+        self.image_hashes: Dict[int, str] = {}
+        for task in tasks:
+            self.add_task(task)
+
+    def add_task(self, task: Task) -> int:
+        """Зарегистрировать задачу и вернуть её индекс; повторная регистрация идемпотентна."""
+        existing = self._task_index.get(task.task_id)
+        if existing is not None:
+            if self.tasks[existing] != task:
+                raise ValueError(f"Задача {task.task_id!r} уже добавлена с другим условием или критериями.")
+            return existing
+        self.tasks.append(task)
+        self._task_index[task.task_id] = len(self.tasks) - 1
+        return len(self.tasks) - 1
+
+    def append(
+        self,
+        task_id: str,
+        student_id: str,
+        image_path: str,
+        true_score: int,
+        max_score: int,
+        solution_text: Optional[str] = None,
+        meta: Optional[Dict[str, object]] = None,
+        image_sha256: Optional[str] = None,
+    ) -> None:
+        if task_id not in self._task_index:
+            raise KeyError(f"Задача {task_id!r} не зарегистрирована в таблице; вызовите add_task.")
+        row = len(self.student_ids)
+        self.task_idx.append(self._task_index[task_id])
+        self.student_ids.append(student_id)
+        self.image_paths.append(image_path)
+        self.true_scores.append(true_score)
+        self.max_scores.append(max_score)
+        if solution_text:
+            self.solution_texts[row] = solution_text
+        if meta:
+            self.metas[row] = meta
+        if image_sha256:
+            self.image_hashes[row] = image_sha256
+
+    def append_sample(self, sample: Sample | Mapping) -> None:
+        self.add_task(Task(sample["task_id"], sample["statement_text"], sample["rubric_text"]))
+        self.append(
+            sample["task_id"],
+            sample["student_id"],
+            sample["image_path"],
+            int(sample["true_score"]),
+            int(sample["max_score"]),
+            solution_text=sample.get("solution_text"),
+            meta=sample.get("meta"),
+            image_sha256=sample.get("image_sha256"),
+        )
+
+    @classmethod
+    def from_samples(cls, samples: Iterable[Sample | Mapping]) -> "SampleTable":
+        table = cls()
+        for sample in samples:
+            table.append_sample(sample)
+        return table
+
+    @classmethod
+    def from_task_dirs(
+        cls, task_dirs: Iterable[Path], labels_filename: str = "labels.csv", use_manifest: bool = False
+    ) -> "SampleTable":
+        """Собрать таблицу по нескольким каталогам задач без промежуточного списка Sample."""
+        table = cls()
+        for task_dir in task_dirs:
+            for sample in iter_samples(Path(task_dir), labels_filename=labels_filename, use_manifest=use_manifest):
+                table.append_sample(sample)
+        return table
+
+    def task_of(self, row: int) -> Task:
+        return self.tasks[self.task_idx[row]]
+
+    def __len__(self) -> int:
+        return len(self.student_ids)
+
+    @overload
+    def __getitem__(self, index: int) -> "SampleView": ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "SampleTable": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Индекс вне диапазона таблицы примеров.")
+        return SampleView(self, index)
+
+    def __iter__(self) -> Iterator["SampleView"]:
+        for row in range(len(self)):
+            yield SampleView(self, row)
+
+    def take(self, rows: Iterable[int]) -> "SampleTable":
+        """Новая таблица из выбранных строк; ссылается только на нужные задачи."""
+        subset = SampleTable()
+        for row in rows:
+            task = self.task_of(row)
+            subset.add_task(task)
+            subset.append(
+                task.task_id,
+                self.student_ids[row],
+                self.image_paths[row],
+                self.true_scores[row],
+                self.max_scores[row],
+                solution_text=self.solution_texts.get(row),
+                meta=self.metas.get(row),
+                image_sha256=self.image_hashes.get(row),
+            )
+        return subset
+
+    def chunks(self, chunk_size: int) -> List["SampleTable"]:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size должен быть положительным.")
+        return [self[start : start + chunk_size] for start in range(0, len(self), chunk_size)]
+
+    def to_samples(self) -> List[Sample]:
+        """Материализовать обычные словари Sample (например, для сериализации в JSON)."""
+        return [view.to_dict() for view in self]
+
+
+class SampleView(Mapping):
+    """Строка SampleTable в виде неизменяемого словаря с ключами Sample; данные не копируются."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: SampleTable, row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str):
+        table, row = self._table, self._row
+        if key == "task_id":
+            return table.task_of(row).task_id
+        if key == "student_id":
+            return table.student_ids[row]
+        if key == "image_path":
+            return table.image_paths[row]
+        if key == "statement_text":
+            return table.task_of(row).statement_text
+        if key == "rubric_text":
+            return table.task_of(row).rubric_text
+        if key == "true_score":
+            return table.true_scores[row]
+        if key == "max_score":
+            return table.max_scores[row]
+        if key == "solution_text" and row in table.solution_texts:
+            return table.solution_texts[row]
+        if key == "meta" and row in table.metas:
+            return table.metas[row]
+        if key == "image_sha256" and row in table.image_hashes:
+            return table.image_hashes[row]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from _SAMPLE_KEYS
+        table, row = self._table, self._row
+        if row in table.solution_texts:
+            yield "solution_text"
+        if row in table.metas:
+            yield "meta"
+        if row in table.image_hashes:
+            yield "image_sha256"
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Sample:
+        return {key: self[key] for key in self}  # type: ignore[return-value]
+
+    def __reduce__(self):
+        # Отдельный view сериализуется как таблица из одной строки, а не вся исходная таблица.
+        return SampleView, (self._table.take([self._row]), 0)
+
+    def __repr__(self) -> str:
+        return f"SampleView({self.to_dict()!r})"
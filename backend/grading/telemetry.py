@@ -0,0 +1,248 @@
+"""Телеметрия пайплайна: гистограммы задержек по этапам, счётчики и gauge'и в формате Prometheus."""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+STAGES = ("load", "resolve", "backend_call", "normalize", "write")
+QUANTILES = (0.5, 0.95, 0.99)
+# Границы корзин в секундах: от быстрых локальных этапов до долгих вызовов мультимодальных LLM.
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+_COUNTER_HELP = {
+    "results": "Нормализованные результаты проверки.",
+    "errors": "Результаты с ошибкой бэкенда.",
+    "retries": "Повторные вызовы бэкенда (по статистике ResilientBackend).",
+    "cache_hits": "Результаты, взятые из GradingCache.",
+    "cache_misses": "Примеры, отправленные в бэкенд мимо кэша.",
+    "deduplicated": "Результаты, размноженные с представителя группы дубликатов.",
+}
+
+Labels = Tuple[str, str]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами; квантили оцениваются интерполяцией внутри корзины."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля как в histogram_quantile Prometheus; выше последней границы — сама граница."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for idx, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if idx == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[idx - 1] if idx else 0.0
+                return lower + (self.buckets[idx] - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+
+class Recorder:
+    """Телеметрия с привязанными метками backend/model — то, что передаётся в горячий путь."""
+
+    __slots__ = ("telemetry", "labels")
+
+    def __init__(self, telemetry: "Telemetry", backend_name: str, model_name: str):
+        self.telemetry = telemetry
+        self.labels: Labels = (backend_name, model_name)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.telemetry.observe_many(stage, (seconds,), self.labels)
+
+    def observe_many(self, stage: str, values: Sequence[float]) -> None:
+        if values:
+            self.telemetry.observe_many(stage, values, self.labels)
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        if amount:
+            self.telemetry.inc(name, amount, self.labels)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def in_flight(self) -> Iterator[None]:
+        self.telemetry.add_gauge("in_flight", 1, self.labels)
+        try:
+            yield
+        finally:
+            self.telemetry.add_gauge("in_flight", -1, self.labels)
+
+    def timed_iter(self, stage: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Выдавать элементы iterable, замеряя время получения каждого как этап stage."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(stage, time.perf_counter() - start)
+            yield item
+
+
+class Telemetry:
+    """
+    Потокобезопасный реестр метрик пайплайна.
+
+    Гистограммы задержек ведутся по (этап, backend, model), счётчики и gauge'и — по
+    (backend, model). С parent каждое измерение дублируется в родительский реестр: так
+    телеметрия отдельного прогона (для сводки в метаданных) одновременно попадает в
+    глобальный реестр, который отдаёт эндпоинт /metrics.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, parent: "Telemetry | None" = None):
+        self.buckets = tuple(buckets)
+        self.parent = parent
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str, str], float] = {}
+        self._gauges: Dict[Tuple[str, str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def recorder(self, backend) -> Recorder:
+        return Recorder(self, backend.name, getattr(backend, "model_name", backend.name))
+
+    def observe(self, stage: str, seconds: float, labels: Labels = ("", "")) -> None:
+        self.observe_many(stage, (seconds,), labels)
+
+    def observe_many(self, stage: str, values: Sequence[float], labels: Labels = ("", "")) -> None:
+        """Записать пачку измерений под одной блокировкой — так горячий путь не платит за lock на пример."""
+        key = (stage, *labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            for value in values:
+                histogram.observe(value)
+        if self.parent is not None:
+            self.parent.observe_many(stage, values, labels)
+
+    def inc(self, name: str, amount: float = 1, labels: Labels = ("", "")) -> None:
+        key = (name, *labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        if self.parent is not None:
+            self.parent.inc(name, amount, labels)
+
+    def add_gauge(self, name: str, delta: float, labels: Labels = ("", "")) -> None:
+        key = (name, *labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+        if self.parent is not None:
+            self.parent.add_gauge(name, delta, labels)
+
+    def summary(self) -> dict:
+        """Сводка для метаданных прогона: квантили по этапам и счётчики по backend/model."""
+        with self._lock:
+            histograms = {
+                key: (h.count, h.sum, [h.quantile(q) for q in QUANTILES]) for key, h in self._histograms.items()
+            }
+            counters = dict(self._counters)
+
+        by_backend: Dict[str, dict] = {}
+        for (stage, backend_name, model_name), (count, total, quantiles) in sorted(histograms.items()):
+            block = by_backend.setdefault(f"{backend_name}/{model_name}", {"stages": {}, "counters": {}})
+            block["stages"][stage] = {
+                "count": count,
+                "mean": round(total / count, 6) if count else 0.0,
+                **{f"p{int(q * 100)}": round(value, 6) for q, value in zip(QUANTILES, quantiles)},
+            }
+        for (name, backend_name, model_name), value in sorted(counters.items()):
+            block = by_backend.setdefault(f"{backend_name}/{model_name}", {"stages": {}, "counters": {}})
+            block["counters"][name] = value
+        return by_backend
+
+    def render_prometheus(self, prefix: str = "grading") -> str:
+        """Текстовый формат экспозиции Prometheus (version 0.0.4)."""
+        with self._lock:
+            histograms = {
+                key: (list(h.counts), h.count, h.sum, [h.quantile(q) for q in QUANTILES])
+                for key, h in self._histograms.items()
+            }
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines: List[str] = [
+            f"# HELP {prefix}_stage_seconds Длительность этапов пайплайна проверки.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for (stage, backend_name, model_name), (counts, count, total, _) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                labels = _fmt_labels(stage=stage, backend=backend_name, model=model_name, le=str(bound))
+                lines.append(f"{prefix}_stage_seconds_bucket{labels} {cumulative}")
+            labels = _fmt_labels(stage=stage, backend=backend_name, model=model_name)
+            lines.append(f"{prefix}_stage_seconds_sum{labels} {total}")
+            lines.append(f"{prefix}_stage_seconds_count{labels} {count}")
+
+        lines.append(f"# HELP {prefix}_stage_latency_seconds Оценка квантилей длительности этапа по гистограмме.")
+        lines.append(f"# TYPE {prefix}_stage_latency_seconds gauge")
+        for (stage, backend_name, model_name), (_, _, _, quantiles) in sorted(histograms.items()):
+            for q, value in zip(QUANTILES, quantiles):
+                labels = _fmt_labels(stage=stage, backend=backend_name, model=model_name, quantile=str(q))
+                lines.append(f"{prefix}_stage_latency_seconds{labels} {value}")
+
+        for name, help_text in _COUNTER_HELP.items():
+            rows = [(key, value) for key, value in sorted(counters.items()) if key[0] == name]
+            if not rows:
+                continue
+            lines.append(f"# HELP {prefix}_{name}_total {help_text}")
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for (_, backend_name, model_name), value in rows:
+                lines.append(f"{prefix}_{name}_total{_fmt_labels(backend=backend_name, model=model_name)} {value}")
+
+        lines.append(f"# HELP {prefix}_in_flight Вызовы бэкенда, выполняющиеся прямо сейчас.")
+        lines.append(f"# TYPE {prefix}_in_flight gauge")
+        for (name, backend_name, model_name), value in sorted(gauges.items()):
+            if name == "in_flight":
+                lines.append(f"{prefix}_in_flight{_fmt_labels(backend=backend_name, model=model_name)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def __getstate__(self) -> dict:
+        # В процессы-воркеры уходит пустой реестр без родителя: измерения там не видны родителю.
+        return {"buckets": self.buckets}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["buckets"])
+
+
+GLOBAL_TELEMETRY = Telemetry()
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, NotRequired, Protocol, TypedDict, runtime_checkable
+from typing import Dict, List, NotRequired, Protocol, Sequence, TypedDict, runtime_checkable
 
 
 class Sample(TypedDict):
@@ -17,6 +17,9 @@ class Sample(TypedDict):
     true_score: int
     max_score: int
     solution_text: NotRequired[str]
+    image_sha256: NotRequired[str]
+    payload_path: NotRequired[str]
+    payload_mime: NotRequired[str]
     meta: NotRequired[Dict[str, object]]
 
 
@@ -35,6 +38,10 @@ class GradingResult(TypedDict, total=False):
     raw_response: dict
     timestamp: str
     experiment_name: str
+    error: str
+    cascade_stage: int
+    cascade_trace: List[dict]
+    dedup_of: str
 
 
 @runtime_checkable
@@ -48,6 +55,37 @@ class GradingBackend(Protocol):
         ...
 
 
+@runtime_checkable
+class BatchGradingBackend(GradingBackend, Protocol):
+    """
+    Бэкенд с пакетным вызовом: один запрос на несколько учеников.
+
+    grade_batch возвращает результаты в порядке входных примеров. Метод необязателен:
+    пайплайн проверяет его наличие и иначе вызывает grade по одному примеру.
+    """
+
+    def grade_batch(self, samples: Sequence[Sample]) -> List[GradingResult]:
+        ...
+
+
+@runtime_checkable
+class AsyncGradingBackend(Protocol):
+    """Асинхронный интерфейс бэкенда: тысячи запросов в полёте на одном event loop."""
+
+    name: str
+    model_name: str
+
+    async def agrade(self, sample: Sample) -> GradingResult:
+        ...
+
+
+class ResultSink(Protocol):
+    """Получатель нормализованных результатов по ходу прогона (например, MetricsAccumulator)."""
+
+    def update(self, result: GradingResult) -> None:
+        ...
+
+
 @dataclass(frozen=True)
 class ReliabilityBin:
     lower: float
@@ -0,0 +1,142 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from backend.app.jobs import JobManager
+from backend.app.main import create_app
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.demo import generate_dummy_task
+from backend.grading.telemetry import Telemetry
+
+
+class BatchCountingBackend(DummyBackend):
+    def __init__(self):
+        super().__init__(seed="api-seed")
+        self._batches = []
+
+    def grade_batch(self, samples):
+        self._batches.append(len(samples))
+        return super().grade_batch(samples)
+
+
+def grade_form(student_id: str):
+    data = {
+        "task_id": "task_01",
+        "student_id": student_id,
+        "statement_text": "Решите уравнение",
+        "rubric_text": "2 балла за полное решение",
+        "max_score": "2",
+    }
+    return {"data": data, "files": {"image": ("scan.png", b"fake image bytes", "image/png")}}
+
+
+def test_concurrent_grade_requests_are_coalesced(tmp_path):
+    backend = BatchCountingBackend()
+    app = create_app(backend=backend, upload_dir=tmp_path / "uploads", max_batch_size=8, max_wait_ms=200)
+
+    with TestClient(app) as client, ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda i: client.post("/grade", **grade_form(f"{i:04d}")), range(8)))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert sorted(response.json()["student_id"] for response in responses) == [f"{i:04d}" for i in range(8)]
+    assert sum(backend._batches) == 8 and len(backend._batches) < 8
+    assert len(list((tmp_path / "uploads").iterdir())) == 1
+
+
+class SlowBackend:
+    """Бэкенд без grade_batch с фиксированной задержкой, как у HTTP-провайдера."""
+
+    name = "slow"
+    model_name = "slow"
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.dummy = DummyBackend(seed="slow")
+
+    def grade(self, sample):
+        time.sleep(self.delay)
+        return self.dummy.grade(sample)
+
+
+def test_coalesced_requests_without_grade_batch_run_in_parallel(tmp_path):
+    app = create_app(backend=SlowBackend(0.2), upload_dir=tmp_path / "uploads", max_batch_size=8, max_wait_ms=50)
+
+    with TestClient(app) as client, ThreadPoolExecutor(max_workers=8) as pool:
+        start = time.perf_counter()
+        responses = list(pool.map(lambda i: client.post("/grade", **grade_form(f"{i:04d}")), range(8)))
+        elapsed = time.perf_counter() - start
+
+    assert all(response.status_code == 200 for response in responses)
+    # Последовательно пакет занял бы 8 * 0.2 = 1.6 с.
+    assert elapsed < 1.0
+
+
+def test_job_streams_progress_and_results(tmp_path):
+    data_dir = tmp_path / "data" / "processed"
+    generate_dummy_task(data_dir / "task_01", num_samples=6)
+    app = create_app(data_dir=data_dir, results_dir=tmp_path / "results")
+
+    with TestClient(app) as client:
+        created = client.post("/jobs", json={"task_id": "task_01", "experiment_name": "api_job"})
+        assert created.status_code == 202
+        job_id = created.json()["job_id"]
+
+        with client.stream("GET", f"/jobs/{job_id}/events") as response:
+            body = "".join(response.iter_text())
+
+        assert client.get(f"/jobs/{job_id}").json()["status"] == "succeeded"
+        assert client.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": "abc"}).status_code == 400
+        assert client.post("/jobs", json={"task_id": "../secrets"}).status_code == 404
+        for name in ("../../escaped", "nested/name", "..", "a\\b"):
+            assert client.post("/jobs", json={"task_id": "task_01", "experiment_name": name}).status_code == 422
+        assert client.post("/jobs", json={"task_id": "task_01", "max_workers": 0}).status_code == 422
+
+    events = [block for block in body.split("\n\n") if block]
+    kinds = [block.split("\n")[1].removeprefix("event: ") for block in events]
+    assert kinds.count("result") == 6
+    done = json.loads(events[-1].split("data: ", 1)[1])
+    assert done["done"] == 6 and done["output_path"].endswith("api_job.jsonl")
+
+
+def test_resumed_job_counts_only_remaining_students_and_old_jobs_are_evicted(tmp_path):
+    data_dir = tmp_path / "data" / "processed"
+    generate_dummy_task(data_dir / "task_01", num_samples=6)
+    manager = JobManager(DummyBackend(), data_dir=data_dir, results_dir=tmp_path / "results", max_retained_jobs=2)
+    try:
+        first = manager.submit("task_01", experiment_name="resumable")
+        wait_finished(first)
+        lines = (tmp_path / "results" / "resumable.jsonl").read_text(encoding="utf-8").splitlines()
+        (tmp_path / "results" / "resumable.jsonl").write_text("\n".join(lines[:4]) + "\n", encoding="utf-8")
+
+        resumed = manager.submit("task_01", experiment_name="resumable", resume=True)
+        wait_finished(resumed)
+        assert (resumed.total, resumed.done) == (2, 2)
+
+        latest = manager.submit("task_01", experiment_name="third")
+        wait_finished(latest)
+        assert list(manager.jobs) == [resumed.job_id, latest.job_id]
+    finally:
+        manager.shutdown()
+
+
+def wait_finished(job, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, "задание не завершилось"
+        time.sleep(0.01)
+
+
+def test_metrics_endpoint_exposes_prometheus_text(tmp_path):
+    telemetry = Telemetry()
+    app = create_app(upload_dir=tmp_path / "uploads", max_wait_ms=1, telemetry=telemetry)
+
+    with TestClient(app) as client:
+        assert client.post("/grade", **grade_form("0001")).status_code == 200
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE grading_stage_seconds histogram" in response.text
+    assert 'grading_results_total{backend="dummy_v1",model="dummy_v1"} 1' in response.text
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import pickle
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.grading.async_pipeline import agrade_dataset
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.backends.http_backend import HTTPGradingBackend
+from backend.grading.pipeline import grade_dataset
+from backend.grading.rate_limit import RateLimiter, TokenBucket
+
+
+def make_samples(count: int):
+    return [
+        {
+            "task_id": "task_01",
+            "student_id": f"{idx:04d}",
+            "image_path": f"student_{idx:04d}.png",
+            "statement_text": "Условие",
+            "rubric_text": "Критерии",
+            "true_score": idx % 3,
+            "max_score": 2,
+        }
+        for idx in range(count)
+    ]
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(0.02)
+        sample = body["sample"]
+        payload = json.dumps({"pred_score": sample["true_score"], "confidence": 0.8, "comment": body["model"]})
+        with cls.lock:
+            cls.in_flight -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_provider():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockProviderHandler)
+    MockProviderHandler.peak = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_agrade_dataset_against_mock_provider(mock_provider):
+    samples = make_samples(40)
+    backend = HTTPGradingBackend(mock_provider, model_name="mock-llm")
+
+    async def run():
+        try:
+            return await agrade_dataset(samples, backend, experiment_name="async_exp", max_concurrency=8)
+        finally:
+            await backend.aclose()
+
+    results = asyncio.run(run())
+
+    assert [r["student_id"] for r in results] == [s["student_id"] for s in samples]
+    assert all(r["pred_score"] == r["true_score"] for r in results)
+    assert results[0]["model_name"] == "mock-llm"
+    assert 1 < MockProviderHandler.peak <= 8
+
+
+class KeepAliveHandler(MockProviderHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_POST(self):
+        type(self).connections.add(self.client_address)
+        super().do_POST()
+
+
+def test_sync_http_backend_reuses_pooled_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    KeepAliveHandler.connections = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    backend = HTTPGradingBackend(f"http://127.0.0.1:{server.server_address[1]}", model_name="mock-llm")
+    try:
+        results = grade_dataset(make_samples(40), backend, max_workers=4)
+        # Процесс-воркер получает копию без клиента и создаёт свой пул.
+        restored = pickle.loads(pickle.dumps(backend))
+        assert restored.grade(make_samples(1)[0])["comment"] == "mock-llm"
+        restored.close()
+    finally:
+        backend.close()
+        server.shutdown()
+
+    assert all(r["pred_score"] == r["true_score"] for r in results)
+    # Раньше каждый вызов открывал своё соединение (40 + 1); теперь не больше числа потоков + копия.
+    assert len(KeepAliveHandler.connections) <= 5
+    assert backend._client is None
+
+
+def test_sync_backend_runs_through_adapter():
+    samples = make_samples(10)
+    backend = DummyBackend(seed="async-seed")
+
+    async_results = asyncio.run(agrade_dataset(samples, backend, experiment_name="exp"))
+    sync_results = grade_dataset(samples, backend, experiment_name="exp")
+
+    assert [r["pred_score"] for r in async_results] == [r["pred_score"] for r in sync_results]
+    assert async_results[0]["backend_name"] == backend.name
+
+
+def test_token_bucket_throttles_after_burst():
+    async def run():
+        bucket = TokenBucket(rate_per_minute=6000, capacity=1)
+        started = time.monotonic()
+        for _ in range(11):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_rate_limiter_caps_oversized_requests():
+    async def run():
+        limiter = RateLimiter(requests_per_minute=60_000, tokens_per_minute=100)
+        await limiter.acquire(tokens=10_000)
+
+    asyncio.run(asyncio.wait_for(run(), timeout=1))
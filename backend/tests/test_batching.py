@@ -0,0 +1,61 @@
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.batching import iter_micro_batches
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_async_pipeline import make_samples
+
+
+class PerSampleOnly:
+    name = "per_sample"
+    model_name = "per_sample"
+
+    def grade(self, sample):
+        return {"pred_score": sample["true_score"], "confidence": 1.0}
+
+
+class RecordingBatchBackend(DummyBackend):
+    def __init__(self):
+        super().__init__(seed="batch-seed")
+        self._batch_sizes = []
+
+    def grade_batch(self, samples):
+        self._batch_sizes.append(len(samples))
+        return super().grade_batch(samples)
+
+
+def test_micro_batches_respect_count_and_bytes():
+    samples = make_samples(7)
+
+    assert [len(b) for b in iter_micro_batches(samples, max_batch_size=3)] == [3, 3, 1]
+    by_bytes = iter_micro_batches(samples, max_batch_bytes=25, size_fn=lambda s: 10)
+    assert [len(b) for b in by_bytes] == [2, 2, 2, 1]
+
+
+def test_dummy_grade_batch_matches_per_sample_grade():
+    samples = make_samples(20)
+    backend = RecordingBatchBackend()
+
+    batched = grade_dataset(samples, backend, experiment_name="exp", max_batch_size=8, max_workers=2)
+    single = grade_dataset(samples, DummyBackend(seed="batch-seed"), experiment_name="exp")
+
+    assert backend._batch_sizes == [8, 8, 4]
+    assert [(r["student_id"], r["pred_score"], r["confidence"]) for r in batched] == [
+        (r["student_id"], r["pred_score"], r["confidence"]) for r in single
+    ]
+
+
+def test_vectorized_grade_batch_returns_identical_rows():
+    samples = [{**s, "max_score": idx % 5, "true_score": idx % 7} for idx, s in enumerate(make_samples(300))]
+    backend = DummyBackend(seed="vector", noise=0.9)
+
+    batched = backend.grade_batch(samples)
+    single = [backend.grade(sample) for sample in samples]
+
+    assert [{**r, "timestamp": None} for r in batched] == [{**r, "timestamp": None} for r in single]
+    assert all(type(r["pred_score"]) is int for r in batched)
+    assert backend.grade_batch([]) == []
+
+
+def test_backend_without_grade_batch_falls_back_to_grade():
+    results = grade_dataset(make_samples(5), PerSampleOnly(), max_batch_size=2)
+
+    assert [r["pred_score"] for r in results] == [s["true_score"] for s in make_samples(5)]
@@ -0,0 +1,44 @@
+import copy
+
+from backend.grading.benchmark import compare_reports, main, run_benchmark
+
+
+def test_run_benchmark_reports_every_stage(tmp_path):
+    report = run_benchmark(sizes=[40], work_dir=tmp_path)
+
+    stages = report["runs"][0]["stages"]
+    assert {"load_samples", "resolve_image_path", "grade_dataset", "save_results_jsonl"} <= set(stages)
+    assert "metrics.quadratic_weighted_kappa" in stages
+    assert all(stage["items_per_second"] > 0 and stage["peak_memory_bytes"] > 0 for stage in stages.values())
+
+
+def test_compare_flags_slowdown_and_memory_growth_but_ignores_noise():
+    baseline = {
+        "runs": [
+            {
+                "num_students": 100,
+                "stages": {
+                    "grade_dataset": {"seconds": 1.0, "items_per_second": 100, "peak_memory_bytes": 1000},
+                    "metrics.mae": {"seconds": 0.001, "items_per_second": 1e5, "peak_memory_bytes": 10},
+                },
+            }
+        ]
+    }
+    current = copy.deepcopy(baseline)
+    current["runs"][0]["stages"]["grade_dataset"].update(seconds=1.5, peak_memory_bytes=2000)
+    current["runs"][0]["stages"]["metrics.mae"]["seconds"] = 0.005
+
+    regressions = compare_reports(current, baseline)
+
+    assert {(r.stage, r.metric) for r in regressions} == {
+        ("grade_dataset", "seconds"),
+        ("grade_dataset", "peak_memory_bytes"),
+    }
+    assert compare_reports(baseline, baseline) == []
+
+
+def test_cli_run_writes_report_and_compares_with_itself(tmp_path):
+    report_path = tmp_path / "bench.json"
+    args = ["run", "--sizes", "20", "--no-memory", "--work-dir", str(tmp_path / "w"), "--output", str(report_path)]
+    assert main(args) == 0
+    assert main(["compare", str(report_path), str(report_path)]) == 0
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.blobs import BlobStore, blob_path, is_blob_ref, merge_blob_stores, open_blob_store
+from backend.grading.io_utils import JsonlResultWriter, read_completed_ids, save_results_jsonl
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_async_pipeline import make_samples
+
+
+def make_results(n=50):
+    results = grade_dataset(make_samples(n), DummyBackend(seed="blobs"), experiment_name="exp")
+    long_reply = "Решение верное, но " + "обоснование перехода неполное. " * 40
+    for idx, result in enumerate(results):
+        result["comment"] = long_reply if idx % 2 else "ok"
+        result["raw_response"] = {"text": long_reply, "tokens": 512}
+    return results
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_rows_keep_references_and_payloads_resolve_lazily(tmp_path, codec):
+    results = make_results()
+    path = save_results_jsonl(results, tmp_path / "exp.jsonl", blobs=True, blob_codec=codec)
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+    assert is_blob_ref(rows[1]["comment"]) and is_blob_ref(rows[0]["raw_response"])
+    # Короткие значения остаются в строке.
+    assert rows[0]["comment"] == "ok"
+    # Одинаковые ответы хранятся один раз.
+    store = open_blob_store(path)
+    assert len(store) == 2
+    assert blob_path(path).stat().st_size < len(json.dumps(results[0]["raw_response"], ensure_ascii=False))
+
+    assert store.payload(rows[1], "comment") == results[1]["comment"]
+    assert store.payload(rows[0], "comment") == "ok"
+    assert [store.resolve(row) for row in rows] == [{**row, **result} for row, result in zip(rows, results)]
+    with pytest.raises(KeyError):
+        store.get("missing")
+
+
+def test_append_reuses_index_and_survives_partial_tail(tmp_path):
+    results = make_results(10)
+    path = tmp_path / "exp.jsonl"
+    with JsonlResultWriter(path, blobs=True, flush=True) as writer:
+        writer.write(results[0])
+    # Имитируем падение на записи индекса: хвостовая строка индекса недописана.
+    index_path = blob_path(path).with_name("exp.blobs.idx")
+    with index_path.open("a", encoding="utf-8") as f:
+        f.write('{"key": "dead')
+
+    with JsonlResultWriter(path, append=True, blobs=True, flush=True) as writer:
+        for result in results[1:]:
+            writer.write(result)
+        assert writer.blobs.deduplicated > 0
+
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    # Обрывок отрезан, новые строки индекса не приклеились к нему.
+    assert all(json.loads(line) for line in index_path.read_text(encoding="utf-8").splitlines())
+    store = open_blob_store(path)
+    assert len(read_completed_ids(path)) == 10
+    assert [store.payload(row, "raw_response") for row in rows] == [r["raw_response"] for r in results]
+
+
+def test_open_blob_store_is_read_only(tmp_path):
+    path = save_results_jsonl(make_results(4), tmp_path / "exp.jsonl", blobs=True)
+    index_path = blob_path(path).with_name("exp.blobs.idx")
+    with index_path.open("a", encoding="utf-8") as f:
+        f.write('{"key": "dead')
+    before = (blob_path(path).read_bytes(), index_path.read_bytes())
+
+    with open_blob_store(path) as store:
+        assert len(store) == 2
+        with pytest.raises(ValueError):
+            store.put({"text": "x" * 100})
+    assert (blob_path(path).read_bytes(), index_path.read_bytes()) == before
+
+
+def test_merge_keeps_references_valid(tmp_path):
+    results = make_results(6)
+    paths = [
+        save_results_jsonl(results[:3], tmp_path / "a.jsonl", blobs=True),
+        save_results_jsonl(results[3:], tmp_path / "b.jsonl", blobs=True, blob_codec="lzma"),
+        save_results_jsonl(results[:1], tmp_path / "plain.jsonl"),
+    ]
+    merged = tmp_path / "merged.jsonl"
+    merged.write_text("".join(path.read_text(encoding="utf-8") for path in paths), encoding="utf-8")
+
+    assert merge_blob_stores(paths, merged) == blob_path(merged)
+    assert merge_blob_stores([paths[2]], tmp_path / "none.jsonl") is None
+    store = open_blob_store(merged)
+    rows = [json.loads(line) for line in merged.read_text(encoding="utf-8").splitlines()]
+    assert [store.payload(row, "comment") for row in rows] == [r["comment"] for r in results + results[:1]]
+
+
+def test_unknown_codec_and_missing_store(tmp_path):
+    with pytest.raises(ValueError):
+        BlobStore(tmp_path / "x.blobs", codec="zstd")
+    with pytest.raises(FileNotFoundError):
+        open_blob_store(tmp_path / "missing.jsonl")
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from backend.analysis.bootstrap import bootstrap_ci, paired_bootstrap
+from backend.analysis.columns import ResultColumns
+from backend.analysis.metrics import quadratic_weighted_kappa
+
+
+def make_columns(agreement: float, n: int = 2000, seed: int = 0) -> ResultColumns:
+    rng = np.random.default_rng(seed)
+    true = rng.integers(0, 4, n)
+    pred = np.where(rng.random(n) < agreement, true, rng.integers(0, 4, n))
+    return ResultColumns(pred, true, np.full(n, 3), rng.random(n))
+
+
+@pytest.mark.parametrize("metric", ["accuracy", "mae", "qwk"])
+def test_interval_contains_estimate_and_is_reproducible(metric):
+    cols = make_columns(0.7)
+
+    ci = bootstrap_ci(cols, metric, n_resamples=2000, seed=7)
+
+    assert ci.lower <= ci.estimate <= ci.upper
+    assert ci == bootstrap_ci(cols, metric, n_resamples=2000, seed=7, n_jobs=2)
+    if metric == "qwk":
+        assert ci.estimate == pytest.approx(quadratic_weighted_kappa(cols))
+
+
+def test_paired_bootstrap_detects_better_backend_and_aligns_dicts():
+    strong, weak = make_columns(0.8, seed=1), make_columns(0.5, seed=1)
+    diff = paired_bootstrap(strong, weak, "accuracy", n_resamples=2000)
+    assert diff.lower > 0 and diff.p_value < 0.01
+
+    def to_dicts(cols):
+        rows = zip(cols.pred_score, cols.true_score)
+        return [
+            {"task_id": "t", "student_id": str(i), "pred_score": int(p), "true_score": int(t), "max_score": 3,
+             "confidence": 0.5}
+            for i, (p, t) in enumerate(rows)
+        ]
+
+    shuffled = to_dicts(weak)[::-1]
+    assert paired_bootstrap(to_dicts(strong), shuffled, "accuracy", n_resamples=2000) == diff
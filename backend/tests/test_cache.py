@@ -0,0 +1,59 @@
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.cache import GradingCache
+from backend.grading.io_utils import load_samples
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_pipeline import make_task
+
+
+class CountingBackend(DummyBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._calls = 0
+
+    def grade(self, sample):
+        self._calls += 1
+        return super().grade(sample)
+
+
+def test_cache_skips_backend_on_repeat_run(tmp_path):
+    samples = load_samples(make_task(tmp_path))
+    backend = CountingBackend(seed="cache-seed")
+
+    with GradingCache(tmp_path / "cache.sqlite3") as cache:
+        first = grade_dataset(samples, backend, experiment_name="a", cache=cache)
+        second = grade_dataset(samples, backend, experiment_name="b", cache=cache)
+        assert backend._calls == 2
+        assert (cache.stats.hits, cache.stats.misses) == (2, 2)
+
+    assert [r["pred_score"] for r in first] == [r["pred_score"] for r in second]
+    assert second[0]["experiment_name"] == "b"
+
+
+def test_cache_key_depends_on_image_and_backend_config(tmp_path):
+    task_dir = make_task(tmp_path)
+    sample = load_samples(task_dir)[0]
+
+    with GradingCache(tmp_path / "cache.sqlite3") as cache:
+        key = cache.key_for(sample, DummyBackend(seed="a"))
+        assert key == cache.key_for(sample, DummyBackend(seed="a"))
+        assert key != cache.key_for(sample, DummyBackend(seed="b"))
+
+        (task_dir / "images" / "student_0001.png").write_bytes(b"another scan")
+        assert key != cache.key_for(sample, DummyBackend(seed="a"))
+
+
+def test_cache_evicts_by_size_and_age(tmp_path):
+    now = [1000.0]
+    cache = GradingCache(tmp_path / "cache.sqlite3", max_entries=2, max_age_seconds=60, clock=lambda: now[0])
+    for idx in range(3):
+        now[0] += 1
+        cache.put(f"k{idx}", {"pred_score": idx})
+
+    assert cache.evict() == 1
+    assert cache.get("k0") is None and cache.get("k2") == {"pred_score": 2}
+
+    now[0] += 120
+    assert cache.get("k2") is None
+    cache.put("err", {"error": "boom"})
+    assert len(cache) == 1
+    cache.close()
@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from backend.grading.backends.cascade import CascadeBackend, select_cascade_thresholds
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.io_utils import save_results_jsonl
+from backend.grading.pipeline import grade_dataset
+from backend.grading.runner import summarize_results
+from backend.tests.test_async_pipeline import make_samples
+
+
+class FixedBackend:
+    model_name = "fixed"
+
+    def __init__(self, name, confidence):
+        self.name = name
+        self.confidence = confidence
+        self.calls = 0
+
+    def grade(self, sample):
+        self.calls += 1
+        confidence = self.confidence(sample) if callable(self.confidence) else self.confidence
+        return {"pred_score": sample["true_score"], "confidence": confidence}
+
+
+def test_only_low_confidence_samples_escalate():
+    cheap = FixedBackend("cheap", lambda s: 0.9 if int(s["student_id"][-1]) % 2 else 0.3)
+    expensive = FixedBackend("expensive", 0.99)
+    cascade = CascadeBackend([cheap, expensive], thresholds=[0.8])
+
+    results = grade_dataset(make_samples(10), cascade, max_batch_size=4)
+
+    assert cheap.calls == 10 and expensive.calls == 5
+    assert cascade.stage_hits == [5, 5]
+    escalated = [r for r in results if r["cascade_stage"] == 1]
+    assert all(r["backend_name"] == "expensive" and len(r["cascade_trace"]) == 2 for r in escalated)
+
+
+def test_last_stage_accepts_everything_and_threshold_count_is_checked():
+    cascade = CascadeBackend([DummyBackend(seed="a"), DummyBackend(seed="b")], thresholds=[math.inf])
+    result = cascade.grade(make_samples(1)[0])
+    assert result["cascade_stage"] == 1
+
+    with pytest.raises(ValueError):
+        CascadeBackend([DummyBackend(), DummyBackend()], thresholds=[])
+
+
+def test_select_thresholds_reaches_target_accuracy():
+    confident = [
+        {"pred_score": 1, "true_score": 1, "max_score": 2, "confidence": 0.9},
+        {"pred_score": 1, "true_score": 1, "max_score": 2, "confidence": 0.8},
+        {"pred_score": 0, "true_score": 1, "max_score": 2, "confidence": 0.4},
+    ]
+    hopeless = [{"pred_score": 0, "true_score": 1, "max_score": 2, "confidence": 0.9}]
+
+    assert select_cascade_thresholds([confident, hopeless], target_accuracy=0.95) == [0.8, math.inf]
+
+
+def test_summary_reports_stage_hits(tmp_path):
+    cheap = FixedBackend("cheap", lambda s: 0.9 if s["student_id"] < "0003" else 0.1)
+    cascade = CascadeBackend([cheap, FixedBackend("expensive", 0.99)], thresholds=[0.5])
+    path = save_results_jsonl(grade_dataset(make_samples(5), cascade), tmp_path / "run.jsonl")
+
+    assert summarize_results(path)["overall"]["cascade_stage_hits"] == {"0": 3, "1": 2}
@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+import pytest
+
+from backend.analysis.columnar import open_results_columnar
+from backend.analysis.metrics import accuracy, mae, quadratic_weighted_kappa, reliability_curve
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.columnar import columnar_path, jsonl_to_columnar, save_results_columnar
+from backend.grading.io_utils import save_results_jsonl
+from backend.grading.pipeline import grade_dataset, stream_task_directory
+from backend.tests.test_async_pipeline import make_samples
+from backend.tests.test_pipeline import make_task
+
+
+@pytest.fixture
+def results():
+    samples = make_samples(200)
+    for sample in samples[120:]:
+        sample["task_id"] = "task_02"
+    results = grade_dataset(samples, DummyBackend(seed="columnar"), experiment_name="exp_a")
+    results[3]["error"] = "RuntimeError: сбой"
+    return results
+
+
+def test_columns_are_memmapped_and_match_json_metrics(tmp_path, results):
+    store = open_results_columnar(save_results_columnar(results, tmp_path / "exp_a.columns"))
+
+    assert len(store) == len(results)
+    assert isinstance(store.columns.pred_score, np.memmap)
+    assert store.codes("task_id").dtype == np.int32
+    assert store.values("task_id") == ["task_01", "task_02"]
+    # Метрики принимают хранилище напрямую и совпадают с подсчётом по словарям.
+    assert accuracy(store) == pytest.approx(accuracy(results))
+    assert mae(store) == pytest.approx(mae(results))
+    assert quadratic_weighted_kappa(store) == pytest.approx(quadratic_weighted_kappa(results))
+    assert reliability_curve(store) == reliability_curve(results)
+
+
+def test_filters_use_dictionary_codes(tmp_path, results):
+    store = open_results_columnar(save_results_columnar(results, tmp_path / "exp_a.columns"))
+    expected = [r for r in results if r["task_id"] == "task_02"]
+    clean = [r for r in results if not r.get("error")]
+
+    assert accuracy(store.select(task_id="task_02")) == pytest.approx(accuracy(expected))
+    assert len(store.select(skip_errors=True)) == len(clean)
+    assert len(store.select(backend_name="other_backend")) == 0
+    assert store.select().pred_score is store.columns.pred_score
+    assert list(store.decode("student_id")) == [r["student_id"] for r in results]
+    assert {task: len(cols) for task, cols in store.groups("task_id").items()} == {"task_01": 120, "task_02": 80}
+    with pytest.raises(ValueError):
+        store.codes("comment")
+
+
+def test_groups_match_per_value_masks(tmp_path, results):
+    store = open_results_columnar(save_results_columnar(results, tmp_path / "exp_a.columns"))
+
+    for skip_errors in (False, True):
+        groups = store.groups("student_id", skip_errors=skip_errors)
+        expected = {}
+        for r in results:
+            if not (skip_errors and r.get("error")):
+                expected.setdefault(r["student_id"], []).append(r["pred_score"])
+        assert list(groups) == sorted(expected, key=store.values("student_id").index)
+        # Внутри группы строки идут в исходном порядке.
+        assert {key: cols.pred_score.tolist() for key, cols in groups.items()} == expected
+
+
+def test_jsonl_conversion_skips_partial_tail(tmp_path, results):
+    path = save_results_jsonl(results, tmp_path / "exp_a.jsonl", metadata={"run": "nightly"})
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"task_id": "task_01", "stud')
+
+    store = open_results_columnar(jsonl_to_columnar(path))
+
+    assert store.path == columnar_path(path)
+    assert len(store) == len(results)
+    assert json.loads((store.path / "meta.json").read_text(encoding="utf-8"))["rows"] == len(results)
+    with pytest.raises(FileNotFoundError):
+        open_results_columnar(tmp_path / "missing.columns")
+
+
+def test_empty_store_opens(tmp_path):
+    store = open_results_columnar(save_results_columnar([], tmp_path / "empty.columns"))
+    assert len(store) == 0
+    assert len(store.select(task_id="task_01")) == 0
+
+
+def test_stream_resume_rebuilds_columns_from_full_jsonl(tmp_path):
+    task_dir = make_task(tmp_path)
+    results_dir = tmp_path / "results"
+    stream_task_directory(task_dir, DummyBackend(), experiment_name="exp", results_dir=results_dir, columnar=True)
+    path = results_dir / "exp.jsonl"
+    lines = path.read_text(encoding="utf-8").splitlines()
+    path.write_text(lines[0] + "\n", encoding="utf-8")
+
+    written, path = stream_task_directory(
+        task_dir, DummyBackend(), experiment_name="exp", results_dir=results_dir, resume=True, columnar=True
+    )
+
+    store = open_results_columnar(columnar_path(path))
+    assert written == 1
+    assert list(store.decode("student_id")) == ["0001", "0002"]
+    assert list(store.columns.true_score) == [2, 1]
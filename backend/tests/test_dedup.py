@@ -0,0 +1,123 @@
+import random
+import shutil
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from backend.grading import dedup
+from backend.grading.dedup import DedupConfig, find_duplicates
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_async_pipeline import make_samples
+
+
+def write_scan(path, seed, brightness=0):
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 200, size=(8, 8), dtype=np.uint8)
+    pixels = np.kron(blocks, np.ones((16, 16), dtype=np.uint8)).astype(np.int16) + brightness
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path)
+    return str(path)
+
+
+class CountingBackend:
+    name = "counting"
+    model_name = "counting"
+
+    def __init__(self):
+        self.graded = []
+
+    def grade(self, sample):
+        self.graded.append(sample["student_id"])
+        return {"pred_score": 1, "confidence": 0.7, "student_id": sample["student_id"]}
+
+
+def make_scans(tmp_path):
+    original = write_scan(tmp_path / "a.png", seed=1)
+    shutil.copy(original, tmp_path / "a_copy.png")
+    paths = [
+        original,
+        write_scan(tmp_path / "b.png", seed=2),
+        str(tmp_path / "a_copy.png"),
+        write_scan(tmp_path / "a_bright.png", seed=1, brightness=12),
+        original,
+    ]
+    samples = make_samples(len(paths))
+    for sample, path in zip(samples, paths):
+        sample["image_path"] = path
+    samples[-1]["task_id"] = "task_02"
+    return samples
+
+
+def test_exact_and_near_duplicates_are_grouped_within_task(tmp_path):
+    samples = make_scans(tmp_path)
+
+    assert find_duplicates(samples) == [0, 1, 0, 3, 4]
+    assert find_duplicates(samples, DedupConfig(perceptual=True)) == [0, 1, 0, 0, 4]
+
+
+def test_grade_dataset_grades_representatives_and_fans_out(tmp_path):
+    samples = make_scans(tmp_path)
+    backend = CountingBackend()
+
+    results = grade_dataset(samples, backend, dedup=DedupConfig(perceptual=True))
+
+    assert backend.graded == ["0000", "0001", "0004"]
+    assert [r["student_id"] for r in results] == [s["student_id"] for s in samples]
+    assert [r.get("dedup_of") for r in results] == [None, None, "0000", "0000", None]
+    assert results[3]["true_score"] == samples[3]["true_score"]
+
+
+def write_answer_sheet(path, answer, seed):
+    # Общий печатный бланк и короткий «рукописный» ответ в рамке внизу страницы.
+    image = Image.new("L", (600, 840), 255)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((20, 20, 580, 820), outline=0, width=3)
+    for y in range(60, 300, 30):
+        draw.text((40, y), "Find the derivative of f(x) = x^2 + 3x and simplify", fill=0)
+    draw.rectangle((40, 700, 300, 760), outline=0, width=2)
+    rng = np.random.default_rng(seed)
+    for pos, _ in enumerate(answer):
+        x = 60 + 18 * pos
+        draw.line([(x + int(rng.integers(0, 14)), 710 + int(rng.integers(0, 40))) for _ in range(4)], fill=20, width=3)
+    image.save(path)
+    return str(path)
+
+
+def test_distinct_answers_on_shared_template_are_not_merged(tmp_path):
+    samples = make_samples(20)
+    for idx, sample in enumerate(samples):
+        sample["image_path"] = write_answer_sheet(tmp_path / f"sheet_{idx}.png", f"x={idx * 7 + 1}", seed=idx)
+    rescan = tmp_path / "sheet_0_rescan.jpg"
+    Image.open(samples[0]["image_path"]).resize((500, 700)).save(rescan, quality=70)
+    samples.append({**samples[0], "student_id": "9999", "image_path": str(rescan)})
+
+    # Перцептивные хэши почти пустых бланков совпадают, но миниатюры различают ответы.
+    assert find_duplicates(samples, DedupConfig(perceptual=True)) == list(range(20)) + [0]
+
+
+def test_banded_search_matches_brute_force(monkeypatch):
+    rng = random.Random(7)
+    base = [rng.getrandbits(64) for _ in range(40)]
+    flips = [rng.randrange(1, 6) for _ in range(40)]
+    variants = [value ^ sum(1 << bit for bit in rng.sample(range(64), k)) for value, k in zip(base, flips)]
+    hashes = base + variants
+    rng.shuffle(hashes)
+    samples = make_samples(len(hashes))
+    for idx, sample in enumerate(samples):
+        sample["image_path"] = f"scan_{idx}.png"
+        sample["image_sha256"] = f"sha_{idx}"
+    by_path = {sample["image_path"]: value for sample, value in zip(samples, hashes)}
+    monkeypatch.setattr(dedup, "perceptual_hash", lambda path, hash_size=8: by_path[path])
+    monkeypatch.setattr(dedup, "block_thumbnail", lambda path, size=128: np.zeros((size // 4, size // 4)))
+
+    # Эталон: тот же жадный выбор ближайшего представителя, но перебором всех представителей.
+    expected, reps = [], []
+    for idx, value in enumerate(hashes):
+        near = sorted(((value ^ hashes[rep]).bit_count(), rep) for rep in reps)
+        if near and near[0][0] <= 3:
+            expected.append(near[0][1])
+        else:
+            reps.append(idx)
+            expected.append(idx)
+
+    assert find_duplicates(samples, DedupConfig(perceptual=True, max_distance=3)) == expected
+    assert expected != list(range(len(hashes)))
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from backend.analysis.loader import load_results
+from backend.analysis.metrics import accuracy, quadratic_weighted_kappa
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.io_utils import save_results_jsonl
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_async_pipeline import make_samples
+
+
+@pytest.fixture
+def results_file(tmp_path):
+    samples = make_samples(300)
+    for sample in samples[150:]:
+        sample["task_id"] = "task_02"
+    results = grade_dataset(samples, DummyBackend(seed="loader"), experiment_name="exp_a")
+    results[7]["error"] = "RuntimeError: сбой"
+    path = save_results_jsonl(results, tmp_path / "exp_a.jsonl", metadata={"run": "nightly"})
+    return path
+
+
+def parse_all(path):
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("n_jobs", [1, 3])
+def test_chunked_load_matches_line_by_line_parse(results_file, n_jobs):
+    expected = parse_all(results_file)
+
+    rows = load_results(results_file, chunk_bytes=4096, n_jobs=n_jobs)
+    projected = load_results(results_file, fields=["student_id", "pred_score"], chunk_bytes=1000, n_jobs=n_jobs)
+
+    assert rows == expected
+    assert projected == [{"student_id": r["student_id"], "pred_score": r["pred_score"]} for r in expected]
+
+
+def test_filters_and_columns_feed_metrics(results_file):
+    expected = [r for r in parse_all(results_file) if r["task_id"] == "task_02"]
+
+    rows = load_results(results_file, task_id="task_02", experiment=["exp_a", "exp_b"], chunk_bytes=2048, n_jobs=2)
+    assert [r["student_id"] for r in rows] == [r["student_id"] for r in expected]
+    assert load_results(results_file, backend_name="other_backend") == []
+
+    columns = load_results(results_file, task_id="task_02", as_columns=True, chunk_bytes=2048, n_jobs=2)
+    assert accuracy(columns) == pytest.approx(accuracy(expected))
+    assert quadratic_weighted_kappa(columns) == pytest.approx(quadratic_weighted_kappa(expected))
+
+    without_errors = load_results(results_file, skip_errors=True, as_columns=True)
+    assert len(without_errors) == 299
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+
+from backend.grading.io_utils import load_samples
+from backend.grading.manifest import MANIFEST_FILENAME, load_or_build_manifest
+from backend.tests.test_pipeline import make_task
+
+
+def test_manifest_matches_probed_paths(tmp_path):
+    task_dir = make_task(tmp_path)
+
+    probed = load_samples(task_dir)
+    indexed = load_samples(task_dir, use_manifest=True)
+
+    assert [s["image_path"] for s in indexed] == [s["image_path"] for s in probed]
+    assert (task_dir / MANIFEST_FILENAME).exists()
+    assert len(indexed[0]["image_sha256"]) == 64
+
+
+def test_manifest_supports_sharded_layout_and_invalidates(tmp_path):
+    task_dir = make_task(tmp_path)
+    images = task_dir / "images"
+    shard = images / "00"
+    shard.mkdir()
+    os.replace(images / "student_0002.png", shard / "student_0002.png")
+
+    samples = load_samples(task_dir, use_manifest=True)
+    assert samples[1]["image_path"] == str(shard / "student_0002.png")
+
+    manifest = load_or_build_manifest(task_dir)
+    assert manifest.is_fresh()
+    (shard / "student_0003.png").write_text("новый скан", encoding="utf-8")
+    os.utime(shard, (0, 0))
+    assert not manifest.is_fresh()
+    assert "00/student_0003.png" in load_or_build_manifest(task_dir).entries
+
+
+def test_corrupted_manifest_is_rebuilt(tmp_path):
+    task_dir = make_task(tmp_path)
+    (task_dir / MANIFEST_FILENAME).write_text("{not json", encoding="utf-8")
+
+    manifest = load_or_build_manifest(task_dir)
+
+    assert set(manifest.entries) == {"student_0001.png", "student_0002.png"}
+    assert json.loads((task_dir / MANIFEST_FILENAME).read_text(encoding="utf-8"))["version"] == 1
+
+
+def test_scan_overwritten_in_place_gets_new_hash(tmp_path):
+    task_dir = make_task(tmp_path)
+    before = load_samples(task_dir, use_manifest=True)[0]["image_sha256"]
+
+    scan = task_dir / "images" / "student_0001.png"
+    scan.write_bytes("исправленный скан".encode("utf-8"))
+    os.utime(scan, (1_000_000, 1_000_000))
+    after = load_samples(task_dir, use_manifest=True)[0]["image_sha256"]
+
+    assert after != before
+    assert after == hashlib.sha256(scan.read_bytes()).hexdigest()
+    assert load_or_build_manifest(task_dir).entries["student_0001.png"].sha256 == after
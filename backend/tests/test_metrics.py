@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from backend.analysis.columns import ResultColumns
+from backend.analysis.metrics import (
+    accuracy,
+    accuracy_at_confidence,
+    mae,
+    quadratic_weighted_kappa,
+    reliability_curve,
+    risk_coverage_curve,
+)
+
+
+def make_results():
+    rows = [(2, 2, 0.9), (1, 2, 0.6), (0, 0, 0.95), (2, 1, 0.3), (1, 1, 1.0), (0, 2, 0.05)]
+    return [{"pred_score": p, "true_score": t, "max_score": 2, "confidence": c} for p, t, c in rows]
+
+
+def test_point_metrics_on_known_values():
+    results = make_results()
+
+    assert accuracy(results) == pytest.approx(3 / 6)
+    assert mae(results) == pytest.approx(4 / 6)
+    assert quadratic_weighted_kappa([{**r, "pred_score": r["true_score"]} for r in results]) == pytest.approx(1.0)
+    assert accuracy_at_confidence(results, 0.9) == pytest.approx((1.0, 0.5))
+
+
+def test_reliability_bins_include_upper_edge_in_last_bin():
+    bins = reliability_curve(make_results(), num_bins=2)
+
+    assert [b.count for b in bins] == [2, 4]
+    assert bins[1].correct == 3
+    assert bins[1].avg_confidence == pytest.approx((0.9 + 0.6 + 0.95 + 1.0) / 4)
+
+
+def test_columnar_input_matches_dict_input():
+    results = make_results()
+    cols = ResultColumns(
+        pred_score=np.array([r["pred_score"] for r in results]),
+        true_score=np.array([r["true_score"] for r in results]),
+        max_score=np.full(len(results), 2),
+        confidence=np.array([r["confidence"] for r in results]),
+    )
+
+    assert quadratic_weighted_kappa(cols) == pytest.approx(quadratic_weighted_kappa(results))
+    assert reliability_curve(cols, 5) == reliability_curve(results, 5)
+    with pytest.raises(ValueError):
+        accuracy(cols.take(np.zeros(len(cols), dtype=bool)))
+
+
+def test_risk_coverage_curve_matches_threshold_scan():
+    results = make_results() + [{"pred_score": 1, "true_score": 1, "max_score": 2, "confidence": 0.6}]
+
+    curve = risk_coverage_curve(results)
+
+    assert list(curve.thresholds) == sorted({r["confidence"] for r in results}, reverse=True)
+    for threshold, coverage, acc in zip(curve.thresholds, curve.coverage, curve.accuracy):
+        assert accuracy_at_confidence(results, threshold) == pytest.approx((acc, coverage))
+    assert curve.threshold_for_accuracy(0.75) == pytest.approx((0.6, 0.8, 5 / 7))
+    assert curve.threshold_for_accuracy(1.01) is None
+    assert 0.0 <= curve.aurc <= 1.0
@@ -0,0 +1,82 @@
+import pickle
+
+import pytest
+
+from backend.analysis.metrics import accuracy, mae, quadratic_weighted_kappa, reliability_curve
+from backend.analysis.online import MetricsAccumulator
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.cache import GradingCache
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_async_pipeline import make_samples
+
+
+def test_accumulator_fed_by_pipeline_matches_batch_metrics():
+    accumulator = MetricsAccumulator(num_bins=5)
+    results = grade_dataset(make_samples(60), DummyBackend(seed="online"), accumulator=accumulator)
+
+    snap = accumulator.snapshot()
+
+    assert snap.count == 60
+    assert snap.accuracy == pytest.approx(accuracy(results))
+    assert snap.mae == pytest.approx(mae(results))
+    assert snap.qwk == pytest.approx(quadratic_weighted_kappa(results))
+    assert [b.count for b in snap.reliability] == [b.count for b in reliability_curve(results, 5)]
+
+
+class ObservedBackend(DummyBackend):
+    """Запоминает, сколько результатов уже видел accumulator к моменту каждого вызова."""
+
+    def __init__(self, accumulator, **kwargs):
+        super().__init__(**kwargs)
+        self.accumulator = accumulator
+        self.seen = []
+
+    def grade(self, sample):
+        self.seen.append(self.accumulator.snapshot().count)
+        return super().grade(sample)
+
+    def grade_batch(self, samples):
+        self.seen.append(self.accumulator.snapshot().count)
+        return super().grade_batch(samples)
+
+
+@pytest.mark.parametrize("options", [{}, {"max_batch_size": 5}])
+def test_accumulator_is_fed_while_grading_runs(tmp_path, options):
+    accumulator = MetricsAccumulator()
+    backend = ObservedBackend(accumulator, seed="online")
+    samples = make_samples(40)
+    cache = GradingCache(tmp_path / "cache")
+    grade_dataset(samples[:10], DummyBackend(seed="online"), cache=cache)
+
+    grade_dataset(samples, backend, cache=cache, accumulator=accumulator, **options)
+
+    # Попадания в кэш видны до первого вызова, а дальше счётчик растёт по ходу прогона.
+    assert backend.seen[0] == 10
+    assert backend.seen[-1] > 10
+    assert accumulator.snapshot().count == 40
+
+
+def test_shards_merge_to_the_same_snapshot():
+    results = grade_dataset(make_samples(40), DummyBackend(seed="merge"))
+    whole, left, right = MetricsAccumulator(), MetricsAccumulator(), MetricsAccumulator()
+    for result in results:
+        whole.update(result)
+    for result in results[:15]:
+        left.update(result)
+    right.update_many(results[15:])
+    right.update({"error": "timeout"})
+
+    merged = pickle.loads(pickle.dumps(left)).merge(right).snapshot()
+
+    assert merged.errors == 1
+    assert merged.count == whole.snapshot().count
+    assert merged.qwk == pytest.approx(whole.snapshot().qwk)
+    expected_bins = whole.snapshot().reliability
+    assert [(b.count, b.correct) for b in merged.reliability] == [(b.count, b.correct) for b in expected_bins]
+    assert [b.avg_confidence for b in merged.reliability] == pytest.approx([b.avg_confidence for b in expected_bins])
+
+
+def test_empty_snapshot_has_no_metrics():
+    snap = MetricsAccumulator().snapshot()
+
+    assert snap.count == 0 and snap.accuracy is None
@@ -1,9 +1,15 @@
 import json
+import time
 from pathlib import Path
 
+import pytest
+
+from backend.grading import pipeline
 from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.cache import GradingCache
 from backend.grading.io_utils import load_samples
-from backend.grading.pipeline import run_task_directory
+from backend.grading.pipeline import grade_dataset, iter_grade, run_task_directory, stream_task_directory
+from backend.tests.test_async_pipeline import make_samples
 
 
 def make_task(tmp_path: Path) -> Path:
@@ -49,3 +55,142 @@ def test_dummy_backend_pipeline_writes_jsonl(tmp_path):
     parsed = json.loads(lines[0])
     assert parsed["backend_name"] == backend.name
     assert "pred_score" in parsed and "confidence" in parsed
+
+
+class FlakyBackend:
+    name = "flaky"
+    model_name = "flaky"
+
+    def __init__(self, failing_student: str):
+        self.failing_student = failing_student
+
+    def grade(self, sample):
+        if sample["student_id"] == self.failing_student:
+            raise RuntimeError("провайдер недоступен")
+        return {"pred_score": 1, "confidence": 0.9, "comment": "ok"}
+
+
+def test_concurrent_grading_keeps_order_and_contract(tmp_path):
+    samples = load_samples(make_task(tmp_path)) * 10
+    backend = DummyBackend(seed="test-seed")
+
+    sequential = grade_dataset(samples, backend, experiment_name="seq")
+    concurrent = grade_dataset(samples, backend, experiment_name="seq", max_workers=4)
+
+    strip = lambda r: {k: v for k, v in r.items() if k != "timestamp"}  # noqa: E731
+    assert [strip(r) for r in concurrent] == [strip(r) for r in sequential]
+
+
+def test_concurrent_grading_captures_errors_per_sample(tmp_path):
+    samples = load_samples(make_task(tmp_path))
+
+    results = grade_dataset(samples, FlakyBackend("0002"), max_workers=2, capture_errors=True)
+
+    assert [r["student_id"] for r in results] == ["0001", "0002"]
+    assert "error" not in results[0]
+    assert results[1]["error"].startswith("RuntimeError")
+    assert results[1]["confidence"] == 0.0
+
+    with pytest.raises(RuntimeError):
+        grade_dataset(samples, FlakyBackend("0002"), max_workers=2)
+
+
+def test_stream_task_directory_resumes_after_crash(tmp_path):
+    task_dir = make_task(tmp_path)
+    results_dir = tmp_path / "results"
+    backend = DummyBackend(seed="test-seed")
+
+    written, output_path = stream_task_directory(task_dir, backend, experiment_name="stream", results_dir=results_dir)
+    assert written == 2
+    full = output_path.read_text(encoding="utf-8").splitlines()
+
+    # Имитируем падение: первая строка записана целиком, вторая — наполовину.
+    output_path.write_text(full[0] + "\n" + full[1][:20], encoding="utf-8")
+    written, _ = stream_task_directory(
+        task_dir, backend, experiment_name="stream", results_dir=results_dir, resume=True
+    )
+
+    lines = output_path.read_text(encoding="utf-8").splitlines()
+    assert written == 1
+    assert [json.loads(line)["student_id"] for line in lines] == ["0001", "0002"]
+
+
+class FailOnceBackend(DummyBackend):
+    def __init__(self, failing):
+        super().__init__(seed="test-seed")
+        self.failing = set(failing)
+
+    def grade(self, sample):
+        if sample["student_id"] in self.failing:
+            raise RuntimeError("провайдер недоступен")
+        return super().grade(sample)
+
+
+def test_resume_retries_errors_and_drops_superseded_rows(tmp_path):
+    task_dir = make_task(tmp_path)
+    results_dir = tmp_path / "results"
+    for resume in (False, True):
+        # Вторая попытка тоже падает: остаётся только последняя строка с ошибкой.
+        stream_task_directory(
+            task_dir,
+            FailOnceBackend({"0002"}),
+            experiment_name="retry",
+            results_dir=results_dir,
+            capture_errors=True,
+            resume=resume,
+        )
+    output_path = results_dir / "retry.jsonl"
+    assert [bool(json.loads(line).get("error")) for line in output_path.read_text("utf-8").splitlines()] == [False, True]
+
+    written, _ = stream_task_directory(
+        task_dir, FailOnceBackend(()), experiment_name="retry", results_dir=results_dir, resume=True
+    )
+
+    rows = [json.loads(line) for line in output_path.read_text("utf-8").splitlines()]
+    assert written == 1
+    assert [(row["student_id"], row.get("error")) for row in rows] == [("0001", None), ("0002", None)]
+
+
+class SlowEveryNthBackend(DummyBackend):
+    """Каждый 32-й ученик отвечает за 0.5 с, остальные — сразу."""
+
+    def grade(self, sample):
+        if int(sample["student_id"]) % 32 == 0:
+            time.sleep(0.5)
+        return super().grade(sample)
+
+
+def test_iter_grade_keeps_window_full_around_slow_calls():
+    samples = make_samples(256)
+
+    started = time.perf_counter()
+    results = list(iter_grade(iter(samples), SlowEveryNthBackend(), max_workers=8))
+    elapsed = time.perf_counter() - started
+
+    assert [r["student_id"] for r in results] == [s["student_id"] for s in samples]
+    # По чанкам: 8 медленных вызовов подряд, ~4 с; со скользящим окном они идут параллельно.
+    assert elapsed < 2.0
+
+
+def test_iter_grade_uses_one_pool_and_matches_grade_dataset(tmp_path, monkeypatch):
+    executors = []
+    make_executor = pipeline._make_executor
+    monkeypatch.setattr(pipeline, "_make_executor", lambda *args: executors.append(args) or make_executor(*args))
+    samples = make_samples(60)
+    backend = DummyBackend(seed="stream")
+    with GradingCache(tmp_path / "cache.sqlite3") as cache:
+        grade_dataset(samples[::3], backend, cache=cache)
+        streamed = list(
+            iter_grade(iter(samples), backend, max_workers=3, max_batch_size=4, cache=cache, chunk_size=8)
+        )
+
+    expected = grade_dataset(samples, backend)
+    assert [(r["student_id"], r["pred_score"]) for r in streamed] == [
+        (r["student_id"], r["pred_score"]) for r in expected
+    ]
+    assert len(executors) == 1
+
+    executors.clear()
+    processed = list(iter_grade(iter(samples), backend, max_workers=2, executor="process", chunk_size=8))
+    assert [r["pred_score"] for r in processed] == [r["pred_score"] for r in expected]
+    assert len(executors) == 1
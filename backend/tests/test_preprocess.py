@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pytest
+
+from backend.grading import preprocess
+from backend.grading.io_utils import load_samples
+from backend.grading.preprocess import (
+    PayloadCache,
+    PreprocessConfig,
+    iter_preprocessed,
+    load_payload,
+    preprocess_samples,
+)
+from backend.tests.test_pipeline import make_task
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def make_scanned_task(tmp_path):
+    task_dir = make_task(tmp_path)
+    for idx, name in enumerate(("student_0001.png", "student_0002.png")):
+        Image.new("RGB", (3000, 2000), color=(200, 30 * idx, 10)).save(task_dir / "images" / name)
+    return task_dir
+
+
+def test_preprocess_resizes_and_caches_payload(tmp_path):
+    samples = load_samples(make_scanned_task(tmp_path))
+    cache = PayloadCache(tmp_path / "payloads", PreprocessConfig(max_side=512))
+
+    prepared = preprocess_samples(samples, cache=cache, max_workers=2)
+    payload, mime = load_payload(prepared[0])
+
+    assert mime == "image/jpeg"
+    with Image.open(prepared[0]["payload_path"]) as image:
+        assert max(image.size) == 512 and image.mode == "L"
+    assert len(payload) < (tmp_path / "data/processed/task_01/images/student_0001.png").stat().st_size
+
+    mtime = Path(prepared[0]["payload_path"]).stat().st_mtime_ns
+    again = preprocess_samples(samples, cache=cache)
+    assert again[0]["payload_path"] == prepared[0]["payload_path"]
+    assert Path(again[0]["payload_path"]).stat().st_mtime_ns == mtime
+
+
+def test_config_change_produces_new_payload(tmp_path):
+    samples = load_samples(make_scanned_task(tmp_path))
+
+    small = preprocess_samples(samples, cache=PayloadCache(tmp_path / "p", PreprocessConfig(max_side=256)))
+    color = preprocess_samples(samples, cache=PayloadCache(tmp_path / "p", PreprocessConfig(grayscale=False)))
+
+    assert small[0]["payload_path"] != color[0]["payload_path"]
+
+
+def test_undecodable_scan_passes_through_without_aborting(tmp_path):
+    task_dir = make_scanned_task(tmp_path)
+    (task_dir / "images" / "student_0002.png").write_bytes(b"not an image")
+    samples = load_samples(task_dir)
+
+    prepared = preprocess_samples(samples, cache=PayloadCache(tmp_path / "payloads"), max_workers=2)
+
+    assert "payload_path" in prepared[0] and "preprocess_error" not in prepared[0]
+    assert "payload_path" not in prepared[1] and prepared[1]["preprocess_error"]
+    assert load_payload(prepared[1]) == (b"not an image", "image/png")
+
+
+def test_stream_reuses_one_process_pool(tmp_path, monkeypatch):
+    pools = []
+
+    class CountingPool(preprocess.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(preprocess, "ProcessPoolExecutor", CountingPool)
+    template = load_samples(make_scanned_task(tmp_path))[0]
+    samples = []
+    for idx in range(6):
+        path = tmp_path / f"scan_{idx}.png"
+        Image.new("RGB", (300, 200), color=(40 * idx, 0, 0)).save(path)
+        samples.append({**template, "student_id": f"{idx:04d}", "image_path": str(path), "image_sha256": None})
+    cache = PayloadCache(tmp_path / "payloads", PreprocessConfig(max_side=128))
+
+    prepared = list(iter_preprocessed(samples, cache=cache, max_workers=2, chunk_size=2))
+
+    assert len(prepared) == 6 and all("payload_path" in sample for sample in prepared)
+    assert len(pools) == 1
@@ -0,0 +1,83 @@
+import json
+import urllib.request
+
+from backend.grading.backends.http_backend import HTTPGradingBackend
+from backend.grading.mock_server import MockLLMServer
+from backend.grading.pipeline import grade_dataset
+from backend.grading.prompts import PromptBuilder, prefix_order
+from backend.tests.test_async_pipeline import make_samples
+
+
+class ConstantBackend:
+    name = "named"
+    model_name = "named"
+
+    def grade(self, sample):
+        return {"pred_score": 0, "confidence": 0.5}
+
+
+def with_scans(samples, tmp_path):
+    for sample in samples:
+        path = tmp_path / f"{sample['task_id']}_{sample['student_id']}.png"
+        path.write_bytes(b"scan " + sample["student_id"].encode("ascii"))
+        sample["image_path"] = str(path)
+    return samples
+
+
+def two_task_samples(per_task: int, tmp_path):
+    """Ученики двух задач вперемешку: a0, b0, a1, b1, ..."""
+    first, second = make_samples(per_task), make_samples(per_task)
+    for sample in second:
+        sample.update(task_id="task_02", statement_text="Другое условие", rubric_text="Другие критерии")
+    return with_scans([sample for pair in zip(first, second) for sample in pair], tmp_path)
+
+
+def test_prefix_is_shared_and_student_part_comes_last(tmp_path):
+    builder = PromptBuilder()
+    first, second = with_scans(make_samples(2), tmp_path)
+    second["solution_text"] = "x = 2"
+
+    a, b = builder.build(first), builder.build(second)
+
+    assert a.prefix_key == b.prefix_key and a.prefix_tokens == b.prefix_tokens
+    assert b.total_tokens == b.prefix_tokens + b.student_tokens + b.image_tokens
+    messages = b.to_messages()
+    user_blocks = messages[1]["content"]
+    assert "cache_control" in user_blocks[0] and "Условие" in user_blocks[0]["text"]
+    assert "x = 2" in user_blocks[1]["text"] and user_blocks[-1]["type"] == "image_url"
+    # Локальный путь к скану провайдеру не уходит: только data-URL.
+    assert b.image_url.startswith("data:image/png;base64,") and second["image_path"] not in json.dumps(messages)
+
+    payload = HTTPGradingBackend("http://provider", prompt_builder=builder)._payload(second)
+    assert set(payload["sample"]) == {"task_id", "student_id", "true_score", "max_score"}
+
+
+def test_prefix_order_groups_tasks_and_grading_keeps_input_order(tmp_path):
+    samples = two_task_samples(3, tmp_path)
+
+    order = prefix_order(samples)
+    assert [samples[idx]["task_id"] for idx in order] == ["task_01"] * 3 + ["task_02"] * 3
+
+    mixed_order = [(s["task_id"], s["student_id"]) for s in samples]
+    results = grade_dataset(samples, ConstantBackend(), group_by_prefix=True)
+    assert [(r["task_id"], r["student_id"]) for r in results] == mixed_order
+
+
+def test_mock_server_reports_prefix_hits_and_grouping_raises_reuse(tmp_path):
+    samples = two_task_samples(10, tmp_path)
+    with MockLLMServer(seed="prompts", max_cached_prefixes=1) as server:
+        backend = HTTPGradingBackend(server.url, model_name="mock", prompt_builder=PromptBuilder())
+
+        grade_dataset(samples, backend)
+        interleaved = server.stats()
+        server.reset()
+        results = grade_dataset(samples, backend, group_by_prefix=True)
+        grouped = server.stats()
+        with urllib.request.urlopen(f"{server.url}/stats") as response:
+            reported = json.loads(response.read())
+
+    assert interleaved.hit_rate == 0.0
+    assert grouped.requests == 20 and grouped.prefix_hits == 18
+    assert reported["hit_rate"] == 0.9 and reported["cached_tokens"] > 0
+    assert results[0]["backend_name"] == "http_v1"
+    assert results[0]["raw_response"]["usage"]["prompt_tokens"] > 0
@@ -0,0 +1,127 @@
+import pickle
+import threading
+import time
+
+import httpx
+import pytest
+
+from backend.grading.backends.resilient import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientBackend,
+    RetryableBackendError,
+)
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_async_pipeline import make_samples
+
+
+class FaultInjectingBackend:
+    """Заглушка провайдера: сценарий задаёт поведение каждого следующего вызова."""
+
+    name = "faulty"
+    model_name = "faulty"
+
+    def __init__(self, script=(), default_delay=0.0):
+        self.script = list(script)
+        self.default_delay = default_delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def grade(self, sample):
+        with self._lock:
+            self.calls += 1
+            action = self.script.pop(0) if self.script else ("ok", self.default_delay)
+        kind, value = action
+        if kind == "error":
+            raise value
+        time.sleep(value)
+        return {"pred_score": sample["true_score"], "confidence": 0.9}
+
+
+def test_retries_transient_errors_with_backoff():
+    delays = []
+    stub = FaultInjectingBackend([("error", RetryableBackendError("429")), ("error", ConnectionError("reset"))])
+    backend = ResilientBackend(stub, max_retries=3, sleep=delays.append, seed=1)
+
+    result = backend.grade(make_samples(1)[0])
+
+    assert result["pred_score"] == 0
+    assert stub.calls == 3 and backend.stats.retries == 2
+    assert len(delays) == 2 and delays[1] > delays[0] * 0.5
+
+
+def test_retry_after_header_sets_minimum_delay():
+    request = httpx.Request("POST", "http://provider/grade")
+    response = httpx.Response(429, headers={"Retry-After": "7"}, request=request)
+    stub = FaultInjectingBackend([("error", httpx.HTTPStatusError("429", request=request, response=response))])
+    delays = []
+    backend = ResilientBackend(stub, backoff_base=0.01, sleep=delays.append, seed=1)
+
+    backend.grade(make_samples(1)[0])
+
+    assert delays == [7.0]
+
+
+def test_non_retryable_error_is_raised_immediately():
+    stub = FaultInjectingBackend([("error", ValueError("bad response"))])
+    backend = ResilientBackend(stub, sleep=lambda _: None)
+
+    with pytest.raises(ValueError):
+        backend.grade(make_samples(1)[0])
+    assert stub.calls == 1
+
+
+def test_hung_call_times_out_instead_of_stalling_pipeline():
+    stub = FaultInjectingBackend([("ok", 5.0)])
+    backend = ResilientBackend(stub, timeout=0.1, max_retries=0, hedge=False)
+
+    started = time.monotonic()
+    results = grade_dataset(make_samples(2), backend, capture_errors=True)
+
+    assert time.monotonic() - started < 2
+    assert results[0]["error"].startswith("BackendTimeoutError")
+    assert "error" not in results[1]
+    backend.close()
+
+
+def test_slow_call_is_hedged_after_latency_history():
+    stub = FaultInjectingBackend(default_delay=0.01)
+    backend = ResilientBackend(stub, timeout=5, hedge_min_samples=5)
+    samples = make_samples(6)
+    for sample in samples[:5]:
+        backend.grade(sample)
+
+    stub.script = [("ok", 2.0)]
+    started = time.monotonic()
+    backend.grade(samples[5])
+
+    assert time.monotonic() - started < 1
+    assert backend.stats.hedges == 1 and backend.stats.hedge_wins == 1
+    backend.close()
+
+
+def test_circuit_breaker_fails_fast_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    stub = FaultInjectingBackend([("error", ConnectionError("down"))] * 2)
+    backend = ResilientBackend(stub, max_retries=1, circuit_breaker=breaker, sleep=lambda _: None)
+    sample = make_samples(1)[0]
+
+    with pytest.raises(ConnectionError):
+        backend.grade(sample)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        backend.grade(sample)
+    assert stub.calls == 2
+
+    now[0] = 11
+    assert backend.grade(sample)["pred_score"] == 0
+    assert breaker.state == "closed"
+
+
+def test_wrapper_pickles_for_process_pools():
+    backend = pickle.loads(pickle.dumps(ResilientBackend(DummyBackend(seed="p"), circuit_breaker=CircuitBreaker())))
+
+    assert backend.grade(make_samples(1)[0])["backend_name"] == "dummy_v1"
+    backend.close()
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from backend.grading import runner
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.blobs import open_blob_store
+from backend.grading.demo import generate_dummy_task
+from backend.grading.runner import main, merge_results, merge_shards, run_dataset
+
+
+def make_dataset(tmp_path):
+    data_dir = tmp_path / "data" / "processed"
+    for task_id in ("task_01", "task_02"):
+        generate_dummy_task(data_dir / task_id, num_samples=12)
+    return data_dir
+
+
+def read_ids(path):
+    return sorted((row["task_id"], row["student_id"]) for row in map(json.loads, path.read_text("utf-8").splitlines()))
+
+
+def test_run_dataset_writes_per_task_merged_and_summary(tmp_path):
+    data_dir = make_dataset(tmp_path)
+    results_dir = tmp_path / "results"
+
+    summary, merged = run_dataset(
+        DummyBackend(seed="s"), data_dir, "full", results_dir, max_parallel_tasks=2, max_workers_per_task=2
+    )
+
+    assert (results_dir / "full" / "task_01.jsonl").exists()
+    assert len(read_ids(merged)) == 24
+    assert summary["overall"]["count"] == 24
+    assert set(summary["tasks"]) == {"task_01", "task_02"}
+    assert json.loads((results_dir / "full.summary.json").read_text("utf-8"))["overall"]["count"] == 24
+
+
+def test_max_total_workers_also_caps_parallel_tasks(tmp_path, monkeypatch):
+    data_dir = make_dataset(tmp_path)
+    results_dir = tmp_path / "results"
+    pool_sizes = []
+
+    class RecordingPool(runner.ProcessPoolExecutor):
+        def __init__(self, max_workers=None):
+            pool_sizes.append(max_workers)
+            super().__init__(max_workers=max_workers)
+
+    monkeypatch.setattr(runner, "ProcessPoolExecutor", RecordingPool)
+    kwargs = dict(max_parallel_tasks=4, max_workers_per_task=4)
+
+    summary, _ = run_dataset(DummyBackend(seed="s"), data_dir, "one", results_dir, max_total_workers=1, **kwargs)
+    run_dataset(DummyBackend(seed="s"), data_dir, "two", results_dir, max_total_workers=2, **kwargs)
+
+    # 1 воркер — задачи идут последовательно без пула; 2 воркера — не больше двух процессов.
+    assert summary["overall"]["count"] == 24
+    assert pool_sizes == [2]
+    with pytest.raises(ValueError):
+        run_dataset(DummyBackend(seed="s"), data_dir, "zero", results_dir, max_total_workers=0)
+
+
+def test_shards_partition_and_merge_back(tmp_path):
+    data_dir = make_dataset(tmp_path)
+    results_dir = tmp_path / "results"
+    _, full = run_dataset(DummyBackend(seed="s"), data_dir, "full", results_dir)
+
+    for spec in ("0/3", "1/3", "2/3"):
+        assert main(["run", "--data-dir", str(data_dir), "--results-dir", str(results_dir),
+                     "--experiment", "sharded", "--seed", "s", "--shard", spec]) == 0
+    summary, merged = merge_shards("sharded", results_dir)
+
+    assert read_ids(merged) == read_ids(full)
+    assert summary["overall"]["count"] == 24
+
+
+def test_blob_references_survive_task_merge(tmp_path):
+    data_dir = make_dataset(tmp_path)
+    results_dir = tmp_path / "results"
+    _, plain = run_dataset(DummyBackend(seed="s"), data_dir, "plain", results_dir)
+    _, merged = run_dataset(DummyBackend(seed="s"), data_dir, "blobs", results_dir, blobs=True)
+
+    store = open_blob_store(merged)
+    rows = [store.resolve(json.loads(line)) for line in merged.read_text("utf-8").splitlines()]
+    expected = [json.loads(line) for line in plain.read_text("utf-8").splitlines()]
+    assert len(store) > 0
+    assert [(r["comment"], r["raw_response"]) for r in rows] == [(r["comment"], r["raw_response"]) for r in expected]
+
+
+def test_merge_drops_error_rows_superseded_by_retry(tmp_path):
+    failed = tmp_path / "a.jsonl"
+    retried = tmp_path / "b.jsonl"
+    failed.write_text(
+        json.dumps({"task_id": "t", "student_id": "1", "error": "таймаут"}) + "\n"
+        + json.dumps({"task_id": "t", "student_id": "2", "error": "таймаут"}) + "\n",
+        encoding="utf-8",
+    )
+    retried.write_text(json.dumps({"task_id": "t", "student_id": "1", "pred_score": 1}) + "\n", encoding="utf-8")
+
+    merged = merge_results([failed, retried], tmp_path / "merged.jsonl")
+
+    rows = [json.loads(line) for line in merged.read_text("utf-8").splitlines()]
+    assert [(row["student_id"], "error" in row) for row in rows] == [("2", True), ("1", False)]
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from backend.analysis.metrics import expected_calibration_error
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.backends.self_consistency import SelfConsistencyBackend
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_async_pipeline import make_samples
+
+
+class ScriptedBackend:
+    name = "scripted"
+    model_name = "scripted"
+
+    def __init__(self, scores):
+        self.scores = list(scores)
+
+    def grade(self, sample):
+        return {"pred_score": self.scores.pop(0), "confidence": 0.8, "comment": "ok"}
+
+
+def test_easy_submission_stops_after_two_agreeing_calls():
+    backend = SelfConsistencyBackend(DummyBackend(seed="sc"), max_calls=5)
+
+    results = grade_dataset(make_samples(10), backend)
+
+    assert backend.average_calls == 2
+    assert all(r["raw_response"]["num_calls"] == 2 for r in results)
+    # Уверенность следует за моделью, а не застывает на 0.75 для всех работ.
+    inner = grade_dataset(make_samples(10), DummyBackend(seed="sc"))
+    assert [r["confidence"] for r in results] == [round(0.5 + r["confidence"] / 2, 4) for r in inner]
+    assert len({r["confidence"] for r in results}) > 1
+    assert results[0]["backend_name"] == "dummy_v1+sc5"
+
+
+def test_disagreement_uses_more_calls_and_lowers_confidence():
+    backend = SelfConsistencyBackend(ScriptedBackend([1, 2, 1, 2, 2]), max_calls=5)
+
+    result = backend.grade(make_samples(1)[0])
+
+    assert result["pred_score"] == 2
+    assert result["raw_response"]["votes"] == {"1": 2, "2": 3}
+    assert [c["pred_score"] for c in result["raw_response"]["calls"]] == [1, 2, 1, 2, 2]
+    assert result["confidence"] == round((3 + 2 * 0.8) / 7, 4)
+    unblended = SelfConsistencyBackend(ScriptedBackend([1, 2, 1, 2, 2]), blend_model_confidence=False)
+    assert unblended.grade(make_samples(1)[0])["confidence"] == round(4 / 7, 4)
+
+
+class NoisyBackend:
+    """
+    Вызовы независимы при фиксированной работе: верный балл с вероятностью p (она же
+    confidence ответа), иначе чаще всего одна и та же «любимая» ошибка работы.
+    """
+
+    name = "noisy"
+    model_name = "noisy"
+
+    def __init__(self):
+        self.calls = {}
+
+    def grade(self, sample):
+        work = random.Random(f"work|{sample['student_id']}")
+        p = work.uniform(0.5, 0.99)
+        wrong = [score for score in range(sample["max_score"] + 1) if score != sample["true_score"]]
+        favourite = work.choice(wrong)
+        attempt = self.calls.setdefault(sample["student_id"], 0)
+        self.calls[sample["student_id"]] += 1
+        call = random.Random(f"call|{sample['student_id']}|{attempt}")
+        if call.random() < p:
+            score = sample["true_score"]
+        else:
+            score = favourite if call.random() < 0.5 else call.choice(wrong)
+        return {"pred_score": score, "confidence": p, "comment": "ok"}
+
+
+def test_blended_confidence_is_calibrated_and_ranks_works():
+    samples = make_samples(3000)
+    blended = grade_dataset(samples, SelfConsistencyBackend(NoisyBackend()))
+    flat = grade_dataset(samples, SelfConsistencyBackend(NoisyBackend(), blend_model_confidence=False))
+
+    assert expected_calibration_error(blended) < 0.08
+    assert expected_calibration_error(blended) < expected_calibration_error(flat)
+    # Уверенность различает работы: верхняя половина по уверенности точнее нижней.
+    ranked = sorted(blended, key=lambda r: r["confidence"])
+    half = len(ranked) // 2
+
+    def hit_rate(rows):
+        return sum(r["pred_score"] == r["true_score"] for r in rows) / len(rows)
+
+    assert hit_rate(ranked[half:]) > hit_rate(ranked[:half]) + 0.1
+
+
+def test_expected_calibration_error():
+    results = [
+        {"pred_score": 1, "true_score": 1, "max_score": 2, "confidence": 0.9},
+        {"pred_score": 0, "true_score": 1, "max_score": 2, "confidence": 0.9},
+    ]
+    assert expected_calibration_error(results) == pytest.approx(0.4)
+
+
+def test_stops_when_remaining_calls_cannot_change_winner():
+    backend = SelfConsistencyBackend(ScriptedBackend([1, 1, 0]), max_calls=3, agreement_margin=3)
+
+    result = backend.grade(make_samples(1)[0])
+
+    assert result["pred_score"] == 1 and result["raw_response"]["num_calls"] == 2
+    assert result["raw_response"]["stopped_early"]
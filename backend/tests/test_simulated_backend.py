@@ -0,0 +1,164 @@
+import asyncio
+import json
+import pickle
+import statistics
+import time
+import urllib.request
+
+import httpx
+import pytest
+
+from backend.grading.async_pipeline import agrade_dataset
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.backends.http_backend import HTTPGradingBackend
+from backend.grading.backends.resilient import CircuitBreaker, ResilientBackend
+from backend.grading.backends.simulated import RateLimitedError, SimulatedLLMBackend, SimulationProfile
+from backend.grading.mock_server import MockLLMServer
+from backend.grading.pipeline import grade_dataset
+from backend.tests.test_async_pipeline import make_samples
+
+# time_scale=0: латентность считается и попадает в raw_response, но не ждётся.
+INSTANT = dict(time_scale=0.0)
+
+
+def test_scores_match_dummy_and_latency_is_log_normal_with_tail():
+    samples = make_samples(2000)
+    profile = SimulationProfile(latency_median=0.4, latency_sigma=0.5, tail_probability=0.02, **INSTANT)
+    results = grade_dataset(samples, SimulatedLLMBackend(profile, seed="sim"))
+    reference = grade_dataset(samples, DummyBackend(seed="sim"))
+
+    assert [r["pred_score"] for r in results] == [r["pred_score"] for r in reference]
+    assert results[0]["backend_name"] == "simulated_v1"
+    latencies = sorted(r["raw_response"]["simulation"]["latency"] for r in results)
+    assert statistics.median(latencies) == pytest.approx(0.4, rel=0.1)
+    # Тяжёлый хвост: p99.5 заметно дальше от медианы, чем у чистого логнормального (~3.6x).
+    assert latencies[int(0.995 * len(latencies))] > 5 * statistics.median(latencies)
+
+
+def test_failures_are_reproducible_and_recovered_by_retries():
+    samples = make_samples(200)
+    profile = SimulationProfile(error_rate=0.2, timeout_rate=0.05, hang_seconds=5.0, **INSTANT)
+
+    def run():
+        backend = SimulatedLLMBackend(profile, seed="faults")
+        # Предохранитель не должен срабатывать на случайную серию сбоев из разных потоков:
+        # иначе число попыток зависело бы от темпа, а не только от хэша.
+        resilient = ResilientBackend(
+            backend,
+            max_retries=10,
+            hedge=False,
+            circuit_breaker=CircuitBreaker(failure_threshold=10_000),
+            sleep=lambda _: None,
+        )
+        try:
+            results = grade_dataset(samples, resilient, max_workers=4)
+        finally:
+            resilient.close()
+        return results, backend.stats()
+
+    results, stats = run()
+    _, again = run()
+
+    assert len(results) == 200 and not any(r.get("error") for r in results)
+    assert stats.errors > 10 and stats.timeouts > 0
+    assert stats.successes == 200
+    assert stats.calls == 200 + stats.errors + stats.timeouts
+    assert (again.errors, again.timeouts) == (stats.errors, stats.timeouts)
+
+
+def test_rate_limit_rejects_with_retry_after():
+    backend = SimulatedLLMBackend(SimulationProfile(rate_limit_rps=1.0, rate_limit_burst=2, **INSTANT))
+    samples = make_samples(5)
+
+    backend.grade(samples[0])
+    backend.grade(samples[1])
+    with pytest.raises(RateLimitedError) as info:
+        backend.grade(samples[2])
+
+    assert info.value.retry_after > 0
+    assert backend.stats().rate_limited == 1
+
+
+def test_rate_limit_runs_in_simulated_time():
+    # 1 запрос/с в имитируемом времени при time_scale=0.01 — это 100 запросов за реальную секунду.
+    profile = SimulationProfile(latency_median=0.5, latency_sigma=0.0, rate_limit_rps=1.0, time_scale=0.01)
+    backend = SimulatedLLMBackend(profile)
+    retry_afters = []
+    started = time.monotonic()
+    for sample in make_samples(20):
+        while True:
+            try:
+                backend.grade(sample)
+                break
+            except RateLimitedError as exc:
+                retry_afters.append(exc.retry_after)
+                time.sleep(exc.retry_after)
+
+    # Без масштабирования каждый 429 просил бы ждать около реальной секунды.
+    assert backend.stats().successes == 20
+    assert retry_afters and all(retry_after <= 0.01 for retry_after in retry_afters)
+    assert time.monotonic() - started < 2.0
+
+
+def test_resilient_backend_waits_for_retry_after():
+    backend = SimulatedLLMBackend(SimulationProfile(rate_limit_rps=0.5, rate_limit_burst=1, **INSTANT))
+    delays = []
+    resilient = ResilientBackend(backend, backoff_base=0.01, hedge=False, sleep=delays.append, seed=1)
+    samples = make_samples(2)
+    try:
+        resilient.grade(samples[0])
+        with pytest.raises(RateLimitedError) as info:
+            backend.grade(samples[1])
+        resilient.max_retries = 1
+        with pytest.raises(RateLimitedError):
+            resilient.grade(samples[1])
+    finally:
+        resilient.close()
+
+    # Без подсказки backoff был бы ~0.01 с; пауза не короче названного провайдером срока.
+    assert delays and delays[0] >= info.value.retry_after * 0.9
+
+
+def test_concurrency_cap_queues_sync_and_async_calls():
+    profile = SimulationProfile(latency_median=0.02, latency_sigma=0.0, max_concurrency=2)
+    samples = make_samples(12)
+
+    backend = SimulatedLLMBackend(profile)
+    grade_dataset(samples, backend, max_workers=6)
+    assert backend.stats().peak_concurrency == 2
+
+    backend = SimulatedLLMBackend(profile)
+    results = asyncio.run(agrade_dataset(samples, backend, max_concurrency=6))
+    assert len(results) == 12
+    assert backend.stats().peak_concurrency == 2
+    # Бэкенд переживает pickle (пул процессов) с новыми примитивами синхронизации.
+    restored = pickle.loads(pickle.dumps(backend))
+    assert restored.grade(samples[0])["pred_score"] == results[0]["pred_score"]
+
+
+def test_mock_server_maps_simulated_failures_to_http_statuses():
+    profile = SimulationProfile(rate_limit_rps=0.5, rate_limit_burst=1, **INSTANT)
+    samples = make_samples(3)
+    with MockLLMServer(seed="http", simulation=profile) as server:
+        client = HTTPGradingBackend(server.url, model_name="sim-model")
+        assert client.grade(samples[0])["model_name"] == "sim-model"
+        with pytest.raises(httpx.HTTPStatusError) as info:
+            client.grade(samples[1])
+        with urllib.request.urlopen(f"{server.url}/stats") as response:
+            stats = json.loads(response.read())
+
+    assert info.value.response.status_code == 429
+    assert int(info.value.response.headers["Retry-After"]) >= 1
+    assert stats["simulation"]["rate_limited"] == 1
+
+    with MockLLMServer(simulation=SimulationProfile(error_rate=1.0, **INSTANT)) as server:
+        with pytest.raises(httpx.HTTPStatusError) as info:
+            HTTPGradingBackend(server.url).grade(samples[0])
+    assert info.value.response.status_code == 503
+
+
+def test_profile_validation():
+    with pytest.raises(ValueError):
+        SimulationProfile(error_rate=0.7, timeout_rate=0.5)
+    with pytest.raises(ValueError):
+        SimulationProfile(max_concurrency=0)
@@ -0,0 +1,40 @@
+import pickle
+
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.io_utils import load_samples
+from backend.grading.pipeline import grade_dataset
+from backend.grading.table import SampleTable, Task
+from backend.tests.test_pipeline import make_task
+
+
+def test_views_satisfy_sample_contract(tmp_path):
+    samples = load_samples(make_task(tmp_path))
+    table = SampleTable.from_samples(samples)
+
+    assert len(table.tasks) == 1
+    assert [view.to_dict() for view in table] == samples
+    assert table[0]["statement_text"] is table[1]["statement_text"]
+    assert table[-1].get("solution_text", "") == ""
+
+
+def test_table_pickles_task_context_once():
+    table = SampleTable([Task("task_01", "Условие " * 500, "Критерии " * 500)])
+    for idx in range(200):
+        table.append("task_01", f"{idx:04d}", f"images/student_{idx:04d}.png", idx % 3, 2)
+
+    compact = len(pickle.dumps(table))
+    naive = sum(len(pickle.dumps(sample)) for sample in table.to_samples())
+
+    assert compact * 20 < naive
+    assert pickle.loads(pickle.dumps(table[5])).to_dict() == table[5].to_dict()
+
+
+def test_process_pool_grades_table_chunks(tmp_path):
+    samples = load_samples(make_task(tmp_path)) * 5
+    table = SampleTable.from_samples(samples)
+    backend = DummyBackend(seed="table-seed")
+
+    from_table = grade_dataset(table, backend, experiment_name="exp", max_workers=2, executor="process")
+    from_dicts = grade_dataset(samples, backend, experiment_name="exp")
+
+    assert [r["pred_score"] for r in from_table] == [r["pred_score"] for r in from_dicts]
@@ -0,0 +1,76 @@
+import json
+import time
+
+import pytest
+
+from backend.grading import io_utils
+
+from backend.grading.backends.dummy_backend import DummyBackend
+from backend.grading.cache import GradingCache
+from backend.grading.pipeline import grade_dataset, stream_task_directory, telemetry_path
+from backend.grading.telemetry import Histogram, Telemetry
+from backend.tests.test_async_pipeline import make_samples
+from backend.tests.test_pipeline import FlakyBackend, make_task
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(0.99) == pytest.approx(2.0 + 2.0 * 0.96)
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_stream_run_writes_per_stage_summary_and_feeds_parent(tmp_path):
+    parent = Telemetry()
+    backend = DummyBackend(seed="telemetry")
+    _, path = stream_task_directory(
+        make_task(tmp_path), backend, experiment_name="tele", results_dir=tmp_path / "results", telemetry=parent
+    )
+
+    block = json.loads(telemetry_path(path).read_text(encoding="utf-8"))["telemetry"]["dummy_v1/dummy_v1"]
+    assert {"load", "resolve", "backend_call", "normalize", "write"} <= set(block["stages"])
+    assert block["stages"]["backend_call"]["count"] == 2
+    assert block["stages"]["write"]["p50"] <= block["stages"]["write"]["p99"]
+    assert block["counters"]["results"] == 2
+    assert parent.summary()["dummy_v1/dummy_v1"]["counters"]["results"] == 2
+
+
+def test_load_stage_excludes_resolve_time(tmp_path, monkeypatch):
+    resolve = io_utils.resolve_image_path
+
+    def slow_resolve(*args, **kwargs):
+        time.sleep(0.05)
+        return resolve(*args, **kwargs)
+
+    monkeypatch.setattr(io_utils, "resolve_image_path", slow_resolve)
+    telemetry = Telemetry()
+    stream_task_directory(
+        make_task(tmp_path), DummyBackend(), experiment_name="tele", results_dir=tmp_path / "results", telemetry=telemetry
+    )
+
+    stages = telemetry.summary()["dummy_v1/dummy_v1"]["stages"]
+    assert stages["resolve"]["mean"] >= 0.05
+    # Раньше load оборачивал весь генератор и включал resolve целиком.
+    assert stages["load"]["count"] == 2 and stages["load"]["mean"] < 0.02
+
+
+def test_counters_track_errors_and_cache_hits(tmp_path):
+    telemetry = Telemetry()
+    samples = make_samples(4)
+    grade_dataset(samples, FlakyBackend(failing_student="0001"), capture_errors=True, telemetry=telemetry)
+    with GradingCache(tmp_path / "cache.sqlite3") as cache:
+        grade_dataset(samples, DummyBackend(), cache=cache, telemetry=telemetry)
+        grade_dataset(samples, DummyBackend(), cache=cache, telemetry=telemetry, max_workers=2)
+
+    summary = telemetry.summary()
+    assert summary["flaky/flaky"]["counters"]["errors"] == 1
+    assert summary["dummy_v1/dummy_v1"]["counters"]["cache_hits"] == 4
+    assert summary["dummy_v1/dummy_v1"]["counters"]["cache_misses"] == 4
+
+    text = telemetry.render_prometheus()
+    assert 'grading_errors_total{backend="flaky",model="flaky"} 1' in text
+    assert 'grading_stage_seconds_count{stage="backend_call",backend="flaky",model="flaky"} 3' in text
+    assert 'grading_in_flight{backend="dummy_v1",model="dummy_v1"} 0' in text